@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.endpoints import auth, transactions, cards, receipts
+from app.api.endpoints import auth, transactions, cards, receipts, recurring_transactions, budgets, category_rules
 
 api_router = APIRouter()
 
@@ -7,3 +7,6 @@ api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(transactions.router, prefix="/transactions", tags=["Transactions"])
 api_router.include_router(cards.router, prefix="/cards", tags=["Cards"])
 api_router.include_router(receipts.router, prefix="/receipts", tags=["Receipts"])
+api_router.include_router(recurring_transactions.router, prefix="/recurring-transactions", tags=["Recurring Transactions"])
+api_router.include_router(budgets.router, prefix="/budgets", tags=["Budgets"])
+api_router.include_router(category_rules.router, prefix="/category-rules", tags=["Category Rules"])
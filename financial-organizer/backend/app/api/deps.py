@@ -1,5 +1,5 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Dict, Generator, Optional
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
@@ -46,4 +46,28 @@ def get_current_active_user(
 ) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    # Let the browser keep the response but revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def check_etag(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+) -> str:
+    """
+    Weak ETag for the user's transactions, cards and schedules, taken from
+    the version the services bump on every write. A matching If-None-Match
+    ends the request with 304 before anything is queried or serialized.
+    """
+    etag = f'W/"{current_user.id}-{current_user.data_version}"'
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison: the W/ prefix is ignored on both sides
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in candidates or etag.removeprefix("W/") in candidates:
+            raise HTTPException(status_code=304, headers=etag_headers(etag))
+    response.headers.update(etag_headers(etag))
+    return etag
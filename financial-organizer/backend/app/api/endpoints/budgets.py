@@ -0,0 +1,108 @@
+from datetime import date
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.db.models import User
+from app.schemas.budget import (
+    Budget,
+    BudgetCreate,
+    BudgetEvent,
+    BudgetStatus,
+    BudgetUpdate,
+)
+from app.services import budget_service
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[Budget])
+def read_budgets(
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Retrieve budgets.
+    """
+    return budget_service.get_multi(db=db, user_id=current_user.id)
+
+
+@router.post("/", response_model=Budget)
+def create_budget(
+    *,
+    db: Session = Depends(deps.get_db),
+    budget_in: BudgetCreate,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Create a monthly budget for a category.
+    """
+    if budget_service.get_by_category(db, user_id=current_user.id, category=budget_in.category):
+        raise HTTPException(status_code=400, detail="A budget for this category already exists")
+    return budget_service.create(db=db, obj_in=budget_in, user_id=current_user.id)
+
+
+@router.get("/status", response_model=BudgetStatus)
+def read_budget_status(
+    *,
+    db: Session = Depends(deps.get_db),
+    month: Optional[date] = None,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Spending against each budget for a month (default: the current month).
+    """
+    return budget_service.get_status(db, user=current_user, month=month)
+
+
+@router.get("/events", response_model=List[BudgetEvent])
+def read_budget_events(
+    *,
+    db: Session = Depends(deps.get_db),
+    limit: int = 100,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Latest budget threshold crossings.
+    """
+    return budget_service.get_events(db, user_id=current_user.id, limit=limit)
+
+
+@router.put("/{id}", response_model=Budget)
+def update_budget(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    budget_in: BudgetUpdate,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Update a budget.
+    """
+    budget = budget_service.get(db=db, id=id)
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    if budget.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return budget_service.update(db=db, db_obj=budget, obj_in=budget_in)
+
+
+@router.delete("/{id}")
+def delete_budget(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Delete a budget and its events.
+    """
+    budget = budget_service.get(db=db, id=id)
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    if budget.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    budget_service.remove(db=db, id=id)
+    return {"ok": True}
@@ -15,6 +15,7 @@ plaid_service = PlaidService()
 def read_cards(
     db: Session = Depends(deps.get_db),
     current_user: Any = Depends(deps.get_current_active_user),
+    etag: str = Depends(deps.check_etag),
 ) -> Any:
     """
     Retrieve cards.
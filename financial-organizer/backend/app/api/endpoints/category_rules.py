@@ -0,0 +1,106 @@
+from typing import Any, List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.db.models import Card, User
+from app.schemas.category_rule import (
+    CategoryRule,
+    CategoryRuleApplyResult,
+    CategoryRuleCreate,
+    CategoryRuleUpdate,
+)
+from app.services import categorization_service
+
+router = APIRouter()
+
+
+def _check_card(db: Session, card_id: Any, user: User) -> None:
+    if card_id is None:
+        return
+    card = db.query(Card).filter(Card.id == card_id, Card.user_id == user.id).first()
+    if not card:
+        raise HTTPException(status_code=404, detail="Card not found")
+
+
+def _get_own_rule(db: Session, id: int, user: User):
+    rule = categorization_service.get(db=db, id=id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Category rule not found")
+    # Global rules are shared by every user and cannot be changed here
+    if rule.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return rule
+
+
+@router.get("/", response_model=List[CategoryRule])
+def read_category_rules(
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Retrieve the user's category rules and the global ones, in the order
+    they are tried.
+    """
+    return categorization_service.get_multi(db=db, user_id=current_user.id)
+
+
+@router.post("/", response_model=CategoryRule)
+def create_category_rule(
+    *,
+    db: Session = Depends(deps.get_db),
+    rule_in: CategoryRuleCreate,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Create a category rule and apply it to existing transactions.
+    """
+    _check_card(db, rule_in.card_id, current_user)
+    return categorization_service.create(db=db, obj_in=rule_in, user_id=current_user.id)
+
+
+@router.post("/apply", response_model=CategoryRuleApplyResult)
+def apply_category_rules(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Run the rules again over all transactions not categorized by hand.
+    """
+    return categorization_service.recategorize(db, user_ids=[current_user.id])
+
+
+@router.put("/{id}", response_model=CategoryRule)
+def update_category_rule(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    rule_in: CategoryRuleUpdate,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Update a category rule and re-apply it to the transactions it affects.
+    """
+    rule = _get_own_rule(db, id, current_user)
+    update_data = rule_in.model_dump(exclude_unset=True)
+    _check_card(db, update_data.get("card_id"), current_user)
+    if not categorization_service.has_conditions(rule, update_data):
+        raise HTTPException(status_code=400, detail="A rule needs at least one condition")
+    return categorization_service.update(db=db, db_obj=rule, obj_in=update_data)
+
+
+@router.delete("/{id}")
+def delete_category_rule(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Delete a category rule; its transactions fall back to the other rules.
+    """
+    _get_own_rule(db, id, current_user)
+    categorization_service.remove(db=db, id=id)
+    return {"ok": True}
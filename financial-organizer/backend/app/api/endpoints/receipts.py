@@ -1,13 +1,13 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from sqlalchemy.orm import Session
 import os
-from datetime import datetime
+from datetime import date, datetime
 
 from app.api import deps
 from app.db.models import Transaction
-from app.schemas.receipt import ReceiptCreate, Receipt as ReceiptSchema
-from app.services import receipt_service
+from app.schemas.receipt import ItemPriceHistory, ItemSpending, ReceiptCreate, Receipt as ReceiptSchema
+from app.services import item_price_service, receipt_service, version_service
 from app.services.ocr_service import OCRService
 
 router = APIRouter()
@@ -61,25 +61,25 @@ async def upload_receipt(
         if transaction.category == "groceries":
             ocr_data = await ocr_service.process_grocery_receipt(file_path)
 
-        # Create receipt record
+        # Items are stored as line items, the rest of the OCR result once
+        # on the receipt
+        line_items = ocr_data.pop("items", [])
         receipt_data = ReceiptCreate(
             transaction_id=transaction_id,
             file_path=file_name,
-            ocr_data=ocr_data
+            ocr_data=ocr_data,
+            line_items=line_items
         )
 
-        receipt = receipt_service.create(
-            db=db, obj_in=receipt_data
-        )
-
-        # Update transaction with receipt path and OCR data
+        # Link the receipt to the transaction and make its text searchable,
+        # committed together with the receipt
         transaction.receipt_path = file_name
-        transaction.ocr_data = ocr_data
-        if transaction.category == "groceries":
-            transaction.grocery_items = ocr_data.get("items", [])
-        
-        db.commit()
-        return receipt
+        transaction.receipt_text = ocr_data.get("raw_text")
+        version_service.bump(db, [current_user.id])
+
+        return receipt_service.create(
+            db=db, obj_in=receipt_data, user_id=current_user.id
+        )
 
     except Exception as e:
         # Clean up the uploaded file if processing failed
@@ -90,6 +90,46 @@ async def upload_receipt(
             detail=f"Error processing receipt: {str(e)}"
         )
 
+@router.get("/items/spending", response_model=ItemSpending)
+def read_item_spending(
+    *,
+    db: Session = Depends(deps.get_db),
+    sku: Optional[str] = None,
+    name: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: Any = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Total spent on one item across the user's receipts, by item code or name.
+    """
+    if sku is None and name is None:
+        raise HTTPException(status_code=400, detail="Give an item sku or name")
+    return receipt_service.get_item_spending(
+        db, user_id=current_user.id, sku=sku, name=name, start_date=start_date, end_date=end_date
+    )
+
+@router.get("/items/prices", response_model=ItemPriceHistory)
+def read_item_prices(
+    *,
+    db: Session = Depends(deps.get_db),
+    sku: Optional[str] = None,
+    name: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    interval: str = Query("day", pattern="^(day|month)$"),
+    current_user: Any = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Unit prices paid for one item at each store per day or month, by item
+    code (SKU or PLU) or name.
+    """
+    if sku is None and name is None:
+        raise HTTPException(status_code=400, detail="Give an item sku or name")
+    return item_price_service.get_history(
+        db, user_id=current_user.id, sku=sku, name=name, start=start_date, end=end_date, interval=interval
+    )
+
 @router.get("/{transaction_id}", response_model=ReceiptSchema)
 def get_receipt(
     *,
@@ -1,17 +1,26 @@
+from datetime import date, datetime
+from decimal import Decimal
 from typing import Any, List
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Path
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app import services
 from app.api import deps
 from app.db.models import User
 from app.schemas.recurring_transaction import (
+    CashFlowForecast,
     RecurringTransaction,
     RecurringTransactionCreate,
     RecurringTransactionUpdate,
+    RecurringSuggestion,
+)
+from app.services import (
+    forecast_service,
+    recurring_detection_service,
+    recurring_transaction_service,
+    transaction_service,
 )
 
 router = APIRouter()
@@ -23,11 +32,12 @@ def read_recurring_transactions(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(deps.get_current_user),
+    etag: str = Depends(deps.check_etag),
 ) -> Any:
     """
     Retrieve recurring transactions.
     """
-    recurring_transactions = services.recurring_transaction_service.get_multi(
+    recurring_transactions = recurring_transaction_service.get_multi(
         db=db, user_id=current_user.id, skip=skip, limit=limit
     )
     return recurring_transactions
@@ -44,7 +54,7 @@ def create_recurring_transaction(
     Create new recurring transaction.
     """
     try:
-        recurring_transaction = services.recurring_transaction_service.create(
+        recurring_transaction = recurring_transaction_service.create(
             db=db, obj_in=recurring_transaction_in, user_id=current_user.id
         )
         return recurring_transaction
@@ -52,17 +62,70 @@ def create_recurring_transaction(
         raise HTTPException(status_code=400, detail=f"Error creating recurring transaction: {str(e)}")
 
 
+@router.get("/forecast", response_model=CashFlowForecast)
+def read_forecast(
+    db: Session = Depends(deps.get_db),
+    until: date = Query(..., description="Last day of the projection"),
+    opening_balance: Decimal = Decimal(0),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Project the daily balance from the user's active recurring transactions.
+    """
+    today = datetime.now().date()
+    if until < today:
+        raise HTTPException(status_code=400, detail="until must not be in the past")
+    if (until - today).days > forecast_service.MAX_FORECAST_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Forecasts are limited to {forecast_service.MAX_FORECAST_DAYS} days",
+        )
+    return forecast_service.get_forecast(
+        db, user_id=current_user.id, until=until, opening_balance=opening_balance
+    )
+
+
+@router.get("/suggestions", response_model=List[RecurringSuggestion])
+def read_recurring_suggestions(
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Retrieve subscriptions detected in the user's transaction history.
+    """
+    return recurring_detection_service.get_multi(db=db, user_id=current_user.id)
+
+
+@router.post("/suggestions/{suggestion_id}/dismiss", response_model=RecurringSuggestion)
+def dismiss_recurring_suggestion(
+    *,
+    db: Session = Depends(deps.get_db),
+    suggestion_id: int = Path(..., title="The ID of the suggestion to dismiss"),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Hide a detected subscription; later detection runs keep it hidden.
+    """
+    suggestion = recurring_detection_service.get(db=db, id=suggestion_id)
+    if not suggestion:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    if suggestion.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return recurring_detection_service.dismiss(db=db, db_obj=suggestion)
+
+
 @router.get("/{id}", response_model=RecurringTransaction)
 def read_recurring_transaction(
     *,
     db: Session = Depends(deps.get_db),
     id: int = Path(..., title="The ID of the recurring transaction to get"),
     current_user: User = Depends(deps.get_current_user),
+    etag: str = Depends(deps.check_etag),
 ) -> Any:
     """
     Get recurring transaction by ID.
     """
-    recurring_transaction = services.recurring_transaction_service.get(db=db, id=id)
+    recurring_transaction = recurring_transaction_service.get(db=db, id=id)
     if not recurring_transaction:
         raise HTTPException(status_code=404, detail="Recurring transaction not found")
     if recurring_transaction.user_id != current_user.id:
@@ -81,14 +144,14 @@ def update_recurring_transaction(
     """
     Update a recurring transaction.
     """
-    recurring_transaction = services.recurring_transaction_service.get(db=db, id=id)
+    recurring_transaction = recurring_transaction_service.get(db=db, id=id)
     if not recurring_transaction:
         raise HTTPException(status_code=404, detail="Recurring transaction not found")
     if recurring_transaction.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     try:
-        recurring_transaction = services.recurring_transaction_service.update(
+        recurring_transaction = recurring_transaction_service.update(
             db=db, db_obj=recurring_transaction, obj_in=recurring_transaction_in
         )
         return recurring_transaction
@@ -106,13 +169,13 @@ def delete_recurring_transaction(
     """
     Delete a recurring transaction.
     """
-    recurring_transaction = services.recurring_transaction_service.get(db=db, id=id)
+    recurring_transaction = recurring_transaction_service.get(db=db, id=id)
     if not recurring_transaction:
         raise HTTPException(status_code=404, detail="Recurring transaction not found")
     if recurring_transaction.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    recurring_transaction = services.recurring_transaction_service.remove(db=db, id=id)
+    recurring_transaction = recurring_transaction_service.remove(db=db, id=id)
     return recurring_transaction
 
 
@@ -126,7 +189,7 @@ def process_recurring_transaction(
     """
     Manually process a recurring transaction.
     """
-    recurring_transaction = services.recurring_transaction_service.get(db=db, id=id)
+    recurring_transaction = recurring_transaction_service.get(db=db, id=id)
     if not recurring_transaction:
         raise HTTPException(status_code=404, detail="Recurring transaction not found")
     if recurring_transaction.user_id != current_user.id:
@@ -139,20 +202,20 @@ def process_recurring_transaction(
         transaction_type=recurring_transaction.transaction_type,
         category=recurring_transaction.category,
         description=f"{recurring_transaction.description} (Manual process)",
-        date=services.recurring_transaction_service.datetime.now().date(),
+        date=datetime.now().date(),
     )
     
     # Create the transaction
-    services.transaction_service.create(db=db, obj_in=transaction_in, user_id=current_user.id)
+    transaction_service.create(db=db, obj_in=transaction_in, user_id=current_user.id)
     
     # Update next_date for the recurring transaction
-    recurring_transaction = services.recurring_transaction_service.update(
+    recurring_transaction = recurring_transaction_service.update(
         db=db, 
         db_obj=recurring_transaction, 
         obj_in={
-            "next_date": services.recurring_transaction_service.calculate_next_date(
+            "next_date": recurring_transaction_service.calculate_next_date(
                 recurring_transaction.frequency, 
-                services.recurring_transaction_service.datetime.now().date()
+                datetime.now().date()
             )
         }
     )
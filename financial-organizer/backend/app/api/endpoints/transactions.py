@@ -1,28 +1,94 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api import deps
-from app.db.models import Transaction
-from app.schemas.transaction import TransactionCreate, TransactionUpdate, Transaction as TransactionSchema
-from app.services import transaction_service
+from app.db.models import Card, Transaction
+from app.schemas.merchant import MerchantSpending
+from app.schemas.transaction import (
+    DuplicateCluster,
+    TransactionBulkDelete,
+    TransactionBulkResponse,
+    TransactionBulkUpdate,
+    TransactionCreate,
+    TransactionDetail,
+    TransactionFilters,
+    SpendingRollup,
+    TransactionImportSummary,
+    TransactionSearchResult,
+    TransactionUpdate,
+    Transaction as TransactionSchema,
+)
+from app.services import (
+    dedupe_service, export_service, import_service, merchant_service, rollup_service, search_service,
+    transaction_service,
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[TransactionSchema])
+# Largest number of items accepted by the bulk endpoints
+MAX_BULK_ITEMS = 5000
+
+def _bulk_response(results) -> TransactionBulkResponse:
+    succeeded = sum(1 for result in results if result.ok)
+    return TransactionBulkResponse(
+        succeeded=succeeded, failed=len(results) - succeeded, results=results
+    )
+
+def _check_bulk_size(items: list) -> None:
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per bulk request"
+        )
+
+@router.get("/", response_model=List[TransactionSchema], response_class=ORJSONResponse)
 def read_transactions(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[Decimal] = None,
+    max_amount: Optional[Decimal] = None,
+    category: Optional[List[str]] = Query(None),
+    transaction_type: Optional[str] = None,
+    card_id: Optional[int] = None,
+    merchant: Optional[str] = None,
+    has_receipt: Optional[bool] = None,
+    sort: str = "-date",
     current_user: Any = Depends(deps.get_current_user),
+    etag: str = Depends(deps.check_etag),
 ) -> Any:
     """
-    Retrieve transactions.
+    Retrieve transactions, optionally filtered and sorted.
+    `category` may be repeated; `merchant` matches a prefix of the merchant
+    name; `sort` is date, amount or merchant, with a leading "-" for
+    descending order.
     """
-    transactions = transaction_service.get_multi(
-        db, user_id=current_user.id, skip=skip, limit=limit
+    if sort.lstrip("-") not in transaction_service.SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort key: {sort}")
+    filters = TransactionFilters(
+        start_date=start_date,
+        end_date=end_date,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        categories=category,
+        transaction_type=transaction_type,
+        card_id=card_id,
+        merchant_prefix=merchant,
+        has_receipt=has_receipt,
+        sort=sort,
+    )
+    transactions = transaction_service.get_multi_rows(
+        db, user_id=current_user.id, skip=skip, limit=limit, filters=filters
     )
-    return transactions
+    # Returning the response directly skips response_model validation; the
+    # rows already have the schema's fields and orjson encodes them natively
+    return ORJSONResponse(transactions, headers=deps.etag_headers(etag))
 
 @router.post("/", response_model=TransactionSchema)
 def create_transaction(
@@ -39,6 +105,184 @@ def create_transaction(
     )
     return transaction
 
+@router.post("/bulk", response_model=TransactionBulkResponse)
+def create_transactions_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    transactions_in: List[TransactionCreate],
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Create many transactions in one database transaction.
+    Items that fail validation are reported without blocking the others.
+    """
+    _check_bulk_size(transactions_in)
+    results = transaction_service.create_multi(
+        db=db, objs_in=transactions_in, user_id=current_user.id
+    )
+    return _bulk_response(results)
+
+@router.put("/bulk", response_model=TransactionBulkResponse)
+def update_transactions_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    transactions_in: List[TransactionBulkUpdate],
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Update many transactions in one database transaction.
+    """
+    _check_bulk_size(transactions_in)
+    results = transaction_service.update_multi(
+        db=db, objs_in=transactions_in, user_id=current_user.id
+    )
+    return _bulk_response(results)
+
+@router.post("/bulk/delete", response_model=TransactionBulkResponse)
+def delete_transactions_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    delete_in: TransactionBulkDelete,
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Delete many transactions in one database transaction.
+    """
+    _check_bulk_size(delete_in.ids)
+    results = transaction_service.remove_multi(
+        db=db, ids=delete_in.ids, user_id=current_user.id
+    )
+    return _bulk_response(results)
+
+@router.get("/export")
+def export_transactions(
+    *,
+    export_format: str = Query("csv", alias="format"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Download all transactions as CSV, NDJSON or Parquet.
+    The file is streamed while it is read from the database.
+    """
+    if export_format not in export_service.ENCODERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {export_format}")
+    filename = f"transactions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return StreamingResponse(
+        export_service.stream_export(
+            export_format, user_id=current_user.id, start_date=start_date, end_date=end_date
+        ),
+        media_type=export_service.EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/spending", response_model=List[SpendingRollup])
+def read_spending(
+    *,
+    db: Session = Depends(deps.get_db),
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Monthly spending totals per category and card.
+    """
+    return rollup_service.get_multi(
+        db, user_id=current_user.id, start=start_month, end=end_month
+    )
+
+@router.get("/merchants", response_model=List[MerchantSpending])
+def read_merchant_spending(
+    *,
+    db: Session = Depends(deps.get_db),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Spending per canonical merchant, largest first.
+    """
+    return merchant_service.get_spending(
+        db, user_id=current_user.id, start_date=start_date, end_date=end_date, limit=limit
+    )
+
+@router.get("/duplicates", response_model=List[DuplicateCluster])
+def read_duplicates(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Groups of transactions that look like copies of the same purchase.
+    """
+    return dedupe_service.get_clusters(db, user_id=current_user.id)
+
+@router.get("/search", response_model=List[TransactionSearchResult])
+def search_transactions(
+    *,
+    db: Session = Depends(deps.get_db),
+    q: str = Query(..., min_length=1, max_length=200),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[Decimal] = None,
+    max_amount: Optional[Decimal] = None,
+    category: Optional[str] = None,
+    card_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=search_service.MAX_SEARCH_RESULTS),
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Search transactions by description, merchant and receipt text,
+    best matches first.
+    """
+    return search_service.search(
+        db,
+        user_id=current_user.id,
+        query=q,
+        start_date=start_date,
+        end_date=end_date,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        category=category,
+        card_id=card_id,
+        skip=skip,
+        limit=limit,
+    )
+
+@router.post("/import", response_model=TransactionImportSummary)
+def import_transactions(
+    *,
+    db: Session = Depends(deps.get_db),
+    card_id: int = Form(...),
+    file: UploadFile = File(...),
+    statement_format: Optional[str] = Form(None),
+    invert_sign: bool = Form(False),
+    current_user: Any = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Import a CSV, OFX/QFX or QIF bank statement into a card.
+    Rows that were already imported are skipped.
+    """
+    card = db.query(Card).filter(
+        Card.id == card_id,
+        Card.user_id == current_user.id
+    ).first()
+    if not card:
+        raise HTTPException(status_code=404, detail="Card not found")
+
+    try:
+        fmt = statement_format.lower() if statement_format else import_service.detect_format(file.filename)
+        # The upload is spooled to disk by Starlette; read it as a text stream
+        stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+        return import_service.import_statement(
+            db, stream, fmt=fmt, user_id=current_user.id, card_id=card_id, invert_sign=invert_sign
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.put("/{transaction_id}", response_model=TransactionSchema)
 def update_transaction(
     *,
@@ -60,17 +304,25 @@ def update_transaction(
     )
     return transaction
 
-@router.get("/{transaction_id}", response_model=TransactionSchema)
+@router.get("/{transaction_id}", response_model=TransactionDetail)
 def read_transaction(
     *,
     db: Session = Depends(deps.get_db),
     transaction_id: int,
+    embed: Optional[str] = None,
     current_user: Any = Depends(deps.get_current_user),
+    etag: str = Depends(deps.check_etag),
 ) -> Any:
     """
     Get transaction by ID.
+    `embed` is a comma-separated list of card and receipt, returned with the
+    transaction instead of being requested separately.
     """
-    transaction = transaction_service.get(db=db, id=transaction_id)
+    names = {name.strip() for name in (embed or "").split(",") if name.strip()}
+    unknown = names.difference(transaction_service.EMBEDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported embed: {', '.join(sorted(unknown))}")
+    transaction = transaction_service.get(db=db, id=transaction_id, embed=names)
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     if transaction.user_id != current_user.id:
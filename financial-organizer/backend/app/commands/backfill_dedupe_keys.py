@@ -0,0 +1,31 @@
+"""
+Compute the duplicate-detection key of existing transactions, in chunks
+that are committed as they go, so the job can be stopped and run again:
+
+    cd backend && python -m app.commands.backfill_dedupe_keys [--user-id 1] [--chunk-size 10000]
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from app.db.session import SessionLocal
+from app.services import dedupe_service
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compute dedupe keys of existing transactions.")
+    parser.add_argument("--user-id", type=int, help="default: every user")
+    parser.add_argument("--chunk-size", type=int, default=dedupe_service.BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        keyed = dedupe_service.backfill(db, user_id=args.user_id, chunk_size=args.chunk_size)
+        print(f"Keyed {keyed} transactions")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
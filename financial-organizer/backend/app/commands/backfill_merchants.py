@@ -0,0 +1,30 @@
+"""
+Link existing transactions to their canonical merchant, in chunks that are
+committed as they go, so the job can be stopped and run again:
+
+    cd backend && python -m app.commands.backfill_merchants [--chunk-size 10000]
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from app.db.session import SessionLocal
+from app.services import merchant_service
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Link transactions to their canonical merchant.")
+    parser.add_argument("--chunk-size", type=int, default=merchant_service.BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        linked = merchant_service.backfill(db, chunk_size=args.chunk_size)
+        print(f"Linked {linked} transactions to their merchant")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
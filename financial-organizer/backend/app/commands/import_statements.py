@@ -0,0 +1,56 @@
+"""
+Import a bank statement without going through the API:
+
+    cd backend && python -m app.commands.import_statements \
+        --email user@example.com --card-id 3 statement.ofx
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from app.db.models import Card, User
+from app.db.session import SessionLocal
+from app.services import import_service
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import a CSV, OFX/QFX or QIF statement.")
+    parser.add_argument("path", help="statement file")
+    parser.add_argument("--email", required=True, help="owner of the card")
+    parser.add_argument("--card-id", type=int, required=True)
+    parser.add_argument("--format", choices=sorted(import_service.PARSERS), help="default: from the file extension")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    parser.add_argument("--invert-sign", action="store_true", help="treat positive amounts as purchases")
+    parser.add_argument("--chunk-size", type=int, default=import_service.IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == args.email).first()
+        if not user:
+            print(f"No user with email {args.email}")
+            return 1
+        card = db.query(Card).filter(Card.id == args.card_id, Card.user_id == user.id).first()
+        if not card:
+            print(f"Card {args.card_id} not found for {args.email}")
+            return 1
+
+        fmt = args.format or import_service.detect_format(args.path)
+        with open(args.path, encoding=args.encoding, errors="replace", newline="") as stream:
+            summary = import_service.import_statement(
+                db,
+                stream,
+                fmt=fmt,
+                user_id=user.id,
+                card_id=card.id,
+                invert_sign=args.invert_sign,
+                chunk_size=args.chunk_size,
+            )
+        print(summary.model_dump_json(indent=2))
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Load exchange rates from CSV files with date, currency and rate columns (the
+value of one unit of the currency in USD), then rebuild the spending rollups
+of the users with transactions in the currencies that changed:
+
+    cd backend && python -m app.commands.load_fx_rates [rates.csv ...]
+
+Without paths, every *.csv file in settings.FX_RATES_DIR is loaded.
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.models import Transaction
+from app.db.session import SessionLocal
+from app.services import fx_service, rollup_service
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load exchange rates into the exchange_rates table.")
+    parser.add_argument("paths", nargs="*", type=Path, help=f"default: {settings.FX_RATES_DIR}/*.csv")
+    parser.add_argument("--chunk-size", type=int, default=fx_service.LOAD_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    paths = args.paths or sorted(Path(settings.FX_RATES_DIR).glob("*.csv"))
+    if not paths:
+        print(f"No rate files in {settings.FX_RATES_DIR}")
+        return 1
+
+    db = SessionLocal()
+    try:
+        currencies = set()
+        for path in paths:
+            with open(path, newline="") as stream:
+                try:
+                    currencies |= fx_service.load_rates(db, fx_service.parse_rates(stream), chunk_size=args.chunk_size)
+                except ValueError as e:
+                    print(f"{path}: {e}")
+                    return 1
+        print(f"Loaded rates for {len(currencies)} currencies")
+
+        # Rollups hold converted amounts, so the ones in these currencies are stale
+        user_ids = list(db.scalars(
+            select(Transaction.user_id).where(Transaction.currency.in_(currencies)).distinct()
+        )) if currencies else []
+        if user_ids:
+            written = rollup_service.rebuild(db, user_ids=user_ids)
+            print(f"Rebuilt {written} rollups for {len(user_ids)} users")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""
+Backfill or repair the item price rollups from the receipt line items:
+
+    cd backend && python -m app.commands.rebuild_item_prices [--user-id 1 --user-id 2]
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from app.db.session import SessionLocal
+from app.services import item_price_service
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the item_price_rollups table.")
+    parser.add_argument("--user-id", type=int, action="append", help="default: every user")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        written = item_price_service.rebuild(db, user_ids=args.user_id)
+        print(f"Wrote {written} item price rollups")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""
+Backfill or repair the monthly spending rollups from the transactions table:
+
+    cd backend && python -m app.commands.rebuild_rollups [--user-id 1 --user-id 2]
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from app.db.session import SessionLocal
+from app.services import rollup_service
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the spending_rollups table.")
+    parser.add_argument("--user-id", type=int, action="append", help="default: every user")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        written = rollup_service.rebuild(db, user_ids=args.user_id)
+        print(f"Wrote {written} rollups")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
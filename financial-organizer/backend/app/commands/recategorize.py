@@ -0,0 +1,36 @@
+"""
+Apply the category rules again to transactions that were not categorized
+by hand, optionally installing the default global rules first:
+
+    cd backend && python -m app.commands.recategorize [--install-defaults] [--user-id 1 --user-id 2]
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from app.db.session import SessionLocal
+from app.services import categorization_service
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-categorize transactions from the category rules.")
+    parser.add_argument("--user-id", type=int, action="append", help="default: every user")
+    parser.add_argument(
+        "--install-defaults", action="store_true", help="add the missing default global rules first"
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.install_defaults:
+            added = categorization_service.install_default_rules(db)
+            print(f"Added {added} global rules")
+        result = categorization_service.recategorize(db, user_ids=args.user_id)
+        print(f"Scanned {result.scanned} transactions, re-categorized {result.updated}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import weakref
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Returned by VersionedLRU.get() for missing and stale entries, as None is a
+# value the caches store
+MISSING = object()
+
+_caches: "weakref.WeakSet[VersionedLRU]" = weakref.WeakSet()
+
+
+class VersionedLRU:
+    """
+    In-process cache of at most `maxsize` entries, least recently used first.
+    Each entry is stored with the version of the data it was computed from
+    (a row count and latest updated_at, a data version, ...) and only served
+    while the caller reads the same version, so other workers' writes are
+    seen without any invalidation.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        _caches.add(self)
+
+    def get(self, key: Hashable, version: Any) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return MISSING
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, version: Any, value: Any) -> None:
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def clear_all() -> None:
+    """Empty every VersionedLRU of the process."""
+    for cache in list(_caches):
+        cache.clear()
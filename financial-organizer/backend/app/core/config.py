@@ -47,6 +47,21 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10 MB
     
+    # Directory of exchange rate files loaded by app.commands.load_fx_rates
+    FX_RATES_DIR: str = "fx_rates"
+    
+    # Statements slower than this are printed with the request they ran in
+    SLOW_STATEMENT_SECONDS: float = 1.0
+    
+    # Client addresses /metrics is served to; behind a proxy, run uvicorn
+    # with --proxy-headers so the address is the real client's
+    METRICS_ALLOWED_HOSTS: List[str] = ["127.0.0.1", "::1"]
+    
+    # Recurring transaction scheduler
+    RECURRING_SCHEDULER_ENABLED: bool = True
+    RECURRING_SCHEDULER_INTERVAL_SECONDS: int = 15 * 60  # 15 minutes
+    RECURRING_SCHEDULER_BATCH_SIZE: int = 1000
+    
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,42 @@
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Annotated, Any, Optional
+
+from pydantic import AfterValidator, PlainSerializer
+
+# Amounts are stored as integer minor units (cents) of their currency
+DEFAULT_CURRENCY = "USD"
+CENT = Decimal("0.01")
+
+
+def to_decimal(amount: Any) -> Optional[Decimal]:
+    """
+    An amount as a Decimal rounded half up to cents. Floats are read through
+    their shortest repr, so 0.1 becomes Decimal("0.10") and not the binary
+    value.
+    """
+    if amount is None:
+        return None
+    if isinstance(amount, float):
+        amount = repr(amount)
+    return Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def to_cents(amount: Any) -> Optional[int]:
+    """
+    Integer cents of an amount given as a Decimal, float, int or string.
+    """
+    amount = to_decimal(amount)
+    return None if amount is None else int(amount.scaleb(2))
+
+
+def from_cents(cents: Optional[int]) -> Optional[Decimal]:
+    return None if cents is None else Decimal(cents).scaleb(-2)
+
+
+# Decimal amount in schemas. Input is rounded to cents; JSON output stays a
+# number, whose shortest repr is the exact two-decimal value.
+Money = Annotated[
+    Decimal,
+    AfterValidator(lambda amount: amount.quantize(CENT, rounding=ROUND_HALF_UP)),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
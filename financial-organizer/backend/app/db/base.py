@@ -6,6 +6,9 @@ Base = declarative_base()
 
 class BaseModel(Base):
     __abstract__ = True
+    # Fetch server-generated columns with INSERT/UPDATE ... RETURNING during
+    # the flush instead of a follow-up SELECT (db.refresh) after commit.
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, JSON, Boolean, Date
+from sqlalchemy import false, func, text, BigInteger, Column, Integer, String, Float, DateTime, ForeignKey, Enum, JSON, Boolean, Date, Index, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+from app.core.money import DEFAULT_CURRENCY, from_cents, to_cents
 from .base import BaseModel
 
 class TransactionType(enum.Enum):
@@ -24,11 +25,16 @@ class User(BaseModel):
     hashed_password = Column(String)
     full_name = Column(String)
     is_active = Column(Boolean, default=True)
+    # Bumped on every write to the user's transactions, cards, schedules or
+    # budgets; list responses use it as their ETag
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     
-    # Relationships
-    transactions = relationship("Transaction", back_populates="user")
-    cards = relationship("Card", back_populates="user")
-    recurring_transactions = relationship("RecurringTransaction", back_populates="user")
+    # Relationships. None of them load on attribute access: queries that
+    # read a relationship load it explicitly (selectinload, joinedload), so
+    # a loop over rows can't turn into one query per row.
+    transactions = relationship("Transaction", back_populates="user", lazy="raise_on_sql")
+    cards = relationship("Card", back_populates="user", lazy="raise_on_sql")
+    recurring_transactions = relationship("RecurringTransaction", back_populates="user", lazy="raise_on_sql")
 
 class Card(BaseModel):
     __tablename__ = "cards"
@@ -41,15 +47,44 @@ class Card(BaseModel):
     plaid_item_id = Column(String, unique=True)
     
     # Relationships
-    user = relationship("User", back_populates="cards")
-    transactions = relationship("Transaction", back_populates="card")
+    user = relationship("User", back_populates="cards", lazy="raise_on_sql")
+    # Detached from deleted cards by card_service.remove with one UPDATE
+    # rather than loading every transaction of the card
+    transactions = relationship("Transaction", back_populates="card", lazy="raise_on_sql", passive_deletes="all")
 
 class Transaction(BaseModel):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_user_fingerprint", "user_id", "fingerprint"),
+        Index("ix_transactions_user_date", "user_id", "date"),
+        # Filters and sort keys of the transaction list
+        Index("ix_transactions_user_amount", "user_id", "amount_cents"),
+        Index("ix_transactions_user_category_date", "user_id", "category", "date"),
+        Index("ix_transactions_user_card_date", "user_id", "card_id", "date"),
+        Index(
+            "ix_transactions_user_merchant",
+            "user_id",
+            func.lower(text("merchant_name")).label("merchant_lower"),
+            postgresql_ops={"merchant_lower": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_transactions_user_receipt_date",
+            "user_id",
+            "date",
+            postgresql_where=text("receipt_path IS NOT NULL"),
+            sqlite_where=text("receipt_path IS NOT NULL"),
+        ),
+        # Spending per merchant
+        Index("ix_transactions_user_merchant_id", "user_id", "merchant_id"),
+        # Duplicate lookups on write and the duplicate scan
+        Index("ix_transactions_user_dedupe_date", "user_id", "dedupe_key", "date"),
+    )
 
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     card_id = Column(Integer, ForeignKey("cards.id"))
-    amount = Column(Float)
+    # Integer minor units of currency; see the amount property
+    amount_cents = Column(BigInteger)
+    currency = Column(String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
     description = Column(String)
     transaction_type = Column(String)
     category = Column(String)
@@ -57,30 +92,140 @@ class Transaction(BaseModel):
     date = Column(DateTime)
     plaid_transaction_id = Column(String, unique=True)
     receipt_path = Column(String, nullable=True)
-    ocr_data = Column(JSON, nullable=True)
-    grocery_items = Column(JSON, nullable=True)
+    # OCR text of the receipt, searched with the description and merchant;
+    # the parsed receipt is kept on Receipt and its items in ReceiptLineItem
+    receipt_text = Column(Text, nullable=True)
+    # Set on statement imports, used to skip rows that were already imported
+    fingerprint = Column(String, nullable=True)
+    # Rule that set the category; None when the category was set by hand or
+    # is still the default
+    category_rule_id = Column(Integer, ForeignKey("category_rules.id", ondelete="SET NULL"), nullable=True, index=True)
+    # Whether the category was predicted from the user's history; such
+    # categories are not learned from and give way to rules
+    category_predicted = Column(Boolean, nullable=False, default=False, server_default=false())
+    # Canonical merchant of merchant_name (or the description when there is
+    # none); merchant_name keeps the raw text
+    merchant_id = Column(Integer, ForeignKey("merchants.id"), nullable=True)
+    # Hash of (type, amount in cents, canonical merchant) that copies of one
+    # purchase share; see dedupe_service
+    dedupe_key = Column(BigInteger, nullable=True)
+    # Earlier transaction this one appears to repeat
+    duplicate_of_id = Column(Integer, ForeignKey("transactions.id", ondelete="SET NULL"), nullable=True)
     
     # Relationships
-    user = relationship("User", back_populates="transactions")
-    card = relationship("Card", back_populates="transactions")
-    receipt = relationship("Receipt", back_populates="transaction", uselist=False)
+    user = relationship("User", back_populates="transactions", lazy="raise_on_sql")
+    card = relationship("Card", back_populates="transactions", lazy="raise_on_sql")
+    receipt = relationship("Receipt", back_populates="transaction", uselist=False, lazy="raise_on_sql")
+
+    @property
+    def amount(self):
+        return from_cents(self.amount_cents)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = to_cents(value)
+
+# Canonical merchant that raw merchant names are normalized and interned to
+class Merchant(BaseModel):
+    __tablename__ = "merchants"
+
+    name = Column(String, nullable=False, unique=True, index=True)
+    display_name = Column(String, nullable=False)
+
+# Value of one unit of a currency in DEFAULT_CURRENCY, from `date` until the
+# currency's next loaded rate (valid_until, exclusive; None for the latest),
+# so a transaction's rate is found with one range join
+class ExchangeRate(BaseModel):
+    __tablename__ = "exchange_rates"
+    __table_args__ = (
+        UniqueConstraint("currency", "date", name="uq_exchange_rates_currency_date"),
+    )
+
+    currency = Column(String(3), nullable=False)
+    date = Column(Date, nullable=False)
+    rate = Column(Float, nullable=False)
+    valid_until = Column(Date, nullable=True)
+
+# Assigns a category to transactions that match all of its conditions.
+# Rules without a user apply to every user, after the user's own rules.
+class CategoryRule(BaseModel):
+    __tablename__ = "category_rules"
+
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=True)
+    category = Column(String, nullable=False)
+    # Case-insensitive whole-word phrase and regular expression on the merchant name
+    # (the description when there is no merchant name)
+    merchant_contains = Column(String, nullable=True)
+    merchant_pattern = Column(String, nullable=True)
+    min_amount = Column(Float, nullable=True)
+    max_amount = Column(Float, nullable=True)
+    card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), nullable=True)
+    # Lower values are tried first
+    priority = Column(Integer, nullable=False, default=100)
+    is_active = Column(Boolean, default=True)
 
 class Receipt(BaseModel):
     __tablename__ = "receipts"
 
-    transaction_id = Column(Integer, ForeignKey("transactions.id"))
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), index=True)
     file_path = Column(String)
     ocr_data = Column(JSON)
 
     # Relationships
-    transaction = relationship("Transaction", back_populates="receipt")
+    transaction = relationship("Transaction", back_populates="receipt", lazy="raise_on_sql")
+    line_items = relationship(
+        "ReceiptLineItem",
+        back_populates="receipt",
+        order_by="ReceiptLineItem.id",
+        cascade="all, delete-orphan",
+        lazy="raise_on_sql",
+    )
+
+# One item printed on a receipt, written once from the OCR result. Prices
+# are integer cents in the currency of the receipt's transaction; user_id is
+# copied from it so spending on an item is read through the user's indexes.
+class ReceiptLineItem(BaseModel):
+    __tablename__ = "receipt_line_items"
+    __table_args__ = (
+        Index("ix_receipt_line_items_user_sku", "user_id", "sku"),
+        Index("ix_receipt_line_items_user_name", "user_id", func.lower(text("name")).label("name_lower")),
+        Index("ix_receipt_line_items_user_item", "user_id", "item_key"),
+    )
+
+    receipt_id = Column(Integer, ForeignKey("receipts.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Item code printed on the receipt (SKU, UPC or PLU), when there is one
+    sku = Column(String, nullable=True)
+    name = Column(String, nullable=False)
+    # The code, or the normalized name of items without one; see
+    # item_price_service.item_key
+    item_key = Column(String, nullable=False)
+    quantity = Column(Float, nullable=False, default=1)
+    unit_price_cents = Column(BigInteger, nullable=True)
+    total_cents = Column(BigInteger, nullable=False)
+
+    # Relationships
+    receipt = relationship("Receipt", back_populates="line_items", lazy="raise_on_sql")
+
+    @property
+    def unit_price(self):
+        return from_cents(self.unit_price_cents)
+
+    @property
+    def total(self):
+        return from_cents(self.total_cents)
 
 class RecurringTransaction(BaseModel):
     __tablename__ = "recurring_transactions"
+    __table_args__ = (
+        # Covers the due-schedule scan in process_due_recurring_transactions
+        Index("ix_recurring_transactions_due", "is_active", "next_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    amount = Column(Float, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    amount_cents = Column(BigInteger, nullable=False)
+    currency = Column(String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
     transaction_type = Column(String, nullable=False)
     category = Column(String, nullable=False)
     description = Column(String, nullable=True)
@@ -92,4 +237,126 @@ class RecurringTransaction(BaseModel):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    user = relationship("User", back_populates="recurring_transactions") 
\ No newline at end of file
+    user = relationship("User", back_populates="recurring_transactions", lazy="raise_on_sql")
+
+    @property
+    def amount(self):
+        return from_cents(self.amount_cents)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = to_cents(value)
+
+# Subscriptions detected in a user's transaction history
+class RecurringSuggestion(BaseModel):
+    __tablename__ = "recurring_suggestions"
+    __table_args__ = (
+        UniqueConstraint("user_id", "merchant_key", "amount_band", name="uq_recurring_suggestions_group"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    merchant_key = Column(String, nullable=False)
+    amount_band = Column(Integer, nullable=False)
+    merchant_name = Column(String)
+    description = Column(String)
+    amount = Column(Float, nullable=False)
+    transaction_type = Column(String)
+    category = Column(String)
+    frequency = Column(String, nullable=False)
+    last_date = Column(Date, nullable=False)
+    next_date = Column(Date, nullable=False)
+    occurrences = Column(Integer, nullable=False)
+    confidence = Column(Float, nullable=False)
+    is_dismissed = Column(Boolean, default=False)
+
+# Watermark of an incremental batch job over the transactions table
+class JobState(BaseModel):
+    __tablename__ = "job_states"
+
+    name = Column(String, unique=True, nullable=False)
+    last_transaction_id = Column(Integer, nullable=False, default=0)
+    last_run_at = Column(DateTime)
+
+# Prices paid for an item per (user, item, day, store, currency), recomputed
+# from the line items whenever an item's receipts or their transactions
+# change. Amounts are in cents of the currency paid.
+class ItemPriceRollup(BaseModel):
+    __tablename__ = "item_price_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "item_key", "day", "merchant_id", "currency", name="uq_item_price_rollups_key"
+        ),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    item_key = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    # 0 for transactions without a merchant, so the unique key has no NULLs
+    merchant_id = Column(Integer, nullable=False, default=0)
+    currency = Column(String(3), nullable=False)
+    quantity = Column(Float, nullable=False, default=0)
+    total_cents = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    min_unit_cents = Column(BigInteger)
+    max_unit_cents = Column(BigInteger)
+
+# Monthly spending per (user, month, category, card), kept up to date by the
+# services that write transactions. Refunds count as negative spending.
+# Amounts are in cents.
+class SpendingRollup(BaseModel):
+    __tablename__ = "spending_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "month", "category", "card_id", name="uq_spending_rollups_key"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # First day of the month
+    month = Column(Date, nullable=False)
+    category = Column(String, nullable=False)
+    # 0 for transactions without a card, so the unique key has no NULLs
+    card_id = Column(Integer, nullable=False, default=0)
+    total_cents = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    min_cents = Column(BigInteger)
+    max_cents = Column(BigInteger)
+
+    @property
+    def total(self):
+        return from_cents(self.total_cents)
+
+    @property
+    def min_amount(self):
+        return from_cents(self.min_cents)
+
+    @property
+    def max_amount(self):
+        return from_cents(self.max_cents)
+
+# Monthly spending limit for one category
+class Budget(BaseModel):
+    __tablename__ = "budgets"
+    __table_args__ = (
+        UniqueConstraint("user_id", "category", name="uq_budgets_user_category"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    category = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    # Share of the amount at which a warning event is recorded
+    alert_threshold = Column(Float, nullable=False, default=0.8)
+    is_active = Column(Boolean, default=True)
+
+# A budget crossing one of its thresholds in a month, recorded once
+class BudgetEvent(BaseModel):
+    __tablename__ = "budget_events"
+    __table_args__ = (
+        UniqueConstraint("budget_id", "month", "threshold", name="uq_budget_events_threshold"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    budget_id = Column(Integer, ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False)
+    month = Column(Date, nullable=False)
+    category = Column(String, nullable=False)
+    threshold = Column(Float, nullable=False)
+    spent = Column(Float, nullable=False)
+    budget_amount = Column(Float, nullable=False)
@@ -0,0 +1,9 @@
+from typing import Any
+
+
+def row_field(row: Any, name: str) -> Any:
+    """
+    A column of a transaction row given as an ORM object, a Row tuple or one
+    of the dicts used for bulk inserts and updates; None when it is absent.
+    """
+    return row.get(name) if isinstance(row, dict) else getattr(row, name, None)
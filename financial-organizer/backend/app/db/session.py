@@ -3,7 +3,11 @@ from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
 engine = create_engine(str(settings.DATABASE_URL), pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False keeps flushed objects populated after commit, so the
+# services can return them without reloading every row with a SELECT.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 
 def get_db():
     db = SessionLocal()
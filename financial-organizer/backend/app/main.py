@@ -1,5 +1,6 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
@@ -7,6 +8,8 @@ from app.api.api import api_router
 from app.core.config import settings
 from app.db.session import engine
 from app.db.base import Base
+from app.middleware import Instrumentation, metrics
+from app.services.scheduler_service import recurring_scheduler
 
 # Commented out: we'll use Alembic for database migrations instead
 # Base.metadata.create_all(bind=engine)
@@ -25,8 +28,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser dev tools read the timings of cross-origin requests
+    expose_headers=["Server-Timing"],
 )
 
+# Statement count, database time and handler time of each request, in the
+# Server-Timing header and in /metrics. Added last so it wraps CORS too.
+app.add_middleware(Instrumentation, engine=engine)
+
 # Include the API router under the versioned path
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -40,7 +49,31 @@ if not os.path.exists(uploads_dir):
     os.makedirs(uploads_dir)
 app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
 
+# Process due recurring transactions periodically. Every worker runs the
+# loop; an advisory lock makes sure only one of them processes each tick.
+@app.on_event("startup")
+async def start_recurring_scheduler():
+    if settings.RECURRING_SCHEDULER_ENABLED:
+        recurring_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_recurring_scheduler():
+    await recurring_scheduler.stop()
+
 @app.get("/", tags=["Health"])
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "version": "0.1.0"} 
\ No newline at end of file
+    return {"status": "healthy", "version": "0.1.0"}
+
+@app.get("/health/scheduler", tags=["Health"])
+async def scheduler_status():
+    """Last run duration and rows processed by the recurring scheduler"""
+    return recurring_scheduler.status() 
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def read_metrics(request: Request):
+    """Per-route request and database time histograms of this worker, for Prometheus"""
+    # Only for the scraper on the host or listed in METRICS_ALLOWED_HOSTS
+    if request.client is None or request.client.host not in settings.METRICS_ALLOWED_HOSTS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,7 +1,10 @@
 from .rate_limiter import RateLimiter, RateLimitError
 from .input_validator import InputValidator, InputValidationError
+from .instrumentation import Instrumentation, metrics
 
 __all__ = [
+    "Instrumentation",
+    "metrics",
     "RateLimiter",
     "RateLimitError",
     "InputValidator",
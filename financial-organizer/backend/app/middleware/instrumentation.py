@@ -0,0 +1,218 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+# Upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+# Label of requests that matched no route, so that scanned URLs don't each
+# get their own series
+UNMATCHED_ROUTE = "unmatched"
+
+# Longest statement text printed for slow statements
+STATEMENT_PRINT_LENGTH = 500
+
+
+class RequestStats:
+    """Database work done while handling one request."""
+
+    __slots__ = ("statements", "db_seconds", "slowest_seconds", "slowest_statement")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+# Stats of the request being handled. Sync endpoints and dependencies run
+# in a threadpool with a copy of the context, which still points at the
+# same RequestStats.
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("instrumentation_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("instrumentation_started")
+    if stats is not None and started:
+        stats.add(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("instrumentation_started"):
+        conn.info["instrumentation_started"].pop()
+
+
+def instrument_engine(engine: Union[Engine, Type[Engine]] = Engine) -> None:
+    """
+    Time the statements an engine (every engine by default) sends while a
+    request is being handled. Statements outside requests, like those of
+    the recurring scheduler, are not timed.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # One count per bucket, the last for values above every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# (name, description, buckets) of the per-route histograms
+METRICS = (
+    ("http_request_duration_seconds", "Time spent handling requests.", SECONDS_BUCKETS),
+    ("http_request_db_statements", "SQL statements sent per request.", STATEMENT_BUCKETS),
+    ("http_request_db_duration_seconds", "Time spent in SQL statements per request.", SECONDS_BUCKETS),
+    ("http_request_db_slowest_statement_seconds", "Slowest SQL statement of each request.", SECONDS_BUCKETS),
+)
+
+# (method, route)
+RouteKey = Tuple[str, str]
+
+
+class Metrics:
+    """
+    Per-route histograms of the requests handled by this process. Each
+    worker keeps its own; Prometheus scrapes and sums them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[RouteKey, Histogram]] = {name: {} for name, _, _ in METRICS}
+
+    def observe(self, key: RouteKey, handler_seconds: float, stats: RequestStats) -> None:
+        values = (handler_seconds, stats.statements, stats.db_seconds, stats.slowest_seconds)
+        with self._lock:
+            for (name, _, buckets), value in zip(METRICS, values):
+                histogram = self._histograms[name].get(key)
+                if histogram is None:
+                    histogram = self._histograms[name][key] = Histogram(buckets)
+                histogram.observe(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            for histograms in self._histograms.values():
+                histograms.clear()
+
+    def render(self) -> str:
+        """The histograms in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, description, buckets in METRICS:
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+                for (method, route), histogram in sorted(self._histograms[name].items()):
+                    labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+                    cumulative = 0
+                    for bound, count in zip([*buckets, "+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+def _server_timing(handler_seconds: float, stats: RequestStats) -> str:
+    return ", ".join([
+        f'db;desc="{stats.statements} statements";dur={stats.db_seconds * 1000:.1f}',
+        f"db-slowest;dur={stats.slowest_seconds * 1000:.1f}",
+        f"app;dur={handler_seconds * 1000:.1f}",
+    ])
+
+
+class Instrumentation:
+    """
+    ASGI middleware recording, for each HTTP request, the SQL statements
+    sent, the time spent in them, the slowest of them and the handler time.
+    The numbers are returned in a Server-Timing header (the handler time up
+    to the response headers) and kept per route in `metrics` (the handler
+    time up to the end of the body). Statements slower than
+    SLOW_STATEMENT_SECONDS are printed.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        *,
+        engine: Union[Engine, Type[Engine]] = Engine,
+        exclude_paths: Sequence[str] = ("/metrics",),
+        slow_statement_seconds: float = settings.SLOW_STATEMENT_SECONDS,
+    ):
+        self.app = app
+        self.exclude_paths = tuple(exclude_paths)
+        self.slow_statement_seconds = slow_statement_seconds
+        instrument_engine(engine)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _server_timing(time.perf_counter() - started, stats))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            metrics.observe((scope["method"], path), time.perf_counter() - started, stats)
+            if stats.slowest_seconds > self.slow_statement_seconds:
+                print(
+                    f"Slow statement ({stats.slowest_seconds * 1000:.0f} ms) in {scope['method']} {path}: "
+                    f"{stats.slowest_statement[:STATEMENT_PRINT_LENGTH]}"
+                )
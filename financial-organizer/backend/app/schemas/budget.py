@@ -0,0 +1,70 @@
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field, validator
+
+from app.core.money import Money
+from app.db.models import Category
+
+CATEGORIES = [c.value for c in Category]
+
+
+class BudgetBase(BaseModel):
+    category: str
+    amount: float = Field(..., gt=0)
+    alert_threshold: float = Field(0.8, gt=0, le=1)
+
+
+class BudgetCreate(BudgetBase):
+    @validator('category')
+    def validate_category(cls, v):
+        v = v.lower()
+        if v not in CATEGORIES:
+            raise ValueError(f'Category must be one of {", ".join(CATEGORIES)}')
+        return v
+
+
+class BudgetUpdate(BaseModel):
+    amount: Optional[float] = Field(None, gt=0)
+    alert_threshold: Optional[float] = Field(None, gt=0, le=1)
+    is_active: Optional[bool] = None
+
+
+class Budget(BudgetBase):
+    id: int
+    user_id: int
+    is_active: bool = True
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class BudgetStatusItem(BaseModel):
+    budget_id: int
+    category: str
+    limit: Money
+    spent: Money
+    remaining: Money
+    ratio: float
+    over_threshold: bool
+    over_budget: bool
+
+
+class BudgetStatus(BaseModel):
+    month: date
+    budgets: List[BudgetStatusItem]
+
+
+class BudgetEvent(BaseModel):
+    id: int
+    budget_id: int
+    month: date
+    category: str
+    threshold: float
+    spent: float
+    budget_amount: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
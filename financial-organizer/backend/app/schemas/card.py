@@ -25,4 +25,13 @@ class Card(CardInDBBase):
     pass
 
 class CardInDB(CardInDBBase):
-    pass 
\ No newline at end of file
+    pass 
+
+# Card shown with a transaction, without its number or Plaid item
+class CardSummary(BaseModel):
+    id: int
+    card_type: str
+    last_four: str
+
+    class Config:
+        from_attributes = True
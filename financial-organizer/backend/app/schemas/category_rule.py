@@ -0,0 +1,101 @@
+import re
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field, model_validator, validator
+
+from app.db.models import Category
+
+CATEGORIES = [c.value for c in Category]
+
+
+class CategoryRuleBase(BaseModel):
+    category: str
+    merchant_contains: Optional[str] = None
+    merchant_pattern: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    card_id: Optional[int] = None
+    priority: int = Field(100, ge=0)
+
+
+def _validate_category(v):
+    v = v.lower()
+    if v not in CATEGORIES:
+        raise ValueError(f'Category must be one of {", ".join(CATEGORIES)}')
+    return v
+
+
+def _clean_contains(v):
+    if v is None:
+        return None
+    return v.strip().lower() or None
+
+
+def _validate_pattern(v):
+    try:
+        re.compile(v)
+    except re.error as e:
+        raise ValueError(f'Invalid merchant pattern: {e}')
+    return v
+
+
+class CategoryRuleCreate(CategoryRuleBase):
+    @validator('category')
+    def validate_category(cls, v):
+        return _validate_category(v)
+
+    @validator('merchant_contains')
+    def validate_contains(cls, v):
+        return _clean_contains(v)
+
+    @validator('merchant_pattern')
+    def validate_pattern(cls, v):
+        return _validate_pattern(v) if v else None
+
+    @model_validator(mode='after')
+    def validate_conditions(self):
+        if not any(
+            value is not None
+            for value in (self.merchant_contains, self.merchant_pattern, self.min_amount, self.max_amount, self.card_id)
+        ):
+            raise ValueError('A rule needs at least one condition')
+        return self
+
+
+class CategoryRuleUpdate(BaseModel):
+    category: Optional[str] = None
+    merchant_contains: Optional[str] = None
+    merchant_pattern: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    card_id: Optional[int] = None
+    priority: Optional[int] = Field(None, ge=0)
+    is_active: Optional[bool] = None
+
+    @validator('category')
+    def validate_category(cls, v):
+        return _validate_category(v) if v is not None else None
+
+    @validator('merchant_contains')
+    def validate_contains(cls, v):
+        return _clean_contains(v)
+
+    @validator('merchant_pattern')
+    def validate_pattern(cls, v):
+        return _validate_pattern(v) if v else None
+
+
+class CategoryRule(CategoryRuleBase):
+    id: int
+    user_id: Optional[int] = None
+    is_active: bool = True
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CategoryRuleApplyResult(BaseModel):
+    scanned: int
+    updated: int
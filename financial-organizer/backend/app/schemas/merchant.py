@@ -0,0 +1,14 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+from app.core.money import Money
+
+
+class MerchantSpending(BaseModel):
+    merchant_id: int
+    name: str
+    display_name: str
+    total: Money
+    count: int
+    last_date: Optional[datetime] = None
@@ -1,5 +1,24 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from datetime import date, datetime
 from pydantic import BaseModel
+from app.core.money import Money
+
+class ReceiptLineItemBase(BaseModel):
+    sku: Optional[str] = None
+    name: str
+    quantity: float = 1
+    unit_price: Optional[Money] = None
+    total: Money
+
+class ReceiptLineItemCreate(ReceiptLineItemBase):
+    pass
+
+class ReceiptLineItem(ReceiptLineItemBase):
+    id: int
+    receipt_id: int
+
+    class Config:
+        from_attributes = True
 
 class ReceiptBase(BaseModel):
     transaction_id: int
@@ -7,7 +26,7 @@ class ReceiptBase(BaseModel):
     ocr_data: Dict[str, Any]
 
 class ReceiptCreate(ReceiptBase):
-    pass
+    line_items: List[ReceiptLineItemCreate] = []
 
 class ReceiptUpdate(ReceiptBase):
     transaction_id: Optional[int] = None
@@ -21,7 +40,36 @@ class ReceiptInDBBase(ReceiptBase):
         from_attributes = True
 
 class Receipt(ReceiptInDBBase):
-    pass
+    line_items: List[ReceiptLineItem] = []
 
 class ReceiptInDB(ReceiptInDBBase):
-    pass 
\ No newline at end of file
+    pass
+
+# Spending on one item across the user's receipts
+class ItemSpending(BaseModel):
+    sku: Optional[str] = None
+    name: Optional[str] = None
+    total: Money
+    quantity: float
+    count: int
+    last_date: Optional[datetime] = None
+
+# Prices paid for an item at one store on one day
+class ItemPricePoint(BaseModel):
+    date: date
+    merchant_id: Optional[int] = None
+    merchant: Optional[str] = None
+    currency: str
+    # Average over the day's purchases, weighted by quantity
+    unit_price: Optional[Money] = None
+    min_unit_price: Optional[Money] = None
+    max_unit_price: Optional[Money] = None
+    quantity: float
+    total: Money
+    count: int
+
+class ItemPriceHistory(BaseModel):
+    item_key: str
+    points: List[ItemPricePoint]
+    # Change of the average unit price from the first month to the last
+    price_change: Optional[float] = None
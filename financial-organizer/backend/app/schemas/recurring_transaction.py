@@ -1,8 +1,10 @@
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 from pydantic import BaseModel, Field, validator
 
+from app.core.money import DEFAULT_CURRENCY, Money
+
 
 class FrequencyEnum(str, Enum):
     daily = "daily"
@@ -14,7 +16,8 @@ class FrequencyEnum(str, Enum):
 
 
 class RecurringTransactionBase(BaseModel):
-    amount: float = Field(..., ge=0)
+    amount: Money = Field(..., ge=0)
+    currency: str = Field(DEFAULT_CURRENCY, pattern="^[A-Z]{3}$")
     transaction_type: str
     category: str
     description: Optional[str] = None
@@ -39,7 +42,8 @@ class RecurringTransactionCreate(RecurringTransactionBase):
 
 
 class RecurringTransactionUpdate(BaseModel):
-    amount: Optional[float] = Field(None, ge=0)
+    amount: Optional[Money] = Field(None, ge=0)
+    currency: Optional[str] = Field(None, pattern="^[A-Z]{3}$")
     transaction_type: Optional[str] = None
     category: Optional[str] = None
     description: Optional[str] = None
@@ -75,4 +79,34 @@ class RecurringTransactionInDBBase(RecurringTransactionBase):
 
 
 class RecurringTransaction(RecurringTransactionInDBBase):
-    pass 
\ No newline at end of file
+    pass 
+
+class ForecastDay(BaseModel):
+    date: date
+    net_change: Money
+    balance: Money
+
+
+class CashFlowForecast(BaseModel):
+    start_date: date
+    end_date: date
+    opening_balance: Money
+    closing_balance: Money
+    days: List[ForecastDay]
+
+
+class RecurringSuggestion(BaseModel):
+    id: int
+    merchant_name: Optional[str] = None
+    description: Optional[str] = None
+    amount: float
+    transaction_type: Optional[str] = None
+    category: Optional[str] = None
+    frequency: FrequencyEnum
+    last_date: date
+    next_date: date
+    occurrences: int
+    confidence: float
+
+    class Config:
+        from_attributes = True
@@ -1,18 +1,20 @@
-from typing import Optional, Dict, Any
-from datetime import datetime
+from typing import Optional, Dict, Any, List
+from datetime import date, datetime
 from pydantic import BaseModel, Field
+from app.core.money import DEFAULT_CURRENCY, Money
 from app.db.models import TransactionType, Category
+from app.schemas.card import CardSummary
+from app.schemas.receipt import Receipt
 
 class TransactionBase(BaseModel):
-    amount: float
+    amount: Money
+    currency: str = Field(DEFAULT_CURRENCY, pattern="^[A-Z]{3}$")
     description: str
     transaction_type: str
     category: str
     merchant_name: str
     date: datetime
     receipt_path: Optional[str] = None
-    ocr_data: Optional[Dict[str, Any]] = None
-    grocery_items: Optional[Dict[str, Any]] = None
 
 class TransactionCreate(TransactionBase):
     card_id: int
@@ -25,6 +27,7 @@ class TransactionInDBBase(TransactionBase):
     user_id: int
     card_id: int
     plaid_transaction_id: Optional[str] = None
+    duplicate_of_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -33,4 +36,66 @@ class Transaction(TransactionInDBBase):
     pass
 
 class TransactionInDB(TransactionInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+# A transaction with the relationships asked for with `embed`; the others
+# are None
+class TransactionDetail(Transaction):
+    card: Optional[CardSummary] = None
+    receipt: Optional[Receipt] = None
+
+class TransactionFilters(BaseModel):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    min_amount: Optional[Money] = None
+    max_amount: Optional[Money] = None
+    categories: Optional[List[str]] = None
+    transaction_type: Optional[str] = None
+    card_id: Optional[int] = None
+    merchant_prefix: Optional[str] = None
+    has_receipt: Optional[bool] = None
+    sort: str = "-date"
+
+class TransactionSearchResult(Transaction):
+    rank: float
+    highlight: Optional[str] = None
+
+class DuplicateCluster(BaseModel):
+    transactions: List[Transaction]
+
+class TransactionBulkUpdate(TransactionUpdate):
+    id: int
+
+class TransactionBulkDelete(BaseModel):
+    ids: List[int]
+
+class TransactionBulkResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+
+class TransactionBulkResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[TransactionBulkResult]
+
+class TransactionImportSummary(BaseModel):
+    format: str
+    rows_read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    errors: List[str] = []
+
+class SpendingRollup(BaseModel):
+    month: date
+    category: str
+    card_id: int
+    total: Money
+    count: int
+    min_amount: Optional[Money] = None
+    max_amount: Optional[Money] = None
+
+    class Config:
+        from_attributes = True
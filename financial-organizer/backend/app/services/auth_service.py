@@ -17,7 +17,6 @@ def create_user(db: Session, *, obj_in: UserCreate) -> User:
     )
     db.add(db_obj)
     db.commit()
-    db.refresh(db_obj)
     return db_obj
 
 def authenticate(db: Session, *, email: str, password: str) -> Optional[User]:
@@ -38,5 +37,4 @@ def update_user(db: Session, *, db_obj: User, obj_in: UserUpdate) -> User:
         setattr(db_obj, field, value)
     db.add(db_obj)
     db.commit()
-    db.refresh(db_obj)
     return db_obj 
\ No newline at end of file
@@ -0,0 +1,193 @@
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import MISSING, VersionedLRU
+from app.core.money import from_cents, to_cents
+from app.db.models import Budget, BudgetEvent, SpendingRollup, User
+from app.schemas.budget import BudgetCreate, BudgetStatus, BudgetStatusItem, BudgetUpdate
+from app.services import version_service
+
+# Share of the budget that always records an event, besides the alert threshold
+OVER_BUDGET_THRESHOLD = 1.0
+
+# Number of (user, month) spending counters kept in memory
+STATUS_CACHE_SIZE = 4096
+
+# (user_id, month) -> cents spent per category, by user data version. Any
+# write bumps the version, so stale entries are never served, whichever
+# worker handled the write.
+_spending_cache = VersionedLRU(STATUS_CACHE_SIZE)
+
+def get(db: Session, id: Any) -> Optional[Budget]:
+    return db.query(Budget).filter(Budget.id == id).first()
+
+def get_by_category(db: Session, *, user_id: int, category: str) -> Optional[Budget]:
+    return db.query(Budget).filter(Budget.user_id == user_id, Budget.category == category).first()
+
+def get_multi(db: Session, *, user_id: int) -> List[Budget]:
+    return db.query(Budget).filter(Budget.user_id == user_id).order_by(Budget.category).all()
+
+def create(db: Session, *, obj_in: BudgetCreate, user_id: int) -> Budget:
+    db_obj = Budget(
+        user_id=user_id,
+        category=obj_in.category,
+        amount=obj_in.amount,
+        alert_threshold=obj_in.alert_threshold,
+        is_active=True,
+    )
+    try:
+        db.add(db_obj)
+        version_service.bump(db, [user_id])
+        db.commit()
+        return db_obj
+    except Exception as e:
+        db.rollback()
+        raise e
+
+def update(db: Session, *, db_obj: Budget, obj_in: Union[BudgetUpdate, Dict[str, Any]]) -> Budget:
+    if isinstance(obj_in, dict):
+        update_data = obj_in
+    else:
+        update_data = obj_in.model_dump(exclude_unset=True)
+
+    for field, value in update_data.items():
+        setattr(db_obj, field, value)
+
+    db.add(db_obj)
+    version_service.bump(db, [db_obj.user_id])
+    db.commit()
+    return db_obj
+
+def remove(db: Session, *, id: int) -> Budget:
+    obj = db.query(Budget).get(id)
+    if obj:
+        db.query(BudgetEvent).filter(BudgetEvent.budget_id == id).delete()
+        db.delete(obj)
+        version_service.bump(db, [obj.user_id])
+        db.commit()
+    return obj
+
+def get_events(db: Session, *, user_id: int, limit: int = 100) -> List[BudgetEvent]:
+    return (
+        db.query(BudgetEvent)
+        .filter(BudgetEvent.user_id == user_id)
+        .order_by(BudgetEvent.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+def _month_spending(db: Session, *, user: User, month: date) -> Dict[str, int]:
+    key = (user.id, month)
+    spending = _spending_cache.get(key, user.data_version)
+    if spending is not MISSING:
+        return spending
+
+    spending = dict(db.execute(
+        select(SpendingRollup.category, cast(func.sum(SpendingRollup.total_cents), BigInteger))
+        .where(SpendingRollup.user_id == user.id, SpendingRollup.month == month)
+        .group_by(SpendingRollup.category)
+    ).all())
+    _spending_cache.put(key, user.data_version, spending)
+    return spending
+
+def get_status(db: Session, *, user: User, month: Optional[date] = None) -> BudgetStatus:
+    """
+    Spending against each active budget for a month (default: the current
+    one), read from the spending rollups rather than the transactions.
+    """
+    month = month or datetime.now().date()
+    month = date(month.year, month.month, 1)
+    budgets = (
+        db.query(Budget)
+        .filter(Budget.user_id == user.id, Budget.is_active == True)
+        .order_by(Budget.category)
+        .all()
+    )
+    spending = _month_spending(db, user=user, month=month) if budgets else {}
+
+    items = []
+    for budget in budgets:
+        spent = spending.get(budget.category, 0)
+        limit = to_cents(budget.amount)
+        ratio = spent / limit
+        items.append(BudgetStatusItem(
+            budget_id=budget.id,
+            category=budget.category,
+            limit=from_cents(limit),
+            spent=from_cents(spent),
+            remaining=from_cents(limit - spent),
+            ratio=ratio,
+            over_threshold=ratio >= budget.alert_threshold,
+            over_budget=ratio >= OVER_BUDGET_THRESHOLD,
+        ))
+    return BudgetStatus(month=month, budgets=items)
+
+def evaluate(db: Session, keys: Iterable[Tuple[int, date, str, int]]) -> None:
+    """
+    Record an event for each budget that a write pushed over its alert
+    threshold or its full amount. ``keys`` are the spending rollups the
+    write just changed; only their (user, month, category) totals are read.
+    Runs in the caller's database transaction; the caller commits.
+    """
+    touched: Set[Tuple[int, date, str]] = {(key[0], key[1], key[2]) for key in keys}
+    if not touched:
+        return
+
+    budgets = {
+        (budget.user_id, budget.category): budget
+        for budget in db.execute(
+            select(Budget.id, Budget.user_id, Budget.category, Budget.amount, Budget.alert_threshold)
+            .where(
+                Budget.user_id.in_({key[0] for key in touched}),
+                Budget.category.in_({key[2] for key in touched}),
+                Budget.is_active == True,
+            )
+        )
+    }
+    touched = {key for key in touched if (key[0], key[2]) in budgets}
+    if not touched:
+        return
+
+    months = {key[1] for key in touched}
+    spent = {
+        (row.user_id, row.month, row.category): row.spent
+        for row in db.execute(
+            select(
+                SpendingRollup.user_id,
+                SpendingRollup.month,
+                SpendingRollup.category,
+                cast(func.sum(SpendingRollup.total_cents), BigInteger).label("spent"),
+            )
+            .where(
+                SpendingRollup.user_id.in_({key[0] for key in touched}),
+                SpendingRollup.month.in_(months),
+                SpendingRollup.category.in_({key[2] for key in touched}),
+            )
+            .group_by(SpendingRollup.user_id, SpendingRollup.month, SpendingRollup.category)
+        )
+    }
+    recorded = {tuple(row) for row in db.execute(
+        select(BudgetEvent.budget_id, BudgetEvent.month, BudgetEvent.threshold).where(
+            BudgetEvent.budget_id.in_({budget.id for budget in budgets.values()}),
+            BudgetEvent.month.in_(months),
+        )
+    )}
+
+    for user_id, month, category in touched:
+        budget = budgets[(user_id, category)]
+        total = spent.get((user_id, month, category), 0)
+        for threshold in sorted({budget.alert_threshold, OVER_BUDGET_THRESHOLD}):
+            if total < to_cents(budget.amount) * threshold or (budget.id, month, threshold) in recorded:
+                continue
+            db.add(BudgetEvent(
+                user_id=user_id,
+                budget_id=budget.id,
+                month=month,
+                category=category,
+                threshold=threshold,
+                spent=float(from_cents(total)),
+                budget_amount=budget.amount,
+            ))
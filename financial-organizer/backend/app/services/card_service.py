@@ -1,10 +1,12 @@
 from typing import Any, Dict, List, Optional, Union
 from uuid import uuid4
 
+from sqlalchemy import update as sql_update
 from sqlalchemy.orm import Session
 
-from app.db.models import Card
+from app.db.models import Card, Transaction
 from app.schemas.card import CardCreate, CardUpdate
+from app.services import version_service
 
 def get(db: Session, id: Any) -> Optional[Card]:
     return db.query(Card).filter(Card.id == id).first()
@@ -25,8 +27,8 @@ def create(db: Session, *, obj_in: CardCreate, user_id: int) -> Card:
         plaid_item_id=plaid_item_id
     )
     db.add(db_obj)
+    version_service.bump(db, [user_id])
     db.commit()
-    db.refresh(db_obj)
     return db_obj
 
 def update(db: Session, *, db_obj: Card, obj_in: Union[CardUpdate, Dict[str, Any]]) -> Card:
@@ -43,12 +45,19 @@ def update(db: Session, *, db_obj: Card, obj_in: Union[CardUpdate, Dict[str, Any
         setattr(db_obj, field, update_data[field])
     
     db.add(db_obj)
+    version_service.bump(db, [db_obj.user_id])
     db.commit()
-    db.refresh(db_obj)
     return db_obj
 
 def remove(db: Session, *, id: int) -> Card:
     obj = db.query(Card).get(id)
+    # Detach the card's transactions with one UPDATE, like the ORM would
+    # after loading each of them
+    db.execute(
+        sql_update(Transaction).where(Transaction.card_id == id).values(card_id=None),
+        execution_options={"synchronize_session": False},
+    )
     db.delete(obj)
+    version_service.bump(db, [obj.user_id])
     db.commit()
     return obj
@@ -0,0 +1,477 @@
+import re
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Pattern, Sequence, Set, Tuple, Union
+
+from sqlalchemy import and_, false, func, or_, select, true
+from sqlalchemy import update as sql_update
+from sqlalchemy.orm import Session
+
+from app.core.cache import MISSING, VersionedLRU
+from app.core.money import to_cents
+from app.db.models import CategoryRule, Transaction
+from app.db.rows import row_field
+from app.schemas.category_rule import CategoryRuleApplyResult, CategoryRuleCreate, CategoryRuleUpdate
+from app.services import budget_service, rollup_service, version_service
+
+# Category of transactions that no rule matched and nobody set by hand
+DEFAULT_CATEGORY = "other"
+
+# Compiled rule sets kept in memory, one per user
+MATCHER_CACHE_SIZE = 1024
+
+# Distinct merchant strings whose candidate rules each matcher remembers
+MERCHANT_CACHE_SIZE = 65536
+
+# Transactions read, re-categorized and committed together by the bulk job
+RECATEGORIZE_CHUNK_SIZE = 10000
+
+# Global rules installed by `python -m app.commands.recategorize --install-defaults`
+DEFAULT_RULES = {
+    "groceries": ["whole foods", "trader joe", "safeway", "kroger", "aldi", "costco", "instacart", "grocery", "supermarket"],
+    "transportation": ["uber", "lyft", "shell", "chevron", "exxon", "parking", "transit", "airlines"],
+    "entertainment": ["netflix", "spotify", "hulu", "disney+", "steam", "cinema", "ticketmaster"],
+    "utilities": ["comcast", "xfinity", "verizon", "at&t", "t-mobile", "electric", "water bill"],
+    "shopping": ["amazon", "amzn", "target", "walmart", "best buy", "ikea", "ebay", "etsy"],
+}
+
+# Columns of a rule that restrict which transactions it matches
+CONDITION_FIELDS = ("merchant_contains", "merchant_pattern", "min_amount", "max_amount", "card_id")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+Terms = Tuple[str, ...]
+
+def tokenize(text: str) -> Terms:
+    """
+    Lowercase words of a merchant string or of a rule's merchant_contains
+    ("AT&T*Bill 0412" -> ("at", "t", "bill", "0412")).
+    """
+    return tuple(_TOKEN_RE.findall(text.lower()))
+
+class CompiledRule(NamedTuple):
+    id: int
+    category: str
+    contains: Optional[Terms]
+    pattern: Optional[Pattern]
+    min_cents: Optional[int]
+    max_cents: Optional[int]
+    card_id: Optional[int]
+
+class _Automaton:
+    """
+    Aho-Corasick automaton over the word sequences of the rules'
+    merchant_contains: one pass over the words of a merchant string finds
+    every sequence that occurs in it, however many rules there are.
+    """
+    def __init__(self, terms: Iterable[Terms]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Terms, ...]] = [()]
+        for term in terms:
+            state = 0
+            for word in term:
+                next_state = self._goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[state][word] = next_state
+                state = next_state
+            self._out[state] += (term,)
+
+        # Breadth-first, so the fail state of a node is final before its children
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(word, 0)
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def find(self, words: Sequence[str]) -> Set[Terms]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[Terms] = set()
+        state = 0
+        for word in words:
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+def merchant_text(merchant_name: Optional[str], description: Optional[str]) -> str:
+    """
+    Text the merchant conditions of a rule are matched against.
+    """
+    return (merchant_name or description or "").lower()
+
+class RuleMatcher:
+    """
+    The active rules that apply to one user, compiled into one matcher: the
+    user's own rules first, then the global ones, each by priority.
+    """
+    def __init__(self, rules: Sequence[CompiledRule]) -> None:
+        self.rules = list(rules)
+        self._unconditional: List[int] = []
+        self._by_term: Dict[Terms, List[int]] = defaultdict(list)
+        for index, rule in enumerate(self.rules):
+            if rule.contains:
+                self._by_term[rule.contains].append(index)
+            else:
+                self._unconditional.append(index)
+        self._automaton = _Automaton(self._by_term)
+        # Merchant strings repeat a lot; the rules one of them can match are
+        # only worked out once
+        self._candidates = lru_cache(maxsize=MERCHANT_CACHE_SIZE)(self._find_candidates)
+
+    def _find_candidates(self, text: str) -> Tuple[CompiledRule, ...]:
+        indexes = list(self._unconditional)
+        for term in self._automaton.find(tokenize(text)):
+            indexes.extend(self._by_term[term])
+        return tuple(
+            self.rules[index]
+            for index in sorted(indexes)
+            if self.rules[index].pattern is None or self.rules[index].pattern.search(text)
+        )
+
+    def match(
+        self,
+        merchant_name: Optional[str],
+        description: Optional[str],
+        amount_cents: Optional[int],
+        card_id: Optional[int],
+    ) -> Optional[CompiledRule]:
+        """
+        First rule whose conditions all hold for a transaction, or None.
+        """
+        for rule in self._candidates(merchant_text(merchant_name, description)):
+            if rule.card_id is not None and rule.card_id != card_id:
+                continue
+            if rule.min_cents is not None and (amount_cents is None or amount_cents < rule.min_cents):
+                continue
+            if rule.max_cents is not None and (amount_cents is None or amount_cents > rule.max_cents):
+                continue
+            return rule
+        return None
+
+# user_id -> matcher, by rules version; None holds the matcher of the
+# global rules alone, shared by every user without rules of their own. The
+# versions change with any rule write, so other workers' changes are seen.
+_matchers = VersionedLRU(MATCHER_CACHE_SIZE)
+
+def compile_rules(rules: Iterable[Any]) -> RuleMatcher:
+    return RuleMatcher([
+        CompiledRule(
+            id=rule.id,
+            category=rule.category,
+            contains=tokenize(rule.merchant_contains) if rule.merchant_contains else None,
+            pattern=re.compile(rule.merchant_pattern, re.IGNORECASE) if rule.merchant_pattern else None,
+            min_cents=to_cents(rule.min_amount),
+            max_cents=to_cents(rule.max_amount),
+            card_id=rule.card_id,
+        )
+        for rule in rules
+    ])
+
+def get_matchers(db: Session, user_ids: Iterable[int]) -> Dict[int, RuleMatcher]:
+    """
+    Matchers of many users, with the rule versions of all of them checked in
+    one query and any stale rule sets loaded in one more.
+    """
+    user_ids = set(user_ids)
+    versions = {
+        row[0]: tuple(row[1:])
+        for row in db.execute(
+            select(CategoryRule.user_id, func.count(CategoryRule.id), func.max(CategoryRule.updated_at))
+            .where(or_(CategoryRule.user_id.in_(user_ids), CategoryRule.user_id.is_(None)))
+            .group_by(CategoryRule.user_id)
+        )
+    }
+    global_version = versions.pop(None, (0, None))
+
+    keys: Dict[int, Optional[int]] = {}
+    found: Dict[Optional[int], RuleMatcher] = {}
+    stale: Dict[Optional[int], Tuple[Any, ...]] = {}
+    for user_id in user_ids:
+        key = user_id if user_id in versions else None
+        version = versions[key] + global_version if key is not None else global_version
+        keys[user_id] = key
+        if key in found or key in stale:
+            continue
+        matcher = _matchers.get(key, version)
+        if matcher is MISSING:
+            stale[key] = version
+        else:
+            found[key] = matcher
+
+    if stale:
+        own: Dict[int, List[CategoryRule]] = defaultdict(list)
+        shared: List[CategoryRule] = []
+        for rule in db.execute(
+            select(CategoryRule)
+            .where(
+                or_(CategoryRule.user_id.in_([key for key in stale if key is not None]), CategoryRule.user_id.is_(None)),
+                CategoryRule.is_active == True,
+            )
+            .order_by(CategoryRule.user_id.is_(None), CategoryRule.priority, CategoryRule.id)
+        ).scalars():
+            if rule.user_id is None:
+                shared.append(rule)
+            else:
+                own[rule.user_id].append(rule)
+        for key, version in stale.items():
+            found[key] = compile_rules(own[key] + shared if key is not None else shared)
+            _matchers.put(key, version, found[key])
+
+    return {user_id: found[key] for user_id, key in keys.items()}
+
+def get_matcher(db: Session, user_id: int) -> RuleMatcher:
+    return get_matchers(db, [user_id])[user_id]
+
+def categorize(db: Session, rows: Iterable[Any], *, user_id: int) -> None:
+    """
+    Give new transactions left in the default category the category of the
+    first rule they match. Runs before the rows are written; the caller
+    commits.
+    """
+    rows = [row for row in rows if row_field(row, "category") == DEFAULT_CATEGORY]
+    if not rows:
+        return
+    matcher = get_matcher(db, user_id)
+    if not matcher.rules:
+        return
+    for row in rows:
+        rule = matcher.match(
+            row_field(row, "merchant_name"), row_field(row, "description"),
+            row_field(row, "amount_cents"), row_field(row, "card_id"),
+        )
+        if rule is None:
+            continue
+        if isinstance(row, dict):
+            row.update(category=rule.category, category_rule_id=rule.id)
+        else:
+            row.category = rule.category
+            row.category_rule_id = rule.id
+
+# Columns read by the re-categorization job
+_RECATEGORIZE_COLUMNS = [
+    Transaction.id,
+    Transaction.merchant_name,
+    Transaction.description,
+    Transaction.category_rule_id,
+    Transaction.category_predicted,
+    *[getattr(Transaction, field) for field in sorted(rollup_service.ROLLUP_FIELDS)],
+]
+
+def _recategorize(
+    db: Session, conditions: List[Any], *, chunk_size: int = RECATEGORIZE_CHUNK_SIZE
+) -> CategoryRuleApplyResult:
+    """
+    Run the rules again over the transactions matching ``conditions`` whose
+    category came from a rule, was predicted or was never set; categories
+    set by hand are left alone. Predicted categories give way to a matching
+    rule but are otherwise kept. Reads by primary key range and commits per chunk. The
+    spending rollups of the affected users are rebuilt once at the end,
+    since every chunk can touch every user; if the job is interrupted,
+    rebuild_rollups repairs them.
+    """
+    result = CategoryRuleApplyResult(scanned=0, updated=0)
+    candidates = or_(
+        Transaction.category_rule_id.isnot(None),
+        Transaction.category == DEFAULT_CATEGORY,
+        Transaction.category_predicted == True,
+    )
+    rollup_keys: Set[Optional[rollup_service.RollupKey]] = set()
+    changed_users: Set[int] = set()
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(*_RECATEGORIZE_COLUMNS)
+            .where(Transaction.id > last_id, candidates, *conditions)
+            .order_by(Transaction.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        changes: Dict[Tuple[str, Optional[int]], List[int]] = defaultdict(list)
+        user_ids = set()
+        matchers = get_matchers(db, {row.user_id for row in rows})
+        for row in rows:
+            rule = matchers[row.user_id].match(row.merchant_name, row.description, row.amount_cents, row.card_id)
+            if rule is None and row.category_predicted:
+                continue
+            new = (rule.category, rule.id) if rule else (DEFAULT_CATEGORY, None)
+            if new == (row.category, row.category_rule_id):
+                continue
+            changes[new].append(row.id)
+            user_ids.add(row.user_id)
+            rollup_keys.add(rollup_service.rollup_key(row))
+            rollup_keys.add(rollup_service.rollup_key({**row._asdict(), "category": new[0]}))
+
+        try:
+            # One UPDATE per resulting (category, rule) rather than per row
+            for (category, rule_id), ids in changes.items():
+                db.execute(
+                    sql_update(Transaction)
+                    .where(Transaction.id.in_(ids))
+                    .values(category=category, category_rule_id=rule_id, category_predicted=False),
+                    execution_options={"synchronize_session": False},
+                )
+            if changes:
+                version_service.bump(db, user_ids)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error re-categorizing transactions: {e}")
+            raise
+        changed_users |= user_ids
+        result.scanned += len(rows)
+        result.updated += sum(len(ids) for ids in changes.values())
+
+    if changed_users:
+        # Rebuilding the users' rollups takes one aggregate per chunk of
+        # users, where refreshing the changed keys takes one per user
+        rollup_service.rebuild(db, user_ids=sorted(changed_users))
+        try:
+            budget_service.evaluate(db, [key for key in rollup_keys if key is not None])
+            # Again, so nothing cached from the stale rollups is served
+            version_service.bump(db, changed_users)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return result
+
+def recategorize(
+    db: Session, *, user_ids: Optional[List[int]] = None, chunk_size: int = RECATEGORIZE_CHUNK_SIZE
+) -> CategoryRuleApplyResult:
+    """
+    Apply the current rules to every transaction of the given users (all
+    users by default) that was not categorized by hand.
+    """
+    conditions = [Transaction.user_id.in_(user_ids)] if user_ids is not None else []
+    return _recategorize(db, conditions, chunk_size=chunk_size)
+
+def _match_conditions(rule: CategoryRule) -> List[Any]:
+    # The rule's conditions as far as SQL can check them; the pattern is
+    # checked by the matcher
+    text = func.lower(func.coalesce(func.nullif(Transaction.merchant_name, ""), Transaction.description, ""))
+    conditions = []
+    if rule.merchant_contains:
+        # Every word of the rule occurs in the text of a transaction it matches
+        for word in tokenize(rule.merchant_contains):
+            conditions.append(text.contains(word, autoescape=True))
+    if rule.min_amount is not None:
+        conditions.append(Transaction.amount_cents >= to_cents(rule.min_amount))
+    if rule.max_amount is not None:
+        conditions.append(Transaction.amount_cents <= to_cents(rule.max_amount))
+    if rule.card_id is not None:
+        conditions.append(Transaction.card_id == rule.card_id)
+    return conditions
+
+def reapply(db: Session, rule: CategoryRule) -> CategoryRuleApplyResult:
+    """
+    Re-categorize only the transactions a rule change can affect: those the
+    rule categorized before and those it matches now.
+    """
+    matches_now = and_(true(), *_match_conditions(rule)) if rule.is_active else false()
+    conditions = [or_(Transaction.category_rule_id == rule.id, matches_now)]
+    if rule.user_id is not None:
+        conditions.append(Transaction.user_id == rule.user_id)
+    return _recategorize(db, conditions)
+
+def get(db: Session, id: Any) -> Optional[CategoryRule]:
+    return db.query(CategoryRule).filter(CategoryRule.id == id).first()
+
+def get_multi(db: Session, *, user_id: int) -> List[CategoryRule]:
+    """
+    The user's rules followed by the global ones, in the order they are tried.
+    """
+    return (
+        db.query(CategoryRule)
+        .filter(or_(CategoryRule.user_id == user_id, CategoryRule.user_id.is_(None)))
+        .order_by(CategoryRule.user_id.is_(None), CategoryRule.priority, CategoryRule.id)
+        .all()
+    )
+
+def has_conditions(rule: CategoryRule, update_data: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Whether the rule still has a condition once ``update_data`` is applied.
+    """
+    update_data = update_data or {}
+    return any(update_data.get(field, getattr(rule, field)) is not None for field in CONDITION_FIELDS)
+
+def create(db: Session, *, obj_in: CategoryRuleCreate, user_id: Optional[int]) -> CategoryRule:
+    """
+    Create a rule (a global one when ``user_id`` is None) and apply it to
+    the existing transactions it matches.
+    """
+    db_obj = CategoryRule(**obj_in.model_dump(), user_id=user_id, is_active=True)
+    try:
+        db.add(db_obj)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    reapply(db, db_obj)
+    return db_obj
+
+def update(
+    db: Session, *, db_obj: CategoryRule, obj_in: Union[CategoryRuleUpdate, Dict[str, Any]]
+) -> CategoryRule:
+    if isinstance(obj_in, dict):
+        update_data = obj_in
+    else:
+        update_data = obj_in.model_dump(exclude_unset=True)
+
+    for field, value in update_data.items():
+        setattr(db_obj, field, value)
+
+    db.add(db_obj)
+    db.commit()
+    reapply(db, db_obj)
+    return db_obj
+
+def remove(db: Session, *, id: int) -> CategoryRule:
+    obj = db.query(CategoryRule).get(id)
+    if obj:
+        # Move the rule's transactions to the next matching rule (or back to
+        # the default category) before the rule disappears
+        obj.is_active = False
+        db.commit()
+        reapply(db, obj)
+        db.delete(obj)
+        db.commit()
+    return obj
+
+def install_default_rules(db: Session) -> int:
+    """
+    Add the global DEFAULT_RULES that do not exist yet. They only apply to
+    existing transactions once recategorize() runs. Returns the number of
+    rules added.
+    """
+    existing = set(db.execute(
+        select(CategoryRule.category, CategoryRule.merchant_contains).where(CategoryRule.user_id.is_(None))
+    ).all())
+    rules = [
+        CategoryRule(category=category, merchant_contains=term, priority=100, is_active=True)
+        for category, terms in DEFAULT_RULES.items()
+        for term in terms
+        if (category, term) not in existing
+    ]
+    if rules:
+        try:
+            db.add_all(rules)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise e
+    return len(rules)
@@ -0,0 +1,238 @@
+import itertools
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import MISSING, VersionedLRU
+from app.db.models import Transaction
+from app.db.rows import row_field
+from app.services.categorization_service import DEFAULT_CATEGORY, tokenize
+
+# Buckets the features are hashed into; large enough that collisions between
+# the features of one user's history are rare
+N_FEATURES = 1 << 20
+
+# Additive smoothing of the per-category feature counts
+ALPHA = 0.1
+
+# Most recent categorized transactions a model is trained on
+MAX_TRAINING_ROWS = 20000
+
+# With fewer categorized transactions than this, or a single category, no
+# model is trained
+MIN_TRAINING_ROWS = 20
+
+# Predictions less likely than this leave the transaction in the default category
+MIN_CONFIDENCE = 0.7
+
+# Trained models kept in memory, one per user
+MODEL_CACHE_SIZE = 256
+
+# Distinct (merchant, description) pairs whose features are remembered
+FEATURE_CACHE_SIZE = 65536
+
+TrainingRow = Tuple[Optional[str], Optional[str], str]
+
+
+def _hash(feature: str) -> int:
+    # crc32 rather than hash(), which changes between processes
+    return zlib.crc32(feature.encode()) & (N_FEATURES - 1)
+
+
+def _words(text: Optional[str]) -> Tuple[str, ...]:
+    # Numbers (store numbers, dates, references) are left out
+    return tuple(word for word in tokenize(text or "") if not word.isdigit())
+
+
+@lru_cache(maxsize=FEATURE_CACHE_SIZE)
+def _hashed_features(merchant_words: Tuple[str, ...], description_words: Tuple[str, ...]) -> Tuple[int, ...]:
+    names = {"m:" + word for word in merchant_words}
+    names.update(f"m2:{first} {second}" for first, second in zip(merchant_words, merchant_words[1:]))
+    for word in merchant_words:
+        padded = f" {word} "
+        names.update("c:" + padded[index:index + 3] for index in range(len(padded) - 2))
+    names.update("d:" + word for word in description_words)
+    return tuple(sorted({_hash(name) for name in names}))
+
+
+def features(merchant_name: Optional[str], description: Optional[str]) -> Tuple[int, ...]:
+    """
+    Sorted hashed features of a transaction: the words, word pairs and
+    character trigrams of the merchant name and the words of the
+    description. Memoized on the words, so "SHOP #12" and "SHOP #340" are
+    only hashed once.
+    """
+    return _hashed_features(_words(merchant_name), _words(description))
+
+
+def feature_matrix(rows: Sequence[Tuple[Optional[str], Optional[str]]]) -> sparse.csr_matrix:
+    """
+    One row of binary hashed features per (merchant_name, description).
+    """
+    hashed = [features(merchant_name, description) for merchant_name, description in rows]
+    indptr = np.zeros(len(hashed) + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in hashed], out=indptr[1:])
+    indices = np.fromiter(itertools.chain.from_iterable(hashed), dtype=np.int32, count=int(indptr[-1]))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(hashed), N_FEATURES))
+
+
+class CategoryModel:
+    """
+    Multinomial naive Bayes over hashed features. Only the features seen in
+    training are kept, so a model takes (categories x features seen) floats
+    rather than (categories x N_FEATURES).
+    """
+    def __init__(
+        self,
+        classes: np.ndarray,
+        vocabulary: np.ndarray,
+        feature_log_prob: np.ndarray,
+        class_log_prior: np.ndarray,
+    ) -> None:
+        self.classes = classes
+        self.vocabulary = vocabulary
+        self.feature_log_prob = feature_log_prob
+        self.class_log_prior = class_log_prior
+
+    @property
+    def nbytes(self) -> int:
+        return self.vocabulary.nbytes + self.feature_log_prob.nbytes + self.class_log_prior.nbytes
+
+    def predict_proba(self, X: sparse.csr_matrix) -> np.ndarray:
+        """
+        Probability of each category (in ``classes`` order) for each row of
+        a feature_matrix(); features unseen in training are ignored.
+        """
+        n_rows, n_known = X.shape[0], len(self.vocabulary)
+        columns = np.searchsorted(self.vocabulary, X.indices)
+        known = self.vocabulary[np.minimum(columns, n_known - 1)] == X.indices
+        rows = np.repeat(np.arange(n_rows), np.diff(X.indptr))
+        compact = sparse.csr_matrix(
+            (X.data[known], (rows[known], columns[known])), shape=(n_rows, n_known)
+        )
+        scores = np.asarray(compact @ self.feature_log_prob.T) + self.class_log_prior
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, rows: Sequence[Tuple[Optional[str], Optional[str]]]) -> List[Tuple[str, float]]:
+        """
+        Most likely category of each (merchant_name, description) and its
+        probability.
+        """
+        if not rows:
+            return []
+        proba = self.predict_proba(feature_matrix(rows))
+        best = proba.argmax(axis=1)
+        return [
+            (str(self.classes[index]), float(probability))
+            for index, probability in zip(best, proba[np.arange(len(best)), best])
+        ]
+
+
+def train(rows: Sequence[TrainingRow]) -> Optional[CategoryModel]:
+    """
+    Fit a model on (merchant_name, description, category) rows, or return
+    None when there is too little to learn from.
+    """
+    if len(rows) < MIN_TRAINING_ROWS:
+        return None
+    classes, y = np.unique([row[2] for row in rows], return_inverse=True)
+    if len(classes) < 2:
+        return None
+
+    X = feature_matrix([(merchant_name, description) for merchant_name, description, _ in rows])
+    # Summing the rows of each category is one sparse product with the
+    # (categories x rows) indicator matrix
+    Y = sparse.csr_matrix(
+        (np.ones(len(y), dtype=np.float32), (y, np.arange(len(y)))), shape=(len(classes), len(y))
+    )
+    vocabulary = np.unique(X.indices)
+    counts = (Y @ X)[:, vocabulary].toarray() + ALPHA
+    feature_log_prob = (np.log(counts) - np.log(counts.sum(axis=1, keepdims=True))).astype(np.float32)
+    class_log_prior = np.log(np.bincount(y) / len(y)).astype(np.float32)
+    return CategoryModel(classes, vocabulary, feature_log_prob, class_log_prior)
+
+
+def _training_conditions(user_id: int) -> List[Any]:
+    # Categories set by hand or by a rule; predictions are not learned from
+    return [
+        Transaction.user_id == user_id,
+        Transaction.category != DEFAULT_CATEGORY,
+        Transaction.category_predicted == False,
+    ]
+
+
+def get_training_version(db: Session, *, user_id: int) -> Tuple[int, Optional[datetime]]:
+    """
+    Return a value that changes whenever the user's training data changes:
+    the row count plus the latest updated_at.
+    """
+    count, last_updated = db.execute(
+        select(func.count(Transaction.id), func.max(Transaction.updated_at))
+        .where(*_training_conditions(user_id))
+    ).one()
+    return count, last_updated
+
+
+# user_id -> model or None, by training version
+_models = VersionedLRU(MODEL_CACHE_SIZE)
+
+
+def get_model(db: Session, *, user_id: int) -> Optional[CategoryModel]:
+    """
+    Return the user's model, retrained only when their categorized
+    transactions changed since it was trained.
+    """
+    version = get_training_version(db, user_id=user_id)
+    model = _models.get(user_id, version)
+    if model is not MISSING:
+        return model
+
+    rows = db.execute(
+        select(Transaction.merchant_name, Transaction.description, Transaction.category)
+        .where(*_training_conditions(user_id))
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(MAX_TRAINING_ROWS)
+    ).all()
+    model = train([tuple(row) for row in rows])
+
+    _models.put(user_id, version, model)
+    return model
+
+
+def predict(db: Session, rows: Iterable[Any], *, user_id: int) -> int:
+    """
+    Predict the category of new transactions that no rule categorized, in
+    one batch, and set it where the model is confident enough. Runs after
+    categorization_service.categorize() and before the rows are written;
+    the caller commits. Returns the number of rows categorized.
+    """
+    rows = [
+        row for row in rows
+        if row_field(row, "category") == DEFAULT_CATEGORY and row_field(row, "category_rule_id") is None
+    ]
+    if not rows:
+        return 0
+    model = get_model(db, user_id=user_id)
+    if model is None:
+        return 0
+
+    predictions = model.predict([(row_field(row, "merchant_name"), row_field(row, "description")) for row in rows])
+    categorized = 0
+    for row, (category, probability) in zip(rows, predictions):
+        if probability < MIN_CONFIDENCE:
+            continue
+        if isinstance(row, dict):
+            row.update(category=category, category_predicted=True)
+        else:
+            row.category = category
+            row.category_predicted = True
+        categorized += 1
+    return categorized
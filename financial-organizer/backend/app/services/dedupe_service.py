@@ -0,0 +1,242 @@
+import hashlib
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select
+from sqlalchemy import update as sql_update
+from sqlalchemy.orm import Session
+
+from app.db.models import Transaction
+from app.db.rows import row_field
+from app.schemas.transaction import DuplicateCluster
+from app.services.merchant_service import canonical_name
+
+# Copies of one purchase are at most this many days apart (posting dates
+# lag authorization, receipts are entered late)
+DUPLICATE_WINDOW_DAYS = 3
+_WINDOW = timedelta(days=DUPLICATE_WINDOW_DAYS)
+
+# Notes appended to generated descriptions ("Netflix (Recurring)")
+_NOTE_RE = re.compile(r"\s*\([^)]*\)$")
+
+# Fields the dedupe key and the duplicate check read
+DEDUPE_FIELDS = {"amount_cents", "date", "card_id", "transaction_type", "merchant_name", "description"}
+
+# Rows read per round trip by the scan, and keyed per commit by the backfill
+STREAM_BATCH_SIZE = 10000
+BACKFILL_CHUNK_SIZE = 10000
+
+
+def _day(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def dedupe_key(row: Any) -> Optional[int]:
+    """
+    Hash of (transaction type, amount in cents, canonical merchant), or None
+    for rows that cannot be told apart from unrelated ones (no amount, date
+    or merchant). The card and date are compared separately, so that rows
+    without a card (generated from schedules) can match a card's copy and
+    dates within DUPLICATE_WINDOW_DAYS match.
+    """
+    amount_cents = row_field(row, "amount_cents")
+    if amount_cents is None or row_field(row, "date") is None:
+        return None
+    text = row_field(row, "merchant_name") or row_field(row, "description") or ""
+    merchant = canonical_name(_NOTE_RE.sub("", text))
+    if merchant is None:
+        return None
+    value = f"{row_field(row, 'transaction_type')}|{amount_cents}|{merchant}"
+    # Signed, to fit a BIGINT column
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def _cards_match(first: Optional[int], second: Optional[int]) -> bool:
+    return first is None or second is None or first == second
+
+
+def link(db: Session, rows: Iterable[Any]) -> int:
+    """
+    Set the dedupe key of new or edited transactions and point the ones that
+    repeat an existing transaction at it through duplicate_of_id. Existing
+    candidates are read through the (user_id, dedupe_key, date) index, one
+    query per batch. Runs before the rows are written; the caller commits.
+    Returns the number of rows flagged.
+    """
+    keyed = []
+    for row in rows:
+        key = dedupe_key(row)
+        keyed.append((row, key))
+    lookups = [(row, key) for row, key in keyed if key is not None]
+
+    candidates: Dict[Tuple[int, int], List[Any]] = defaultdict(list)
+    if lookups:
+        days = [_day(row_field(row, "date")) for row, _ in lookups]
+        window_start = datetime.combine(min(days), datetime.min.time()) - _WINDOW
+        window_end = datetime.combine(max(days), datetime.max.time()) + _WINDOW
+        for candidate in db.execute(
+            select(
+                Transaction.id,
+                Transaction.user_id,
+                Transaction.card_id,
+                Transaction.date,
+                Transaction.dedupe_key,
+                Transaction.duplicate_of_id,
+            )
+            .where(
+                Transaction.user_id.in_({row_field(row, "user_id") for row, _ in lookups}),
+                Transaction.dedupe_key.in_({key for _, key in lookups}),
+                Transaction.date >= window_start,
+                Transaction.date <= window_end,
+            )
+            .order_by(Transaction.date, Transaction.id)
+        ):
+            candidates[(candidate.user_id, candidate.dedupe_key)].append(candidate)
+
+    flagged = 0
+    for row, key in keyed:
+        original = None
+        if key is not None:
+            id = row_field(row, "id")
+            day = _day(row_field(row, "date"))
+            for candidate in candidates.get((row_field(row, "user_id"), key), ()):
+                # The row itself and its own copies (when an original is
+                # edited) are not earlier purchases it repeats
+                if (
+                    candidate.id != id
+                    and (id is None or candidate.duplicate_of_id != id)
+                    and abs((_day(candidate.date) - day).days) <= DUPLICATE_WINDOW_DAYS
+                    and _cards_match(candidate.card_id, row_field(row, "card_id"))
+                ):
+                    original = candidate.duplicate_of_id or candidate.id
+                    break
+            if original is not None and original == id:
+                original = None
+        values = {"dedupe_key": key, "duplicate_of_id": original}
+        if isinstance(row, dict):
+            row.update(values)
+        else:
+            for field, value in values.items():
+                setattr(row, field, value)
+        flagged += original is not None
+    return flagged
+
+
+def backfill(db: Session, *, user_id: Optional[int] = None, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Compute the dedupe key of transactions written before keys existed, by
+    primary key range and committing per chunk. Returns the number of rows
+    keyed.
+    """
+    conditions = [Transaction.dedupe_key.is_(None)]
+    if user_id is not None:
+        conditions.append(Transaction.user_id == user_id)
+    table = Transaction.__table__
+    keyed = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(
+                Transaction.id,
+                Transaction.amount_cents,
+                Transaction.date,
+                Transaction.transaction_type,
+                Transaction.merchant_name,
+                Transaction.description,
+            )
+            .where(Transaction.id > last_id, *conditions)
+            .order_by(Transaction.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = [{"_id": row.id, "_key": key} for row in rows for key in [dedupe_key(row)] if key is not None]
+        try:
+            if updates:
+                # Nothing the user sees changes, so updated_at is kept
+                db.execute(
+                    sql_update(table)
+                    .where(table.c.id == bindparam("_id"))
+                    .values(dedupe_key=bindparam("_key"), updated_at=table.c.updated_at),
+                    updates,
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error computing dedupe keys: {e}")
+            raise
+        keyed += len(updates)
+    return keyed
+
+
+def _clusters(rows: Iterable[Any]) -> Iterator[List[int]]:
+    """
+    Merge rows sorted by (dedupe_key, date) into clusters of two or more:
+    within a key, a row joins the most recent open cluster of a matching
+    card (the same card, or either has none) when it is at most
+    DUPLICATE_WINDOW_DAYS after that cluster's last row.
+    """
+    current_key = None
+    # card_id (None for card-less clusters) -> (last day, ids)
+    open_clusters: Dict[Optional[int], Tuple[date, List[int]]] = {}
+    for row in rows:
+        if row.dedupe_key != current_key:
+            yield from (ids for _, ids in open_clusters.values() if len(ids) > 1)
+            open_clusters = {}
+            current_key = row.dedupe_key
+        day = _day(row.date)
+        joinable = [card for card in open_clusters if _cards_match(card, row.card_id)]
+        best = max(joinable, key=lambda card: open_clusters[card][0]) if joinable else None
+        if joinable and (day - open_clusters[best][0]).days <= DUPLICATE_WINDOW_DAYS:
+            ids = open_clusters.pop(best)[1]
+            ids.append(row.id)
+            card = best if best is not None else row.card_id
+        else:
+            ids = [row.id]
+            card = row.card_id
+        # A cluster that is replaced can no longer grow
+        replaced = open_clusters.pop(card, None)
+        if replaced is not None and len(replaced[1]) > 1:
+            yield replaced[1]
+        open_clusters[card] = (day, ids)
+    yield from (ids for _, ids in open_clusters.values() if len(ids) > 1)
+
+
+def find_clusters(db: Session, *, user_id: int) -> List[List[int]]:
+    """
+    Ids of every group of transactions in the user's history that look like
+    copies of one purchase, oldest first within a group. One pass over the
+    rows in (dedupe_key, date) order, as served by the index, instead of
+    comparing every pair. Read only: rows written before keys existed are
+    left out until `python -m app.commands.backfill_dedupe_keys` keys them.
+    """
+    rows = db.execute(
+        select(Transaction.id, Transaction.card_id, Transaction.date, Transaction.dedupe_key)
+        .where(Transaction.user_id == user_id, Transaction.dedupe_key.isnot(None))
+        .order_by(Transaction.dedupe_key, Transaction.date, Transaction.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    return list(_clusters(rows))
+
+
+def get_clusters(db: Session, *, user_id: int) -> List[DuplicateCluster]:
+    """
+    The user's duplicate clusters with their transactions, most recent first.
+    """
+    clusters = find_clusters(db, user_id=user_id)
+    ids = [id for cluster in clusters for id in cluster]
+    transactions = {
+        transaction.id: transaction
+        for transaction in db.query(Transaction).filter(Transaction.id.in_(ids))
+    } if ids else {}
+    result = [
+        DuplicateCluster(transactions=[transactions[id] for id in cluster if id in transactions])
+        for cluster in clusters
+    ]
+    return sorted(result, key=lambda cluster: cluster.transactions[-1].date, reverse=True)
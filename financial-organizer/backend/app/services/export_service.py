@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.money import from_cents
+from app.db.models import Transaction
+from app.db.session import SessionLocal
+
+# Rows fetched from the server-side cursor and encoded per chunk
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.date,
+    Transaction.amount_cents.label("amount"),
+    Transaction.transaction_type,
+    Transaction.category,
+    Transaction.merchant_name,
+    Transaction.description,
+    Transaction.card_id,
+    Transaction.currency,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+# Read in cents, exported as an exact decimal
+_AMOUNT_INDEX = EXPORT_FIELDS.index("amount")
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def iter_partitions(
+    db: Session,
+    *,
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[Sequence[Any]]:
+    """
+    Yield the user's transactions as lists of plain column tuples, with the
+    amount as a Decimal. The rows come from a server-side cursor, so only
+    one batch is held at a time and no ORM objects are built.
+    """
+    query = select(*EXPORT_COLUMNS).where(Transaction.user_id == user_id)
+    if start_date is not None:
+        query = query.where(Transaction.date >= start_date)
+    if end_date is not None:
+        query = query.where(Transaction.date <= end_date)
+    result = db.execute(
+        query.order_by(Transaction.id).execution_options(yield_per=batch_size)
+    )
+    for partition in result.partitions():
+        yield [
+            (*row[:_AMOUNT_INDEX], from_cents(row[_AMOUNT_INDEX]), *row[_AMOUNT_INDEX + 1:])
+            for row in partition
+        ]
+
+def encode_csv(partitions: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for partition in partitions:
+        writer.writerows(partition)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for exports with no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def _json_default(value: Any) -> Any:
+    # Amounts stay JSON numbers; dates become strings
+    return float(value) if isinstance(value, Decimal) else str(value)
+
+def encode_ndjson(partitions: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    for partition in partitions:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default) + "\n"
+            for row in partition
+        ).encode()
+
+class _ParquetSink(io.RawIOBase):
+    # Write-only file handed to the Parquet writer; what has been written
+    # since the last drain() is sent to the client and then released
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def encode_parquet(partitions: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    # pyarrow is only needed for this format and is slow to import
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.timestamp("us")),
+        ("amount", pa.decimal128(18, 2)),
+        ("transaction_type", pa.string()),
+        ("category", pa.string()),
+        ("merchant_name", pa.string()),
+        ("description", pa.string()),
+        ("card_id", pa.int64()),
+        ("currency", pa.string()),
+    ])
+    sink = _ParquetSink()
+    # Each partition becomes one row group
+    with pq.ParquetWriter(sink, schema) as writer:
+        for partition in partitions:
+            columns = list(zip(*partition))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+ENCODERS: dict = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+def stream_export(
+    fmt: str,
+    *,
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> Iterator[bytes]:
+    """
+    Encoded export body for a StreamingResponse. The generator owns its own
+    session because it keeps reading after the request's session is closed.
+    """
+    encoder = ENCODERS[fmt]
+    db = session_factory()
+    try:
+        yield from encoder(iter_partitions(
+            db, user_id=user_id, start_date=start_date, end_date=end_date
+        ))
+    finally:
+        db.close()
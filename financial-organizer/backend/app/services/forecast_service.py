@@ -0,0 +1,152 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import MISSING, VersionedLRU
+from app.core.money import DEFAULT_CURRENCY, from_cents, to_cents
+from app.db.models import ExchangeRate, RecurringTransaction
+from app.schemas.recurring_transaction import CashFlowForecast, ForecastDay
+from app.services import fx_service
+from app.services.recurring_transaction_service import occurrences_between
+
+# Transaction types that add money to the balance; everything else is spending
+INFLOW_TRANSACTION_TYPES = {"payment", "refund", "deposit"}
+
+# Longest projection served by the forecast endpoint (about ten years)
+MAX_FORECAST_DAYS = 3660
+
+# Number of users whose latest forecast is kept in memory
+FORECAST_CACHE_SIZE = 1024
+
+# user_id -> latest forecast, by cache key
+_forecast_cache = VersionedLRU(FORECAST_CACHE_SIZE)
+
+
+def get_schedule_version(db: Session, *, user_id: int) -> Tuple[int, Optional[datetime]]:
+    """
+    Return a value that changes whenever any of the user's schedules change:
+    the row count plus the latest updated_at (soft deletes bump updated_at too).
+    """
+    count, last_updated = db.execute(
+        select(func.count(RecurringTransaction.id), func.max(RecurringTransaction.updated_at))
+        .where(RecurringTransaction.user_id == user_id)
+    ).one()
+    return count, last_updated
+
+
+def get_forecast(
+    db: Session,
+    *,
+    user_id: int,
+    until: date,
+    opening_balance: Decimal = Decimal(0),
+    start: Optional[date] = None,
+) -> CashFlowForecast:
+    """
+    Return the user's daily balance projection, from the cache when none of
+    their schedules and no exchange rate changed since it was computed.
+    """
+    start = start or datetime.now().date()
+    key = (
+        get_schedule_version(db, user_id=user_id),
+        fx_service.get_rates_version(db),
+        start,
+        until,
+        opening_balance,
+    )
+
+    forecast = _forecast_cache.get(user_id, key)
+    if forecast is not MISSING:
+        return forecast
+
+    forecast = build_forecast(
+        db, user_id=user_id, start=start, until=until, opening_balance=opening_balance
+    )
+    _forecast_cache.put(user_id, key, forecast)
+    return forecast
+
+
+def build_forecast(
+    db: Session, *, user_id: int, start: date, until: date, opening_balance: Decimal = Decimal(0)
+) -> CashFlowForecast:
+    """
+    Expand every active schedule of the user over ``[start, until]`` and
+    accumulate the amounts into a daily balance, in integer cents of
+    DEFAULT_CURRENCY. Schedules in another currency are converted at the
+    rate on ``start``, and left out when there is none.
+    """
+    amount_cents = fx_service.converted_cents(RecurringTransaction.amount_cents, RecurringTransaction.currency)
+    schedules = db.execute(
+        select(
+            amount_cents.label("amount_cents"),
+            RecurringTransaction.transaction_type,
+            RecurringTransaction.frequency,
+            RecurringTransaction.start_date,
+            RecurringTransaction.end_date,
+            RecurringTransaction.next_date,
+        )
+        .outerjoin(ExchangeRate, fx_service.rate_join(RecurringTransaction.currency, start))
+        .where(
+            RecurringTransaction.user_id == user_id,
+            RecurringTransaction.is_active == True,
+            or_(RecurringTransaction.currency == DEFAULT_CURRENCY, ExchangeRate.id.isnot(None)),
+        )
+    ).all()
+
+    days = (until - start).days + 1
+    net_change = project_daily_net_change(schedules, start=start, until=until)
+    opening_cents = to_cents(opening_balance)
+    balances = opening_cents + np.cumsum(net_change)
+    dates = np.datetime64(start, "D") + np.arange(days)
+
+    return CashFlowForecast(
+        start_date=start,
+        end_date=until,
+        opening_balance=from_cents(opening_cents),
+        closing_balance=from_cents(int(balances[-1]) if days > 0 else opening_cents),
+        days=[
+            ForecastDay(date=day, net_change=from_cents(change), balance=from_cents(balance))
+            for day, change, balance in zip(dates.tolist(), net_change.tolist(), balances.tolist())
+        ],
+    )
+
+
+def project_daily_net_change(schedules, *, start: date, until: date) -> np.ndarray:
+    """
+    Return the net amount in cents (int64) of all schedule occurrences for
+    each day in ``[start, until]``.
+
+    Each schedule is expanded with vectorized date arithmetic and the amounts
+    are summed per day with a single ``np.bincount``, so the cost does not
+    depend on a per-day Python loop. bincount adds its weights as float64,
+    which is exact for integer cents below 2**53.
+    """
+    days = max((until - start).days + 1, 0)
+    start_day = np.datetime64(start, "D")
+    offsets = []
+    amounts = []
+
+    for schedule in schedules:
+        # Occurrences before next_date have already been booked
+        first = max(start, schedule.next_date)
+        last = min(until, schedule.end_date) if schedule.end_date else until
+        if first > last:
+            continue
+
+        occurrences = occurrences_between(schedule.frequency, schedule.start_date, first, last)
+        if not len(occurrences):
+            continue
+
+        sign = 1 if schedule.transaction_type in INFLOW_TRANSACTION_TYPES else -1
+        offsets.append((occurrences - start_day).astype(np.int64))
+        amounts.append(np.full(len(occurrences), sign * schedule.amount_cents, dtype=np.int64))
+
+    if not offsets:
+        return np.zeros(days, dtype=np.int64)
+    return np.bincount(
+        np.concatenate(offsets), weights=np.concatenate(amounts), minlength=days
+    ).astype(np.int64)
@@ -0,0 +1,247 @@
+import csv
+import math
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from sqlalchemy import BigInteger, and_, bindparam, case, cast, func, or_, select
+from sqlalchemy import update as sql_update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.cache import MISSING, VersionedLRU
+from app.core.money import DEFAULT_CURRENCY
+from app.db.models import ExchangeRate, Transaction
+from app.db.rows import row_field
+
+# Rates kept in memory, by (currency, day)
+RATE_CACHE_SIZE = 65536
+
+# Rates upserted per statement while loading
+LOAD_CHUNK_SIZE = 5000
+
+RateKey = Tuple[str, date]
+
+# (currency, day) -> rate, or None when no loaded rate covers the day, by
+# rates version. Loading rates changes the version, so stale entries are
+# never served, whichever process loaded them.
+_rates = VersionedLRU(RATE_CACHE_SIZE)
+
+
+def rate_join(currency: Any, day: Any) -> Any:
+    """
+    Join condition on ExchangeRate for the loaded rate whose range covers
+    `day`. Queries outer-join on it and read amounts through
+    converted_cents(), so converting any number of rows is one join.
+    """
+    return and_(
+        ExchangeRate.currency == currency,
+        ExchangeRate.date <= day,
+        or_(ExchangeRate.valid_until.is_(None), ExchangeRate.valid_until > day),
+    )
+
+
+# The rate of each transaction on its date
+RATE_JOIN = rate_join(Transaction.currency, Transaction.date)
+
+
+def converted_cents(amount_cents: Any = Transaction.amount_cents, currency: Any = Transaction.currency) -> Any:
+    """
+    An amount in DEFAULT_CURRENCY, for queries outer-joined to ExchangeRate
+    on rate_join(). NULL for amounts in a currency with no rate for the
+    day, which sums and counts of it leave out.
+    """
+    return case(
+        (currency == DEFAULT_CURRENCY, amount_cents),
+        else_=cast(func.round(amount_cents * ExchangeRate.rate), BigInteger),
+    )
+
+
+def convert(cents: int, rate: float) -> int:
+    # Rounded half away from zero, like ROUND in converted_cents()
+    value = cents * rate
+    return int(math.copysign(math.floor(abs(value) + 0.5), value))
+
+
+def _day(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def parse_rates(stream: TextIO) -> Iterator[Tuple[str, date, float]]:
+    """
+    (currency, date, rate) rows of a CSV file with date, currency and rate
+    columns, the rate being the value of one unit of the currency in
+    DEFAULT_CURRENCY. Rows of DEFAULT_CURRENCY itself are skipped.
+    """
+    reader = csv.DictReader(stream)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for record in reader:
+        try:
+            currency = (record.get("currency") or "").strip().upper()
+            day = date.fromisoformat((record.get("date") or "").strip())
+            rate = float(record.get("rate") or "")
+        except ValueError as e:
+            raise ValueError(f"Line {reader.line_num}: {e}")
+        if len(currency) != 3 or not currency.isalpha():
+            raise ValueError(f"Line {reader.line_num}: not a currency code: {currency!r}")
+        if not rate > 0:
+            raise ValueError(f"Line {reader.line_num}: rate must be positive")
+        if currency != DEFAULT_CURRENCY:
+            yield currency, day, rate
+
+
+def _upsert(db: Session, values: List[Dict[str, Any]]) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = postgresql.insert(ExchangeRate.__table__)
+    else:
+        stmt = sqlite.insert(ExchangeRate.__table__)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["currency", "date"],
+            set_={"rate": stmt.excluded.rate, "updated_at": stmt.excluded.updated_at},
+        ),
+        values,
+    )
+
+
+def _link(db: Session, currencies: Iterable[str]) -> None:
+    # Close the range of each rate at the next rate of its currency
+    table = ExchangeRate.__table__
+    for currency in sorted(currencies):
+        rows = db.execute(
+            select(ExchangeRate.id, ExchangeRate.date, ExchangeRate.valid_until)
+            .where(ExchangeRate.currency == currency)
+            .order_by(ExchangeRate.date)
+        ).all()
+        ends = [row.date for row in rows[1:]] + [None]
+        updates = [
+            {"_id": row.id, "_valid_until": end} for row, end in zip(rows, ends) if row.valid_until != end
+        ]
+        if updates:
+            db.execute(
+                sql_update(table)
+                .where(table.c.id == bindparam("_id"))
+                .values(valid_until=bindparam("_valid_until"), updated_at=datetime.utcnow()),
+                updates,
+            )
+
+
+def load_rates(
+    db: Session, rates: Iterable[Tuple[str, date, float]], *, chunk_size: int = LOAD_CHUNK_SIZE
+) -> Set[str]:
+    """
+    Insert or replace (currency, date, rate) rows and recompute the range
+    each rate covers, in one database transaction. Returns the currencies
+    whose rates changed.
+    """
+    currencies: Set[str] = set()
+    # (currency, date) -> row; a later row for the same day wins
+    chunk: Dict[RateKey, Dict[str, Any]] = {}
+    try:
+        for currency, day, rate in rates:
+            now = datetime.utcnow()
+            chunk[(currency, day)] = {
+                "currency": currency, "date": day, "rate": rate, "created_at": now, "updated_at": now,
+            }
+            currencies.add(currency)
+            if len(chunk) >= chunk_size:
+                _upsert(db, list(chunk.values()))
+                chunk = {}
+        if chunk:
+            _upsert(db, list(chunk.values()))
+        _link(db, currencies)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error loading exchange rates: {e}")
+        raise
+    return currencies
+
+
+def get_rates_version(db: Session) -> Tuple[int, Optional[datetime]]:
+    return tuple(db.execute(
+        select(func.count(ExchangeRate.id), func.max(ExchangeRate.updated_at))
+    ).one())
+
+
+def get_rates(db: Session, keys: Iterable[RateKey]) -> Dict[RateKey, Optional[float]]:
+    """
+    Rate of each (currency, day), or None when no loaded rate covers the
+    day. Served from the in-process cache; the version of the rate table is
+    read once per call, and the rates of every key not cached in one more
+    query over the ranges of their currencies between the first and last
+    day, resolved here.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    version = get_rates_version(db)
+
+    result: Dict[RateKey, Optional[float]] = {}
+    missing: List[RateKey] = []
+    for key in keys:
+        rate = _rates.get(key, version)
+        if rate is MISSING:
+            missing.append(key)
+        else:
+            result[key] = rate
+    if not missing:
+        return result
+
+    days = [day for _, day in missing]
+    # currency -> its rates ordered by date, whose ranges do not overlap
+    ranges: Dict[str, List[Any]] = defaultdict(list)
+    for row in db.execute(
+        select(ExchangeRate.currency, ExchangeRate.date, ExchangeRate.valid_until, ExchangeRate.rate)
+        .where(
+            ExchangeRate.currency.in_({currency for currency, _ in missing}),
+            ExchangeRate.date <= max(days),
+            or_(ExchangeRate.valid_until.is_(None), ExchangeRate.valid_until > min(days)),
+        )
+        .order_by(ExchangeRate.currency, ExchangeRate.date)
+    ):
+        ranges[row.currency].append(row)
+    starts = {currency: [row.date for row in rows] for currency, rows in ranges.items()}
+
+    for key in missing:
+        currency, day = key
+        rate = None
+        # The last rate starting on or before the day, if its range reaches it
+        index = bisect_right(starts.get(currency, []), day) - 1
+        if index >= 0:
+            row = ranges[currency][index]
+            if row.valid_until is None or row.valid_until > day:
+                rate = row.rate
+        result[key] = rate
+        _rates.put(key, version, rate)
+    return result
+
+
+def reporting_cents(db: Session, rows: Iterable[Any]) -> List[Optional[int]]:
+    """
+    Amount of each transaction in DEFAULT_CURRENCY, or None when its
+    currency has no rate for its date. The rates of the whole batch are
+    looked up together; batches entirely in DEFAULT_CURRENCY need none.
+    """
+    rows = list(rows)
+    keys = {
+        (row_field(row, "currency"), _day(row_field(row, "date")))
+        for row in rows
+        if (row_field(row, "currency") or DEFAULT_CURRENCY) != DEFAULT_CURRENCY and row_field(row, "date") is not None
+    }
+    rates = get_rates(db, keys)
+
+    result = []
+    for row in rows:
+        cents = row_field(row, "amount_cents")
+        currency = row_field(row, "currency") or DEFAULT_CURRENCY
+        if cents is None or currency == DEFAULT_CURRENCY:
+            result.append(cents)
+            continue
+        rate = rates.get((currency, _day(row_field(row, "date"))))
+        result.append(None if rate is None else convert(cents, rate))
+    return result
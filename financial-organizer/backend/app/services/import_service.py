@@ -0,0 +1,363 @@
+import csv
+import hashlib
+import io
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.core.money import to_cents
+from app.db.models import Transaction
+from app.schemas.transaction import TransactionImportSummary
+from app.services import categorization_service, dedupe_service, merchant_service, rollup_service, version_service
+
+# Statement formats and the file extensions they are detected from
+FORMAT_EXTENSIONS = {".csv": "csv", ".ofx": "ofx", ".qfx": "ofx", ".qif": "qif"}
+
+# Rows deduplicated and written per round trip
+IMPORT_CHUNK_SIZE = 5000
+
+# Characters read at a time from OFX files, which are often a single line
+OFX_READ_SIZE = 64 * 1024
+
+# Parse errors kept in the summary; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+# Repeat counters kept while numbering identical rows. Statements are sorted
+# by date, so the least recently seen dates are dropped first.
+MAX_REPEAT_KEYS = 100000
+
+# Header names recognised in CSV exports, compared lowercase
+CSV_DATE_COLUMNS = ("date", "transaction date", "posted date", "posting date", "trans. date")
+CSV_AMOUNT_COLUMNS = ("amount", "transaction amount")
+CSV_DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals")
+CSV_CREDIT_COLUMNS = ("credit", "deposit", "deposits")
+CSV_DESCRIPTION_COLUMNS = ("description", "details", "memo", "name", "payee")
+CSV_MERCHANT_COLUMNS = ("merchant", "merchant name", "payee", "name")
+CSV_ID_COLUMNS = ("transaction id", "fitid", "reference")
+
+DATE_FORMATS = (
+    "%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%Y%m%d",
+    "%d-%b-%Y", "%d %b %Y", "%b %d, %Y",
+)
+
+# Columns written for every imported row, in COPY order
+COPY_COLUMNS = (
+    "user_id", "card_id", "amount_cents", "description", "merchant_name", "date",
+    "transaction_type", "category", "category_rule_id", "merchant_id", "dedupe_key", "duplicate_of_id",
+    "fingerprint", "created_at", "updated_at",
+)
+
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+def detect_format(filename: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unsupported statement format: {extension or filename}")
+    return FORMAT_EXTENSIONS[extension]
+
+def _first(row: Dict[str, str], columns: Iterable[str]) -> Optional[str]:
+    for column in columns:
+        value = row.get(column)
+        if value and value.strip():
+            return value.strip()
+    return None
+
+def parse_csv(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [column.strip().lower() for column in header]
+    for row in reader:
+        if not any(row):
+            continue
+        record = dict(zip(header, row))
+        amount = _first(record, CSV_AMOUNT_COLUMNS)
+        if amount is None:
+            debit = _first(record, CSV_DEBIT_COLUMNS)
+            credit = _first(record, CSV_CREDIT_COLUMNS)
+            amount = "-" + debit.lstrip("-") if debit else credit
+        yield {
+            "line": reader.line_num,
+            "date": _first(record, CSV_DATE_COLUMNS),
+            "amount": amount,
+            "description": _first(record, CSV_DESCRIPTION_COLUMNS),
+            "merchant_name": _first(record, CSV_MERCHANT_COLUMNS),
+            "external_id": _first(record, CSV_ID_COLUMNS),
+        }
+
+def _ofx_tags(stream: TextIO) -> Iterator[tuple]:
+    # OFX 1.x is SGML without closing tags for values and frequently has no
+    # line breaks, so tags are split out of fixed-size reads instead of lines
+    buffer = ""
+    while True:
+        chunk = stream.read(OFX_READ_SIZE)
+        buffer += chunk
+        # Keep the last, possibly incomplete, tag for the next read
+        end = max(buffer.rfind("<"), 0) if chunk else len(buffer)
+        for match in OFX_TAG.finditer(buffer, 0, end):
+            yield match.group(1) == "/", match.group(2).upper(), match.group(3).strip()
+        buffer = buffer[end:]
+        if not chunk:
+            return
+
+def parse_ofx(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    record: Optional[Dict[str, Any]] = None
+    count = 0
+    for closing, tag, value in _ofx_tags(stream):
+        if tag == "STMTTRN":
+            if not closing:
+                count += 1
+                record = {"line": count}
+            elif record is not None:
+                yield {
+                    "line": record["line"],
+                    "date": record.get("DTPOSTED"),
+                    "amount": record.get("TRNAMT"),
+                    "description": record.get("MEMO") or record.get("NAME"),
+                    "merchant_name": record.get("NAME"),
+                    "external_id": record.get("FITID"),
+                }
+                record = None
+        elif record is not None and not closing and value:
+            record[tag] = value
+
+def parse_qif(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    record: Dict[str, Any] = {}
+    for line_num, line in enumerate(stream, start=1):
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if record:
+                yield {
+                    "line": record["line"],
+                    "date": record.get("D"),
+                    "amount": record.get("T") or record.get("U"),
+                    "description": record.get("M") or record.get("P"),
+                    "merchant_name": record.get("P"),
+                    "external_id": record.get("N"),
+                }
+            record = {}
+        else:
+            record.setdefault("line", line_num)
+            record.setdefault(code, value)
+
+PARSERS = {"csv": parse_csv, "ofx": parse_ofx, "qif": parse_qif}
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> datetime:
+    value = value.strip()
+    if re.fullmatch(r"\d{8}(\d{6})?(\.\d+)?(\[.*\])?", value):
+        # OFX: YYYYMMDD[HHMMSS[.XXX]][[TZ]]
+        return datetime.strptime(value[:8], "%Y%m%d")
+    if "'" in value:
+        # QIF writes two-digit years after an apostrophe (1/ 5'24)
+        value = value.replace(" ", "").replace("'", "/")
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value}")
+
+def parse_amount(value: str) -> Decimal:
+    value = value.strip()
+    negative = value.startswith("(") and value.endswith(")") or value.endswith("-")
+    cleaned = re.sub(r"[^\d.\-]", "", value.strip("()").rstrip("-"))
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"Unrecognised amount: {value}")
+    return -amount if negative else amount
+
+def clean_text(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return " ".join(value.split()) or None
+
+def normalize_records(
+    records: Iterable[Dict[str, Any]],
+    *,
+    summary: TransactionImportSummary,
+    invert_sign: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Turn raw parsed rows into transaction values. Rows that cannot be
+    parsed are counted on the summary and skipped.
+    """
+    for record in records:
+        summary.rows_read += 1
+        try:
+            if not record.get("date") or not record.get("amount"):
+                raise ValueError("Missing date or amount")
+            amount = parse_amount(record["amount"])
+            if invert_sign:
+                amount = -amount
+            description = clean_text(record.get("description"))
+            merchant_name = clean_text(record.get("merchant_name"))
+            yield {
+                "date": parse_date(record["date"]),
+                # Money leaving the account is a purchase, money coming in a payment
+                "amount_cents": to_cents(abs(amount)),
+                # Signed and truncated, as in fingerprints of earlier imports
+                "cents": int(amount * 100),
+                "transaction_type": "purchase" if amount < 0 else "payment",
+                "category": "other",
+                "description": description or merchant_name or "Imported transaction",
+                "merchant_name": merchant_name or description,
+                "external_id": record.get("external_id"),
+            }
+        except ValueError as e:
+            summary.failed += 1
+            if len(summary.errors) < MAX_REPORTED_ERRORS:
+                summary.errors.append(f"Line {record.get('line')}: {e}")
+
+def fingerprint_records(
+    records: Iterable[Dict[str, Any]], *, user_id: int, card_id: int
+) -> Iterator[Dict[str, Any]]:
+    """
+    Add a stable fingerprint to each row. Rows with a bank-issued id use it;
+    otherwise identical rows on the same day are numbered so that two real
+    coffees are kept while re-importing the same file adds nothing.
+    """
+    repeats: "OrderedDict[Any, Dict[str, int]]" = OrderedDict()
+    tracked = 0
+    for record in records:
+        if record["external_id"]:
+            key = f"{card_id}|id|{record['external_id']}"
+        else:
+            day = record["date"].date()
+            base = f"{record['cents']}|{merchant_service.canonical_name(record['merchant_name']) or ''}"
+            counters = repeats.get(day)
+            if counters is None:
+                counters = repeats[day] = {}
+            repeats.move_to_end(day)
+            occurrence = counters.get(base, 0)
+            counters[base] = occurrence + 1
+            if not occurrence:
+                tracked += 1
+                while tracked > MAX_REPEAT_KEYS and len(repeats) > 1:
+                    tracked -= len(repeats.popitem(last=False)[1])
+            key = f"{card_id}|{day.isoformat()}|{base}|{occurrence}"
+        record["fingerprint"] = hashlib.sha1(f"{user_id}|{key}".encode()).hexdigest()
+        yield record
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _copy_rows(db: Session, rows: List[Dict[str, Any]]) -> None:
+    # COPY ... FROM STDIN over the session's own connection, so the rows are
+    # part of the same database transaction as the duplicate check
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row[column].isoformat() if isinstance(row[column], datetime) else row[column]
+            for column in COPY_COLUMNS
+        ])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY transactions ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+def _write_rows(db: Session, rows: List[Dict[str, Any]]) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(Transaction), rows)
+
+def import_statement(
+    db: Session,
+    stream: TextIO,
+    *,
+    fmt: str,
+    user_id: int,
+    card_id: int,
+    invert_sign: bool = False,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> TransactionImportSummary:
+    """
+    Stream a statement into the transactions table. The file is parsed,
+    normalized and fingerprinted one row at a time and written in chunks,
+    so memory use does not grow with the file size. Each chunk is committed
+    on its own; an interrupted import can simply be run again.
+    """
+    if fmt not in PARSERS:
+        raise ValueError(f"Unsupported statement format: {fmt}")
+
+    summary = TransactionImportSummary(format=fmt)
+    records = fingerprint_records(
+        normalize_records(PARSERS[fmt](stream), summary=summary, invert_sign=invert_sign),
+        user_id=user_id,
+        card_id=card_id,
+    )
+    for chunk in _chunks(records, chunk_size):
+        fingerprints = {record["fingerprint"] for record in chunk}
+        existing = set(db.scalars(
+            select(Transaction.fingerprint).where(
+                Transaction.user_id == user_id,
+                Transaction.fingerprint.in_(fingerprints),
+            )
+        ))
+        now = datetime.utcnow()
+        rows = []
+        for record in chunk:
+            if record["fingerprint"] in existing:
+                summary.duplicates += 1
+                continue
+            # Also skip repeats of a bank id within the same chunk
+            existing.add(record["fingerprint"])
+            rows.append({
+                "user_id": user_id,
+                "card_id": card_id,
+                "amount_cents": record["amount_cents"],
+                "description": record["description"],
+                "merchant_name": record["merchant_name"],
+                "date": record["date"],
+                "transaction_type": record["transaction_type"],
+                "category": record["category"],
+                "category_rule_id": None,
+                "merchant_id": None,
+                "dedupe_key": None,
+                "duplicate_of_id": None,
+                "fingerprint": record["fingerprint"],
+                "created_at": now,
+                "updated_at": now,
+            })
+        try:
+            if rows:
+                merchant_service.assign(db, rows)
+                # Copies from other sources; repeats of imported rows are
+                # already skipped by fingerprint
+                dedupe_service.link(db, rows)
+                categorization_service.categorize(db, rows, user_id=user_id)
+                _write_rows(db, rows)
+                rollup_service.add(db, rows)
+                version_service.bump(db, [user_id])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error importing statement: {e}")
+            raise
+        summary.imported += len(rows)
+    return summary
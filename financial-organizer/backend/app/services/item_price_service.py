@@ -0,0 +1,272 @@
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import BigInteger, Date, Integer, cast, delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.money import from_cents
+from app.db.models import ItemPriceRollup, Merchant, Receipt, ReceiptLineItem, Transaction, User
+from app.schemas.receipt import ItemPriceHistory, ItemPricePoint
+
+# Fields of a transaction that move its items between rollups
+ITEM_PRICE_FIELDS = {"user_id", "date", "currency", "merchant_id", "merchant_name", "description"}
+
+# Periods a price history can be read per
+INTERVALS = ("day", "month")
+
+# Stored merchant_id of transactions without a merchant
+NO_MERCHANT = 0
+
+# Items recomputed per statement
+REFRESH_CHUNK_SIZE = 500
+
+# Users rebuilt and committed together
+REBUILD_USER_CHUNK_SIZE = 500
+
+# (user_id, item_key)
+ItemKey = Tuple[int, str]
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9%]+")
+
+
+def normalize_item_code(code: str) -> str:
+    """
+    Produce PLUs (4 or 5 digits) are printed zero-padded to the width of a
+    UPC by some stores; strip the padding so they match across stores.
+    Line items are stored and looked up by the normalized code.
+    """
+    stripped = code.lstrip("0")
+    return stripped if len(stripped) in (4, 5) else code
+
+
+def item_key(sku: Optional[str], name: Optional[str]) -> str:
+    """
+    Key an item's prices are tracked under: the code printed on the receipt
+    when there is one, else the name lowercased with punctuation collapsed,
+    so that "BANANAS" and "Bananas," are one item.
+    """
+    if sku:
+        return normalize_item_code(sku)
+    return _NON_WORD_RE.sub(" ", (name or "").lower()).strip()
+
+
+def _to_day(value: Any) -> date:
+    # SQLite returns date() as text
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _aggregate(db: Session, *conditions: Any) -> List[Dict[str, Any]]:
+    """
+    Rollup rows computed from the line items of receipts attached to a
+    transaction, grouped by key.
+    """
+    day = func.date(Transaction.date)
+    merchant_id = func.coalesce(Transaction.merchant_id, NO_MERCHANT)
+    # Unit prices not printed on the receipt are the line total per unit
+    unit_cents = func.coalesce(
+        ReceiptLineItem.unit_price_cents,
+        cast(func.round(ReceiptLineItem.total_cents / func.nullif(ReceiptLineItem.quantity, 0)), BigInteger),
+    )
+    now = datetime.utcnow()
+    return [
+        {
+            "user_id": row[0],
+            "item_key": row[1],
+            "day": _to_day(row[2]),
+            "merchant_id": row[3],
+            "currency": row[4],
+            "quantity": row[5],
+            "total_cents": row[6],
+            "count": row[7],
+            "min_unit_cents": row[8],
+            "max_unit_cents": row[9],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for row in db.execute(
+            select(
+                ReceiptLineItem.user_id,
+                ReceiptLineItem.item_key,
+                day,
+                merchant_id,
+                Transaction.currency,
+                func.sum(ReceiptLineItem.quantity),
+                # Postgres sums BIGINT into NUMERIC
+                cast(func.sum(ReceiptLineItem.total_cents), BigInteger),
+                func.count(),
+                func.min(unit_cents),
+                func.max(unit_cents),
+            )
+            .join(Receipt, Receipt.id == ReceiptLineItem.receipt_id)
+            .join(Transaction, Transaction.id == Receipt.transaction_id)
+            .where(Transaction.date.isnot(None), *conditions)
+            .group_by(ReceiptLineItem.user_id, ReceiptLineItem.item_key, day, merchant_id, Transaction.currency)
+        )
+    ]
+
+
+def items_of_transactions(db: Session, transaction_ids: Iterable[int]) -> Set[ItemKey]:
+    """
+    Items on the receipts of the given transactions. Read before the
+    transactions change, so that their rollups can be refreshed afterwards.
+    """
+    transaction_ids = set(transaction_ids)
+    if not transaction_ids:
+        return set()
+    return set(db.execute(
+        select(ReceiptLineItem.user_id, ReceiptLineItem.item_key)
+        .join(Receipt, Receipt.id == ReceiptLineItem.receipt_id)
+        .where(Receipt.transaction_id.in_(transaction_ids))
+        .distinct()
+    ).all())
+
+
+def refresh(db: Session, items: Iterable[ItemKey]) -> None:
+    """
+    Recompute every rollup of the given items from their line items,
+    through the (user_id, item_key) index. An item has one line per
+    purchase, so its whole history is cheap to recompute. The caller
+    flushes pending changes first and commits afterwards.
+    """
+    by_user: Dict[int, Set[str]] = defaultdict(set)
+    for user_id, key in items:
+        by_user[user_id].add(key)
+
+    for user_id, keys in by_user.items():
+        keys = sorted(keys)
+        for start in range(0, len(keys), REFRESH_CHUNK_SIZE):
+            chunk = keys[start:start + REFRESH_CHUNK_SIZE]
+            values = _aggregate(db, ReceiptLineItem.user_id == user_id, ReceiptLineItem.item_key.in_(chunk))
+            db.execute(
+                delete(ItemPriceRollup).where(ItemPriceRollup.user_id == user_id, ItemPriceRollup.item_key.in_(chunk))
+            )
+            if values:
+                db.execute(ItemPriceRollup.__table__.insert(), values)
+
+
+def rebuild(db: Session, *, user_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute the item price rollups of the given users (all users by
+    default) from scratch, committing per chunk of users. Returns the
+    rollups written.
+    """
+    if user_ids is None:
+        user_ids = list(db.scalars(select(User.id).order_by(User.id)))
+
+    written = 0
+    for start in range(0, len(user_ids), REBUILD_USER_CHUNK_SIZE):
+        chunk = user_ids[start:start + REBUILD_USER_CHUNK_SIZE]
+        values = _aggregate(db, ReceiptLineItem.user_id.in_(chunk))
+        try:
+            db.execute(delete(ItemPriceRollup).where(ItemPriceRollup.user_id.in_(chunk)))
+            if values:
+                db.execute(ItemPriceRollup.__table__.insert(), values)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error rebuilding item prices: {e}")
+            raise
+        written += len(values)
+    return written
+
+
+def _unit_cents(total_cents: int, quantity: float) -> Optional[int]:
+    return round(total_cents / quantity) if quantity else None
+
+
+def _price_change(points: List[ItemPricePoint]) -> Optional[float]:
+    """
+    Change of the average unit price from the first month of the history to
+    the last, in the currency of the latest purchase, or None when there is
+    only one month.
+    """
+    currency = points[-1].currency
+    # month -> [total, quantity]
+    months: Dict[date, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for point in points:
+        if point.currency == currency:
+            month = months[point.date.replace(day=1)]
+            month[0] += float(point.total)
+            month[1] += point.quantity
+    first, last = months[min(months)], months[max(months)]
+    if len(months) < 2 or not first[1] or not last[1] or not first[0]:
+        return None
+    return round((last[0] / last[1]) / (first[0] / first[1]) - 1, 4)
+
+
+def _period_start(column: Any, interval: str, dialect: str) -> Any:
+    if interval == "day":
+        return column
+    if dialect == "postgresql":
+        return cast(func.date_trunc("month", column), Date)
+    return func.strftime("%Y-%m-01", column)
+
+
+def get_history(
+    db: Session,
+    *,
+    user_id: int,
+    sku: Optional[str] = None,
+    name: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    interval: str = "day",
+) -> ItemPriceHistory:
+    """
+    Unit prices the user paid for an item at each store per day, or per
+    month (see INTERVALS) for charts over years, oldest first. Read from
+    the rollups through their unique key.
+    """
+    key = item_key(sku, name)
+    conditions = [ItemPriceRollup.user_id == user_id, ItemPriceRollup.item_key == key]
+    if start is not None:
+        conditions.append(ItemPriceRollup.day >= start)
+    if end is not None:
+        conditions.append(ItemPriceRollup.day <= end)
+    period = _period_start(ItemPriceRollup.day, interval, db.get_bind().dialect.name)
+    totals = (
+        select(
+            period.label("period"),
+            ItemPriceRollup.merchant_id,
+            ItemPriceRollup.currency,
+            func.sum(ItemPriceRollup.quantity).label("quantity"),
+            # Postgres sums BIGINT into NUMERIC
+            cast(func.sum(ItemPriceRollup.total_cents), BigInteger).label("total_cents"),
+            cast(func.sum(ItemPriceRollup.count), Integer).label("count"),
+            func.min(ItemPriceRollup.min_unit_cents).label("min_unit_cents"),
+            func.max(ItemPriceRollup.max_unit_cents).label("max_unit_cents"),
+        )
+        .where(*conditions)
+        .group_by(period, ItemPriceRollup.merchant_id, ItemPriceRollup.currency)
+        .subquery()
+    )
+    rows = db.execute(
+        select(totals, Merchant.display_name)
+        .outerjoin(Merchant, Merchant.id == totals.c.merchant_id)
+        .order_by(totals.c.period, totals.c.merchant_id, totals.c.currency)
+    ).all()
+
+    points = [
+        ItemPricePoint(
+            date=_to_day(row.period),
+            merchant_id=row.merchant_id or None,
+            merchant=row.display_name,
+            currency=row.currency,
+            unit_price=from_cents(_unit_cents(row.total_cents, row.quantity)),
+            min_unit_price=from_cents(row.min_unit_cents),
+            max_unit_price=from_cents(row.max_unit_cents),
+            quantity=row.quantity,
+            total=from_cents(row.total_cents),
+            count=row.count,
+        )
+        for row in rows
+    ]
+    return ItemPriceHistory(
+        item_key=key,
+        points=points,
+        price_change=_price_change(points) if points else None,
+    )
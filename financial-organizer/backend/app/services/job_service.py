@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.db.models import JobState
+
+
+def get_watermark(db: Session, name: str) -> int:
+    """
+    Return the id of the last transaction processed by an incremental job.
+    """
+    state = db.query(JobState).filter(JobState.name == name).first()
+    return state.last_transaction_id if state else 0
+
+
+def set_watermark(db: Session, name: str, last_transaction_id: int) -> None:
+    """
+    Record the id of the last transaction processed by an incremental job.
+    The caller commits.
+    """
+    state = db.query(JobState).filter(JobState.name == name).first()
+    if not state:
+        state = JobState(name=name)
+        db.add(state)
+    state.last_transaction_id = last_transaction_id
+    state.last_run_at = datetime.utcnow()
@@ -0,0 +1,240 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import BigInteger, bindparam, case, cast, func, or_, select
+from sqlalchemy import update as sql_update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.money import DEFAULT_CURRENCY, from_cents
+from app.db.models import ExchangeRate, Merchant, Transaction
+from app.db.rows import row_field
+from app.schemas.merchant import MerchantSpending
+from app.services import fx_service
+from app.services.rollup_service import SPENDING_SIGNS
+
+# Distinct raw merchant strings whose canonical name is remembered
+NORMALIZE_CACHE_SIZE = 65536
+
+# Transactions read and linked to their merchant per commit by the backfill
+BACKFILL_CHUNK_SIZE = 10000
+
+# Payment processors that prefix the merchant ("SQ *BLUE BOTTLE", "PAYPAL *NETFLIX")
+_PROCESSOR_RE = re.compile(r"^(?:sq|tst|sp|pp|paypal|py|ic|dd|google|ggl|apl|pos)\s*\*\s*")
+# Store numbers, order ids and terminal references after a * or #
+_REFERENCE_RE = re.compile(r"\s*[*#].*$")
+# Apostrophes and ampersands join words ("trader joe's", "at&t")
+_JOINER_RE = re.compile(r"['’&]")
+_NON_LETTERS_RE = re.compile(r"[^a-z]+")
+
+# Words that do not tell merchants apart
+NOISE_WORDS = {"www", "com", "net", "org", "inc", "llc", "ltd", "corp", "co", "the"}
+
+# Canonical names of merchants known to appear under several spellings, by
+# the leading words of their normalized name; the longest match wins
+MERCHANT_ALIASES = {
+    ("amzn",): "amazon",
+    ("amazon",): "amazon",
+    ("amazon", "prime"): "amazon prime",
+    ("amzn", "prime"): "amazon prime",
+    ("prime", "video"): "amazon prime",
+    ("walmart",): "walmart",
+    ("wal", "mart"): "walmart",
+    ("wm", "supercenter"): "walmart",
+    ("apple",): "apple",
+    ("itunes",): "apple",
+    ("uber",): "uber",
+    ("uber", "eats"): "uber eats",
+    ("ubereats",): "uber eats",
+    ("lyft",): "lyft",
+    ("starbucks",): "starbucks",
+    ("mcdonalds",): "mcdonalds",
+    ("netflix",): "netflix",
+    ("spotify",): "spotify",
+    ("costco",): "costco",
+    ("costco", "whse"): "costco",
+    ("target",): "target",
+    ("shell",): "shell",
+    ("wholefds",): "whole foods",
+    ("whole", "foods"): "whole foods",
+}
+_LONGEST_ALIAS = max(len(prefix) for prefix in MERCHANT_ALIASES)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _canonical_words(text: str) -> Optional[str]:
+    words = tuple(word for word in _NON_LETTERS_RE.sub(" ", _JOINER_RE.sub("", text)).split() if word not in NOISE_WORDS)
+    if not words:
+        return None
+    for length in range(min(_LONGEST_ALIAS, len(words)), 0, -1):
+        alias = MERCHANT_ALIASES.get(words[:length])
+        if alias is not None:
+            return alias
+    return " ".join(words)
+
+
+def canonical_name(raw: Optional[str]) -> Optional[str]:
+    """
+    Reduce raw merchant text from a bank feed, statement or receipt to the
+    name it is interned under: processor prefixes, references, digits,
+    punctuation and noise words are dropped and known variants collapsed
+    ("AMZN Mktp US*2K4X" and "AMAZON.COM" both become "amazon"). None when
+    nothing is left. Memoized after the reference is cut off, since raw
+    strings rarely repeat but what precedes the reference does.
+    """
+    if not raw:
+        return None
+    return _canonical_words(_REFERENCE_RE.sub("", _PROCESSOR_RE.sub("", raw.lower().strip())))
+
+
+def display_name(name: str) -> str:
+    return name.title()
+
+
+def intern(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Ids of the merchants with the given canonical names, inserting the ones
+    that do not exist yet. Runs in the caller's database transaction.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    ids = dict(db.execute(select(Merchant.name, Merchant.id).where(Merchant.name.in_(names))).all())
+    missing = names.difference(ids)
+    if missing:
+        if db.get_bind().dialect.name == "postgresql":
+            stmt = postgresql.insert(Merchant.__table__)
+        else:
+            stmt = sqlite.insert(Merchant.__table__)
+        now = datetime.utcnow()
+        # Another request may intern the same name first
+        db.execute(
+            stmt.on_conflict_do_nothing(index_elements=["name"]),
+            [
+                {"name": name, "display_name": display_name(name), "created_at": now, "updated_at": now}
+                for name in sorted(missing)
+            ],
+        )
+        ids.update(db.execute(select(Merchant.name, Merchant.id).where(Merchant.name.in_(missing))).all())
+    return ids
+
+
+def assign(db: Session, rows: Iterable[Any]) -> None:
+    """
+    Link new or edited transactions to their merchant, interning the
+    merchants of the whole batch together. Runs before the rows are
+    written; the caller commits.
+    """
+    rows = list(rows)
+    names = [
+        canonical_name(row_field(row, "merchant_name") or row_field(row, "description"))
+        for row in rows
+    ]
+    ids = intern(db, {name for name in names if name is not None})
+    for row, name in zip(rows, names):
+        merchant_id = ids.get(name) if name is not None else None
+        if isinstance(row, dict):
+            row["merchant_id"] = merchant_id
+        else:
+            row.merchant_id = merchant_id
+
+
+def backfill(db: Session, *, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Link the transactions written before merchants were interned, reading
+    them by primary key range and committing per chunk so the job can be
+    interrupted and run again. Returns the number of transactions linked.
+    """
+    linked = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Transaction.id, Transaction.merchant_name, Transaction.description)
+            .where(Transaction.id > last_id, Transaction.merchant_id.is_(None))
+            .order_by(Transaction.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        names = {row.id: canonical_name(row.merchant_name or row.description) for row in rows}
+        try:
+            ids = intern(db, {name for name in names.values() if name is not None})
+            updates = [{"_id": id, "_merchant_id": ids[name]} for id, name in names.items() if name is not None]
+            if updates:
+                # One executemany UPDATE by primary key; updated_at is kept
+                # since nothing the user sees changes
+                table = Transaction.__table__
+                db.execute(
+                    sql_update(table)
+                    .where(table.c.id == bindparam("_id"))
+                    .values(merchant_id=bindparam("_merchant_id"), updated_at=table.c.updated_at),
+                    updates,
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error linking merchants: {e}")
+            raise
+        linked += len(updates)
+    return linked
+
+
+def get_spending(
+    db: Session,
+    *,
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = 50,
+) -> List[MerchantSpending]:
+    """
+    The user's spending per merchant, largest first. Transactions are
+    grouped by merchant id; names are only joined in for the returned rows.
+    """
+    cents = fx_service.converted_cents()
+    signed = case(*[(Transaction.transaction_type == name, cents * sign) for name, sign in SPENDING_SIGNS.items()])
+    conditions = [
+        Transaction.user_id == user_id,
+        Transaction.merchant_id.isnot(None),
+        Transaction.transaction_type.in_(SPENDING_SIGNS),
+        # Amounts in a currency without a rate for their date are left out
+        or_(Transaction.currency == DEFAULT_CURRENCY, ExchangeRate.id.isnot(None)),
+    ]
+    if start_date is not None:
+        conditions.append(Transaction.date >= start_date)
+    if end_date is not None:
+        conditions.append(Transaction.date <= end_date)
+    totals = (
+        select(
+            Transaction.merchant_id,
+            cast(func.sum(signed), BigInteger).label("total_cents"),
+            func.count().label("count"),
+            func.max(Transaction.date).label("last_date"),
+        )
+        .outerjoin(ExchangeRate, fx_service.RATE_JOIN)
+        .where(*conditions)
+        .group_by(Transaction.merchant_id)
+        .order_by(func.sum(signed).desc(), Transaction.merchant_id)
+        .limit(limit)
+        .subquery()
+    )
+    rows = db.execute(
+        select(Merchant.id, Merchant.name, Merchant.display_name, totals.c.total_cents, totals.c.count, totals.c.last_date)
+        .join(totals, totals.c.merchant_id == Merchant.id)
+        .order_by(totals.c.total_cents.desc(), Merchant.id)
+    ).all()
+    return [
+        MerchantSpending(
+            merchant_id=row.id,
+            name=row.name,
+            display_name=row.display_name,
+            total=from_cents(row.total_cents),
+            count=row.count,
+            last_date=row.last_date,
+        )
+        for row in rows
+    ]
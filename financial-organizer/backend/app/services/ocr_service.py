@@ -1,4 +1,5 @@
 import os
+import re
 from typing import Dict, Any, Optional
 import pytesseract
 from PIL import Image
@@ -7,6 +8,24 @@ from pyzbar.pyzbar import decode
 import json
 
 from app.core.config import settings
+from app.services.item_price_service import normalize_item_code
+
+# An item line: an optional item code, the name, an optional
+# "quantity @ unit price" and the line total, optionally followed by a tax
+# flag ("4011 BANANAS 2 @ 0.59 1.18 F")
+_ITEM_RE = re.compile(
+    r"^(?:(?P<sku>\d{4,14})\s+)?"
+    r"(?P<name>.*?[A-Za-z].*?)"
+    r"(?:\s+(?P<quantity>\d+(?:\.\d+)?)\s*[@xX]\s*\$?(?P<unit_price>\d+\.\d{2}))?"
+    r"\s+\$?(?P<total>-?\d+\.\d{2})(?:\s+[A-Z])?$"
+)
+
+# An item code printed after the name, as many grocery chains do, with
+# optional tax or department letters ("BANANAS 000000004011KF")
+_TRAILING_CODE_RE = re.compile(r"^(?P<name>.*?[A-Za-z].*?)\s+(?P<code>\d{4,14})[A-Z]{0,2}$")
+
+# Lines with a price that are not items
+_NON_ITEM_WORDS = ('TOTAL', 'TAX', 'CHANGE', 'CASH', 'TENDER', 'BALANCE', 'VISA', 'MASTERCARD', 'DEBIT', 'CREDIT')
 
 class OCRService:
     @staticmethod
@@ -29,8 +48,9 @@ class OCRService:
             barcodes = decode(image)
             barcode_data = [barcode.data.decode('utf-8') for barcode in barcodes] if barcodes else []
 
-            # Parse the extracted text
+            # Parse the extracted text, keeping the raw text for search
             parsed_data = OCRService._parse_receipt_text(text)
+            parsed_data['raw_text'] = text
             
             # Add barcode data if found
             if barcode_data:
@@ -73,9 +93,9 @@ class OCRService:
                 pass
 
             # Try to identify items and prices
-            if '$' in line:
-                # Add item parsing logic here
-                pass
+            item = OCRService._parse_item(line)
+            if item:
+                parsed_data['items'].append(item)
 
             # Try to identify total
             if 'TOTAL' in line.upper():
@@ -86,6 +106,28 @@ class OCRService:
 
         return parsed_data
 
+    @staticmethod
+    def _parse_item(line: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse one receipt line into an item (sku, name, quantity, unit_price,
+        total), or None when the line is not an item.
+        """
+        if any(word in line.upper() for word in _NON_ITEM_WORDS):
+            return None
+        match = _ITEM_RE.match(line)
+        if not match:
+            return None
+        total = float(match.group('total'))
+        quantity = float(match.group('quantity') or 1)
+        unit_price = match.group('unit_price')
+        return {
+            'sku': match.group('sku'),
+            'name': match.group('name').strip(),
+            'quantity': quantity,
+            'unit_price': float(unit_price) if unit_price else round(total / quantity, 2),
+            'total': total,
+        }
+
     @staticmethod
     async def process_grocery_receipt(file_path: str) -> Dict[str, Any]:
         """
@@ -95,11 +137,15 @@ class OCRService:
             # First process the receipt normally
             receipt_data = await OCRService.process_receipt(file_path)
             
-            # Add grocery-specific processing
-            if receipt_data.get('merchant_name'):
-                # Add grocery store specific parsing logic here
-                # This would include looking for item codes, quantities, and prices
-                pass
+            # Item codes, used to track the price of an item across receipts
+            for item in receipt_data['items']:
+                if not item['sku']:
+                    match = _TRAILING_CODE_RE.match(item['name'])
+                    if match:
+                        item['name'] = match.group('name')
+                        item['sku'] = normalize_item_code(match.group('code'))
+                else:
+                    item['sku'] = normalize_item_code(item['sku'])
 
             return receipt_data
 
@@ -11,8 +11,12 @@ from plaid.model.country_code import CountryCode
 from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
 
 from app.core.config import settings
+from app.core.money import DEFAULT_CURRENCY
 from app.db.models import Transaction, Card
 from app.schemas.transaction import TransactionCreate
+from app.services import (
+    categorization_service, category_model_service, dedupe_service, merchant_service, rollup_service, version_service
+)
 
 class PlaidService:
     def __init__(self):
@@ -93,6 +97,7 @@ class PlaidService:
                 if not existing:
                     transaction_data = TransactionCreate(
                         amount=float(plaid_transaction.amount),
+                        currency=plaid_transaction.iso_currency_code or DEFAULT_CURRENCY,
                         description=plaid_transaction.name,
                         transaction_type="purchase",  # Default to purchase
                         category="other",  # Default category
@@ -109,6 +114,14 @@ class PlaidService:
                     db.add(transaction)
                     saved_transactions.append(transaction)
 
+            if saved_transactions:
+                merchant_service.assign(db, saved_transactions)
+                dedupe_service.link(db, saved_transactions)
+                categorization_service.categorize(db, saved_transactions, user_id=user_id)
+                # Whatever no rule matched is predicted from the user's history
+                category_model_service.predict(db, saved_transactions, user_id=user_id)
+                rollup_service.add(db, saved_transactions)
+                version_service.bump(db, [user_id])
             db.commit()
             return saved_transactions
 
@@ -1,31 +1,71 @@
+from datetime import datetime
 from typing import Any, Dict, Optional, Union, List
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.db.models import Receipt
-from app.schemas.receipt import ReceiptCreate, ReceiptUpdate
+from app.core.money import DEFAULT_CURRENCY, from_cents, to_cents
+from app.db.models import ExchangeRate, Receipt, ReceiptLineItem, Transaction
+from app.schemas.receipt import ItemSpending, ReceiptCreate, ReceiptUpdate
+from app.services import fx_service, item_price_service
+
+# Receipts are returned with their line items, loaded in one more query
+# for any number of receipts
+LINE_ITEMS = selectinload(Receipt.line_items)
 
 def get(db: Session, id: Any) -> Optional[Receipt]:
-    return db.query(Receipt).filter(Receipt.id == id).first()
+    return db.query(Receipt).options(LINE_ITEMS).filter(Receipt.id == id).first()
 
 def get_by_transaction(db: Session, transaction_id: int) -> Optional[Receipt]:
-    return db.query(Receipt).filter(Receipt.transaction_id == transaction_id).first()
+    return db.query(Receipt).options(LINE_ITEMS).filter(Receipt.transaction_id == transaction_id).first()
 
 def get_multi(
     db: Session, *, transaction_id: int, skip: int = 0, limit: int = 100
 ) -> List[Receipt]:
     return (
         db.query(Receipt)
+        .options(LINE_ITEMS)
         .filter(Receipt.transaction_id == transaction_id)
         .offset(skip)
         .limit(limit)
         .all()
     )
 
-def create(db: Session, *, obj_in: ReceiptCreate) -> Receipt:
-    db_obj = Receipt(**obj_in.model_dump())
-    db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+def create(db: Session, *, obj_in: ReceiptCreate, user_id: int) -> Receipt:
+    """
+    Store a receipt and its line items, the items with one executemany
+    insert ... RETURNING, and refresh the price history of its items, in
+    one commit.
+    """
+    db_obj = Receipt(**obj_in.model_dump(exclude={"line_items"}), line_items=[])
+    try:
+        db.add(db_obj)
+        db.flush()
+        if obj_in.line_items:
+            rows = [
+                {
+                    "receipt_id": db_obj.id,
+                    "user_id": user_id,
+                    "sku": item.sku and item_price_service.normalize_item_code(item.sku),
+                    "name": item.name,
+                    "item_key": item_price_service.item_key(item.sku, item.name),
+                    "quantity": item.quantity,
+                    "unit_price_cents": to_cents(item.unit_price),
+                    "total_cents": to_cents(item.total),
+                }
+                for item in obj_in.line_items
+            ]
+            # The insert returns the stored items, so the response needs no
+            # reload. RETURNING order is not guaranteed for a batch; sort like
+            # the relationship does.
+            line_items = db.scalars(insert(ReceiptLineItem).returning(ReceiptLineItem), rows).all()
+            set_committed_value(db_obj, "line_items", sorted(line_items, key=lambda item: item.id))
+            item_price_service.refresh(db, {(user_id, row["item_key"]) for row in rows})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error creating receipt: {e}")
+        raise
     return db_obj
 
 def update(
@@ -42,11 +82,69 @@ def update(
         setattr(db_obj, field, value)
     db.add(db_obj)
     db.commit()
-    db.refresh(db_obj)
     return db_obj
 
 def remove(db: Session, *, id: int) -> Receipt:
-    obj = db.query(Receipt).get(id)
+    obj = get(db, id)
+    if obj is None:
+        return None
+    items = {(item.user_id, item.item_key) for item in obj.line_items}
     db.delete(obj)
+    db.flush()
+    item_price_service.refresh(db, items)
     db.commit()
-    return obj 
\ No newline at end of file
+    return obj
+
+def get_item_spending(
+    db: Session,
+    *,
+    user_id: int,
+    sku: Optional[str] = None,
+    name: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> ItemSpending:
+    """
+    The user's spending on one item, found by item code or by name (case
+    insensitive) through the line item indexes. Totals are converted to
+    DEFAULT_CURRENCY like the spending rollups.
+    """
+    if sku is not None:
+        condition = ReceiptLineItem.sku == item_price_service.normalize_item_code(sku)
+    elif name is not None:
+        condition = func.lower(ReceiptLineItem.name) == name.lower()
+    else:
+        raise ValueError("An item code or name is required")
+
+    conditions = [
+        ReceiptLineItem.user_id == user_id,
+        condition,
+        # Amounts in a currency without a rate for their date are left out
+        or_(Transaction.currency == DEFAULT_CURRENCY, ExchangeRate.id.isnot(None)),
+    ]
+    if start_date is not None:
+        conditions.append(Transaction.date >= start_date)
+    if end_date is not None:
+        conditions.append(Transaction.date <= end_date)
+
+    total, quantity, count, last_date = db.execute(
+        select(
+            func.sum(fx_service.converted_cents(ReceiptLineItem.total_cents, Transaction.currency)),
+            func.sum(ReceiptLineItem.quantity),
+            func.count(),
+            func.max(Transaction.date),
+        )
+        .select_from(ReceiptLineItem)
+        .join(Receipt, Receipt.id == ReceiptLineItem.receipt_id)
+        .join(Transaction, Transaction.id == Receipt.transaction_id)
+        .outerjoin(ExchangeRate, fx_service.RATE_JOIN)
+        .where(*conditions)
+    ).one()
+    return ItemSpending(
+        sku=sku,
+        name=name,
+        total=from_cents(int(total or 0)),
+        quantity=quantity or 0,
+        count=count,
+        last_date=last_date,
+    )
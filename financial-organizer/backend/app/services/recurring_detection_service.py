@@ -0,0 +1,294 @@
+import math
+import statistics
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.db.models import RecurringSuggestion, Transaction
+from app.services import job_service
+from app.services.merchant_service import canonical_name
+from app.services.recurring_transaction_service import get_occurrence
+
+DETECTION_JOB = "recurring_detection"
+
+# A group needs this many charges, with this share of its gaps matching one
+# period, before it is suggested as a subscription
+MIN_OCCURRENCES = 3
+MIN_CONFIDENCE = 0.75
+
+# Amounts within roughly 10% of each other fall in the same band
+AMOUNT_BAND_RATIO = 1.1
+
+# Expected gap in days and accepted deviation for each detectable frequency
+FREQUENCY_PERIODS = {
+    "weekly": (7.0, 1),
+    "biweekly": (14.0, 2),
+    "monthly": (30.44, 3),
+    "quarterly": (91.31, 7),
+    "yearly": (365.25, 10),
+}
+
+# Rows generated from existing schedules are not new subscriptions
+GENERATED_DESCRIPTION_SUFFIXES = ("(Recurring)", "(Manual process)")
+
+# Rows fetched per round trip and users whose suggestions are saved together
+STREAM_BATCH_SIZE = 10000
+USER_CHUNK_SIZE = 500
+
+# Transaction ids below the watermark scanned again on every run, for rows
+# committed after a run that had already seen higher ids (a large import
+# writes a few thousand rows per database transaction)
+WATERMARK_OVERLAP = 20000
+
+GroupKey = Tuple[str, int]
+
+
+def amount_band(amount: float) -> int:
+    amount = abs(amount or 0.0)
+    if amount < 0.01:
+        return 0
+    return round(math.log(amount) / math.log(AMOUNT_BAND_RATIO))
+
+
+def _dollars(cents: Optional[int]) -> float:
+    # Bands only need the magnitude, so a float will do
+    return (cents or 0) / 100
+
+
+def group_key(merchant_name: Optional[str], description: Optional[str], amount: float) -> Optional[GroupKey]:
+    """
+    Return the (canonical merchant name, amount band) bucket of a
+    transaction, or None when it cannot be part of a detected subscription.
+    """
+    if description and description.endswith(GENERATED_DESCRIPTION_SUFFIXES):
+        return None
+    merchant = canonical_name(merchant_name or description)
+    if merchant is None:
+        return None
+    return merchant, amount_band(amount)
+
+
+def detect_frequency(dates: List[date]) -> Optional[Tuple[str, float]]:
+    """
+    Test the gaps between charge dates against each frequency and return
+    (frequency, confidence) for the matching one, if any.
+    """
+    if len(dates) < MIN_OCCURRENCES:
+        return None
+    days = sorted({d.toordinal() for d in dates})
+    if len(days) < MIN_OCCURRENCES:
+        return None
+
+    gaps = [later - earlier for earlier, later in zip(days, days[1:])]
+    median = statistics.median(gaps)
+    for frequency, (period, tolerance) in FREQUENCY_PERIODS.items():
+        if abs(median - period) <= tolerance:
+            confidence = sum(abs(gap - period) <= tolerance for gap in gaps) / len(gaps)
+            if confidence >= MIN_CONFIDENCE:
+                return frequency, confidence
+            return None
+    return None
+
+
+class _Group:
+    """Charges of one (user, merchant, amount band) bucket."""
+    __slots__ = ("dates", "total", "latest")
+
+    def __init__(self) -> None:
+        self.dates: List[date] = []
+        # In cents
+        self.total = 0
+        self.latest: Any = None
+
+    def add(self, row: Any) -> None:
+        self.dates.append(row.date)
+        self.total += abs(row.amount_cents or 0)
+        self.latest = row
+
+
+def run_incremental(db: Session, *, today: Optional[date] = None) -> int:
+    """
+    Look for subscriptions among transactions added since the last run.
+
+    Only (user, merchant, amount band) groups that received new transactions
+    are re-analysed, using their full history; the first run analyses every
+    group in a single pass. Suggestions of every group are first expired
+    once their charges stopped, whether or not the group received anything
+    new. Returns the number of transactions scanned.
+    """
+    today = today or datetime.now().date()
+    _expire_suggestions(db, today)
+    watermark = job_service.get_watermark(db, DETECTION_JOB)
+    last_id = db.scalar(select(func.max(Transaction.id))) or 0
+
+    history = select(
+        Transaction.user_id,
+        Transaction.merchant_name,
+        Transaction.description,
+        Transaction.amount_cents,
+        Transaction.transaction_type,
+        Transaction.category,
+        Transaction.date,
+    ).where(Transaction.id <= last_id)
+
+    if watermark == 0:
+        scanned = _analyze(db, history, None, today)
+    else:
+        # Hash the new transactions into the groups they touch. Ids are
+        # handed out before commit, so rows of transactions still open at
+        # the last run can sit below the watermark: the trailing window is
+        # scanned again.
+        affected: Dict[int, Set[GroupKey]] = defaultdict(set)
+        new_rows = db.execute(
+            select(
+                Transaction.user_id,
+                Transaction.merchant_name,
+                Transaction.description,
+                Transaction.amount_cents,
+            )
+            .where(Transaction.id > watermark - WATERMARK_OVERLAP, Transaction.id <= last_id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        scanned = 0
+        for row in new_rows:
+            scanned += 1
+            key = group_key(row.merchant_name, row.description, _dollars(row.amount_cents))
+            if key is not None:
+                affected[row.user_id].add(key)
+
+        user_ids = sorted(affected)
+        for start in range(0, len(user_ids), USER_CHUNK_SIZE):
+            chunk = user_ids[start:start + USER_CHUNK_SIZE]
+            _analyze(db, history.where(Transaction.user_id.in_(chunk)), affected, today)
+
+    job_service.set_watermark(db, DETECTION_JOB, max(last_id, watermark))
+    db.commit()
+    return scanned
+
+
+def _expire_suggestions(db: Session, today: date) -> None:
+    """
+    Delete the suggestions, other than dismissed ones, of subscriptions that
+    stopped charging two periods ago, as _save_suggestions() does for the
+    groups it analyses. The caller commits.
+    """
+    # (today - last_date).days > 2 * period, in whole days
+    expired = [
+        and_(
+            RecurringSuggestion.frequency == frequency,
+            RecurringSuggestion.last_date < today - timedelta(days=math.floor(2 * period)),
+        )
+        for frequency, (period, _) in FREQUENCY_PERIODS.items()
+    ]
+    db.execute(
+        delete(RecurringSuggestion)
+        .where(RecurringSuggestion.is_dismissed == False, or_(*expired))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _analyze(
+    db: Session, history: Any, affected: Optional[Dict[int, Set[GroupKey]]], today: date
+) -> int:
+    """
+    Stream ``history`` ordered by user, bucket each row by group key and
+    save the suggestions of every ``USER_CHUNK_SIZE`` users. When ``affected``
+    is given, only those groups are considered.
+    """
+    groups: Dict[Tuple[int, str, int], _Group] = {}
+    user_ids: List[int] = []
+    rows = 0
+    result = db.execute(
+        history.order_by(Transaction.user_id, Transaction.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    for row in result:
+        rows += 1
+        if not user_ids or user_ids[-1] != row.user_id:
+            if len(user_ids) >= USER_CHUNK_SIZE:
+                _save_suggestions(db, user_ids, groups, today)
+                groups, user_ids = {}, []
+            user_ids.append(row.user_id)
+
+        if row.date is None:
+            continue
+        key = group_key(row.merchant_name, row.description, _dollars(row.amount_cents))
+        if key is None or (affected is not None and key not in affected[row.user_id]):
+            continue
+        group = groups.get((row.user_id, *key))
+        if group is None:
+            group = groups[(row.user_id, *key)] = _Group()
+        group.add(row)
+
+    if user_ids:
+        _save_suggestions(db, user_ids, groups, today)
+    return rows
+
+
+def _save_suggestions(
+    db: Session, user_ids: List[int], groups: Dict[Tuple[int, str, int], _Group], today: date
+) -> None:
+    existing = {
+        (s.user_id, s.merchant_key, s.amount_band): s
+        for s in db.query(RecurringSuggestion).filter(RecurringSuggestion.user_id.in_(user_ids))
+    }
+
+    for (user_id, merchant_key, band), group in groups.items():
+        suggestion = existing.get((user_id, merchant_key, band))
+        detected = detect_frequency(group.dates)
+        last_date = max(group.dates)
+        if isinstance(last_date, datetime):
+            last_date = last_date.date()
+        if detected:
+            frequency, confidence = detected
+            period = FREQUENCY_PERIODS[frequency][0]
+            # Subscriptions that stopped charging two periods ago are over
+            if (today - last_date).days > 2 * period:
+                detected = None
+
+        if not detected:
+            if suggestion is not None and not suggestion.is_dismissed:
+                db.delete(suggestion)
+            continue
+
+        if suggestion is None:
+            suggestion = RecurringSuggestion(
+                user_id=user_id, merchant_key=merchant_key, amount_band=band, is_dismissed=False
+            )
+            db.add(suggestion)
+        suggestion.merchant_name = group.latest.merchant_name
+        suggestion.description = group.latest.description
+        suggestion.amount = round(group.total / len(group.dates)) / 100
+        suggestion.transaction_type = group.latest.transaction_type
+        suggestion.category = group.latest.category
+        suggestion.frequency = frequency
+        suggestion.confidence = confidence
+        suggestion.occurrences = len(group.dates)
+        suggestion.last_date = last_date
+        suggestion.next_date = get_occurrence(frequency, last_date, 1)
+
+
+def get_multi(db: Session, *, user_id: int) -> List[RecurringSuggestion]:
+    return (
+        db.query(RecurringSuggestion)
+        .filter(
+            RecurringSuggestion.user_id == user_id,
+            RecurringSuggestion.is_dismissed == False,
+        )
+        .order_by(RecurringSuggestion.next_date)
+        .all()
+    )
+
+
+def get(db: Session, id: Any) -> Optional[RecurringSuggestion]:
+    return db.query(RecurringSuggestion).filter(RecurringSuggestion.id == id).first()
+
+
+def dismiss(db: Session, *, db_obj: RecurringSuggestion) -> RecurringSuggestion:
+    db_obj.is_dismissed = True
+    db.add(db_obj)
+    db.commit()
+    return db_obj
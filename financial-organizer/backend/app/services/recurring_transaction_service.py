@@ -1,5 +1,8 @@
 from typing import Any, Dict, List, Optional, Union
 from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy import update as sql_update
 from sqlalchemy.orm import Session
 
 from app.db.models import RecurringTransaction, Transaction
@@ -7,7 +10,16 @@ from app.schemas.recurring_transaction import (
     RecurringTransactionCreate,
     RecurringTransactionUpdate,
 )
-from app.schemas.transaction import TransactionCreate
+from app.services import dedupe_service, rollup_service, version_service
+
+
+# Number of due schedules claimed, inserted and committed per round trip.
+DEFAULT_BATCH_SIZE = 1000
+
+# Length of one period: in days for the fixed-length frequencies and in
+# calendar months for the others.
+DAY_STEPS = {"daily": 1, "weekly": 7, "biweekly": 14}
+MONTH_STEPS = {"monthly": 1, "quarterly": 3, "yearly": 12}
 
 
 def get(db: Session, id: Any) -> Optional[RecurringTransaction]:
@@ -31,6 +43,7 @@ def create(db: Session, *, obj_in: RecurringTransactionCreate, user_id: int) ->
     db_obj = RecurringTransaction(
         user_id=user_id,
         amount=obj_in.amount,
+        currency=obj_in.currency,
         transaction_type=obj_in.transaction_type.lower(),
         category=obj_in.category.lower(),
         description=obj_in.description,
@@ -43,8 +56,8 @@ def create(db: Session, *, obj_in: RecurringTransactionCreate, user_id: int) ->
     
     try:
         db.add(db_obj)
+        version_service.bump(db, [user_id])
         db.commit()
-        db.refresh(db_obj)
         return db_obj
     except Exception as e:
         db.rollback()
@@ -77,8 +90,8 @@ def update(
         db_obj.next_date = calculate_next_date(db_obj.frequency, db_obj.start_date)
     
     db.add(db_obj)
+    version_service.bump(db, [db_obj.user_id])
     db.commit()
-    db.refresh(db_obj)
     return db_obj
 
 
@@ -90,49 +103,87 @@ def remove(db: Session, *, id: int) -> RecurringTransaction:
     # Soft delete by setting is_active to False
     obj.is_active = False
     db.add(obj)
+    version_service.bump(db, [obj.user_id])
     db.commit()
     return obj
 
 
-def calculate_next_date(frequency: str, reference_date: date) -> date:
+def calculate_next_date(
+    frequency: str, reference_date: date, today: Optional[date] = None
+) -> date:
     """
     Calculate the next occurrence date based on frequency and a reference date.
+
+    Occurrences are anchored on ``reference_date``, so this is constant time
+    no matter how far in the past the reference date is.
     """
-    today = datetime.now().date()
-    next_date = reference_date
-    
-    while next_date <= today:
-        if frequency == "daily":
-            next_date += timedelta(days=1)
-        elif frequency == "weekly":
-            next_date += timedelta(days=7)
-        elif frequency == "biweekly":
-            next_date += timedelta(days=14)
-        elif frequency == "monthly":
-            # Move to next month, same day
-            month = next_date.month + 1
-            year = next_date.year
-            if month > 12:
-                month = 1
-                year += 1
-            
-            # Handle edge cases like 31st of month
-            day = min(next_date.day, get_days_in_month(year, month))
-            next_date = date(year, month, day)
-        elif frequency == "quarterly":
-            # Move forward 3 months
-            month = next_date.month + 3
-            year = next_date.year
-            if month > 12:
-                month -= 12
-                year += 1
-            
-            day = min(next_date.day, get_days_in_month(year, month))
-            next_date = date(year, month, day)
-        elif frequency == "yearly":
-            next_date = date(next_date.year + 1, next_date.month, next_date.day)
-    
-    return next_date
+    today = today or datetime.now().date()
+    return get_occurrence(
+        frequency, reference_date, _first_index_after(frequency, reference_date, today)
+    )
+
+
+def add_months(value: date, months: int) -> date:
+    """
+    Move a date by a number of months, clamping the day to the end of the
+    target month (Jan 31 + 1 month is Feb 28/29).
+    """
+    year, month = divmod(value.year * 12 + value.month - 1 + months, 12)
+    month += 1
+    return date(year, month, min(value.day, get_days_in_month(year, month)))
+
+
+def get_occurrence(frequency: str, anchor: date, index: int) -> date:
+    """
+    Return the ``index``-th occurrence (0 being ``anchor`` itself) of a schedule.
+    """
+    if frequency in DAY_STEPS:
+        return anchor + timedelta(days=index * DAY_STEPS[frequency])
+    if frequency in MONTH_STEPS:
+        return add_months(anchor, index * MONTH_STEPS[frequency])
+    raise ValueError(f"Unknown frequency: {frequency}")
+
+
+def _first_index_after(frequency: str, anchor: date, after: date) -> int:
+    """
+    Return the index of the first occurrence strictly after ``after``.
+    """
+    if after < anchor:
+        return 0
+    if frequency in DAY_STEPS:
+        return (after - anchor).days // DAY_STEPS[frequency] + 1
+    if frequency not in MONTH_STEPS:
+        raise ValueError(f"Unknown frequency: {frequency}")
+
+    months = (after.year - anchor.year) * 12 + after.month - anchor.month
+    index = months // MONTH_STEPS[frequency]
+    # The occurrence in the month of ``after`` may still fall on or before it
+    while get_occurrence(frequency, anchor, index) <= after:
+        index += 1
+    return index
+
+
+def occurrences_between(frequency: str, anchor: date, start: date, end: date) -> np.ndarray:
+    """
+    Return every occurrence of a schedule anchored on ``anchor`` that falls
+    within ``[start, end]``, as a ``datetime64[D]`` array.
+
+    The dates are computed with NumPy date arithmetic in one pass rather than
+    by stepping through the periods one at a time.
+    """
+    first = _first_index_after(frequency, anchor, start - timedelta(days=1))
+    last = _first_index_after(frequency, anchor, end)
+    if last <= first:
+        return np.empty(0, dtype="datetime64[D]")
+
+    indexes = np.arange(first, last)
+    if frequency in DAY_STEPS:
+        return np.datetime64(anchor, "D") + indexes * DAY_STEPS[frequency]
+
+    months = np.datetime64(anchor, "M") + indexes * MONTH_STEPS[frequency]
+    month_starts = months.astype("datetime64[D]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - month_starts).astype(np.int64)
+    return month_starts + (np.minimum(anchor.day, days_in_month) - 1)
 
 
 def get_days_in_month(year: int, month: int) -> int:
@@ -149,55 +200,91 @@ def get_days_in_month(year: int, month: int) -> int:
         return 31
 
 
-def process_due_recurring_transactions(db: Session) -> List[Transaction]:
+def process_due_recurring_transactions(
+    db: Session, *, batch_size: int = DEFAULT_BATCH_SIZE, today: Optional[date] = None
+) -> int:
     """
     Process all recurring transactions that are due and create actual transactions.
-    Returns a list of created transactions.
+
+    Due schedules are claimed in chunks of ``batch_size`` with
+    ``SELECT ... FOR UPDATE SKIP LOCKED`` and each chunk is committed on its
+    own, so several workers can run this concurrently without generating the
+    same transaction twice. Every occurrence missed since ``next_date`` (up to
+    today or the schedule's end date) is backfilled with its own date.
+    Returns the number of transactions created.
     """
-    today = datetime.now().date()
-    due_recurrings = db.query(RecurringTransaction).filter(
-        RecurringTransaction.next_date <= today,
-        RecurringTransaction.is_active == True,
-    ).all()
-    
-    created_transactions = []
-    
-    for recurring in due_recurrings:
-        # Check if end_date is reached
-        if recurring.end_date and recurring.end_date < today:
-            recurring.is_active = False
-            db.add(recurring)
-            continue
-        
-        # Create actual transaction
-        transaction_data = TransactionCreate(
-            amount=recurring.amount,
-            transaction_type=recurring.transaction_type,
-            category=recurring.category,
-            description=f"{recurring.description} (Recurring)",
-            date=today,
-        )
-        
-        # Create transaction
-        transaction = Transaction(
-            user_id=recurring.user_id,
-            amount=transaction_data.amount,
-            transaction_type=transaction_data.transaction_type,
-            category=transaction_data.category,
-            description=transaction_data.description,
-            date=transaction_data.date,
-        )
-        db.add(transaction)
-        created_transactions.append(transaction)
-        
-        # Update next_date for the recurring transaction
-        recurring.next_date = calculate_next_date(recurring.frequency, recurring.next_date)
-        db.add(recurring)
-    
-    db.commit()
-    
-    # Refresh all objects
-    for transaction in created_transactions:
-        db.refresh(transaction)
-    
-    return created_transactions 
\ No newline at end of file
+    today = today or datetime.now().date()
+    created = 0
+
+    while True:
+        due = db.execute(
+            select(
+                RecurringTransaction.id,
+                RecurringTransaction.user_id,
+                RecurringTransaction.amount_cents,
+                RecurringTransaction.currency,
+                RecurringTransaction.transaction_type,
+                RecurringTransaction.category,
+                RecurringTransaction.description,
+                RecurringTransaction.frequency,
+                RecurringTransaction.start_date,
+                RecurringTransaction.end_date,
+                RecurringTransaction.next_date,
+            )
+            .where(
+                RecurringTransaction.next_date <= today,
+                RecurringTransaction.is_active == True,
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        # Every claimed schedule either moves past today or is deactivated,
+        # so the next query picks up where this chunk left off.
+        if not due:
+            break
+
+        transaction_rows = []
+        schedule_updates = []
+        for recurring in due:
+            # Nothing is generated past the end date
+            cutoff = min(today, recurring.end_date) if recurring.end_date else today
+            occurrences = occurrences_between(
+                recurring.frequency, recurring.start_date, recurring.next_date, cutoff
+            )
+            description = f"{recurring.description} (Recurring)"
+            for occurrence in occurrences.tolist():
+                transaction_rows.append({
+                    "user_id": recurring.user_id,
+                    "amount_cents": recurring.amount_cents,
+                    "currency": recurring.currency,
+                    "transaction_type": recurring.transaction_type,
+                    "category": recurring.category,
+                    "description": description,
+                    "date": occurrence,
+                })
+
+            next_date = calculate_next_date(recurring.frequency, recurring.start_date, today=cutoff)
+            schedule_updates.append({
+                "id": recurring.id,
+                "next_date": next_date,
+                # Deactivate schedules whose next occurrence is past the end date
+                "is_active": not (recurring.end_date and next_date > recurring.end_date),
+            })
+
+        try:
+            if transaction_rows:
+                # Flag charges already entered by hand or synced from the bank
+                dedupe_service.link(db, transaction_rows)
+                db.execute(insert(Transaction), transaction_rows)
+                rollup_service.add(db, transaction_rows)
+            db.execute(sql_update(RecurringTransaction), schedule_updates)
+            version_service.bump(db, {recurring.user_id for recurring in due})
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        created += len(transaction_rows)
+
+    return created
@@ -0,0 +1,245 @@
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import BigInteger, case, cast, delete, func, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.money import DEFAULT_CURRENCY
+from app.db.models import ExchangeRate, SpendingRollup, Transaction, User
+from app.db.rows import row_field
+from app.services import budget_service, fx_service
+
+# Transaction types that count as spending, with the sign they are rolled up
+# with; payments into the card are not spending
+SPENDING_SIGNS = {"purchase": 1, "refund": -1}
+
+# Fields that move a transaction between rollups or change its value
+ROLLUP_FIELDS = {"user_id", "date", "category", "card_id", "amount_cents", "currency", "transaction_type"}
+
+# Stored card_id of transactions without a card
+NO_CARD = 0
+
+# Users rebuilt and committed together
+REBUILD_USER_CHUNK_SIZE = 500
+
+RollupKey = Tuple[int, date, str, int]
+
+def rollup_key(row: Any) -> Optional[RollupKey]:
+    """
+    Rollup a transaction belongs to, or None if it is not spending.
+    """
+    if row_field(row, "transaction_type") not in SPENDING_SIGNS:
+        return None
+    tx_date = row_field(row, "date")
+    if tx_date is None or row_field(row, "amount_cents") is None:
+        return None
+    return (
+        row_field(row, "user_id"),
+        date(tx_date.year, tx_date.month, 1),
+        row_field(row, "category") or "other",
+        row_field(row, "card_id") or NO_CARD,
+    )
+
+def _upsert(db: Session, values: List[Dict[str, Any]], *, increment: bool) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = postgresql.insert(SpendingRollup.__table__)
+        least, greatest = func.least, func.greatest
+    else:
+        stmt = sqlite.insert(SpendingRollup.__table__)
+        least, greatest = func.min, func.max
+
+    table = SpendingRollup.__table__.c
+    excluded = stmt.excluded
+    if increment:
+        set_ = {
+            "total_cents": table.total_cents + excluded.total_cents,
+            "count": table.count + excluded.count,
+            "min_cents": least(func.coalesce(table.min_cents, excluded.min_cents), excluded.min_cents),
+            "max_cents": greatest(func.coalesce(table.max_cents, excluded.max_cents), excluded.max_cents),
+        }
+    else:
+        set_ = {
+            "total_cents": excluded.total_cents,
+            "count": excluded.count,
+            "min_cents": excluded.min_cents,
+            "max_cents": excluded.max_cents,
+        }
+    set_["updated_at"] = excluded.updated_at
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["user_id", "month", "category", "card_id"], set_=set_
+        ),
+        values,
+    )
+
+def _rollup_values(
+    key: RollupKey, total_cents: int, count: int, min_cents: int, max_cents: int, now: datetime
+) -> Dict[str, Any]:
+    user_id, month, category, card_id = key
+    return {
+        "user_id": user_id,
+        "month": month,
+        "category": category,
+        "card_id": card_id,
+        "total_cents": total_cents,
+        "count": count,
+        "min_cents": min_cents,
+        "max_cents": max_cents,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def add(db: Session, rows: Iterable[Any]) -> None:
+    """
+    Fold newly inserted transactions into their rollups with one upsert.
+    Amounts are converted to DEFAULT_CURRENCY with cached rates; rows in a
+    currency without a rate for their date are left out, as by _aggregate.
+    Runs in the caller's database transaction; the caller commits.
+    """
+    rows = [row for row in rows if rollup_key(row) is not None]
+    deltas: Dict[RollupKey, List[int]] = {}
+    for row, cents in zip(rows, fx_service.reporting_cents(db, rows)):
+        if cents is None:
+            continue
+        key = rollup_key(row)
+        amount = SPENDING_SIGNS[row_field(row, "transaction_type")] * cents
+        delta = deltas.get(key)
+        if delta is None:
+            deltas[key] = [amount, 1, amount, amount]
+        else:
+            delta[0] += amount
+            delta[1] += 1
+            delta[2] = min(delta[2], amount)
+            delta[3] = max(delta[3], amount)
+    if deltas:
+        now = datetime.utcnow()
+        _upsert(db, [_rollup_values(key, *delta, now) for key, delta in deltas.items()], increment=True)
+        budget_service.evaluate(db, deltas)
+
+def _month_start(column: Any, dialect: str) -> Any:
+    if dialect == "postgresql":
+        return func.date_trunc("month", column)
+    return func.strftime("%Y-%m-01", column)
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def _to_month(value: Any) -> date:
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return date(value.year, value.month, 1)
+
+def _aggregate(db: Session, *conditions: Any):
+    """
+    Rollup rows computed from the transactions table, grouped by key. Sums
+    are of integer cents, so they are exact and need no rounding. Amounts
+    are converted to DEFAULT_CURRENCY through one join to the exchange
+    rates; rows in a currency without a rate for their date are left out.
+    """
+    month = _month_start(Transaction.date, db.get_bind().dialect.name)
+    category = func.coalesce(Transaction.category, "other")
+    card_id = func.coalesce(Transaction.card_id, NO_CARD)
+    cents = fx_service.converted_cents()
+    signed = case(*[(Transaction.transaction_type == name, cents * sign) for name, sign in SPENDING_SIGNS.items()])
+    return db.execute(
+        select(
+            Transaction.user_id,
+            month,
+            category,
+            card_id,
+            # Postgres sums BIGINT into NUMERIC
+            cast(func.sum(signed), BigInteger),
+            func.count(),
+            func.min(signed),
+            func.max(signed),
+        )
+        .outerjoin(ExchangeRate, fx_service.RATE_JOIN)
+        .where(
+            Transaction.transaction_type.in_(SPENDING_SIGNS),
+            Transaction.amount_cents.isnot(None),
+            Transaction.date.isnot(None),
+            or_(Transaction.currency == DEFAULT_CURRENCY, ExchangeRate.id.isnot(None)),
+            *conditions,
+        )
+        .group_by(Transaction.user_id, month, category, card_id)
+    )
+
+def refresh(db: Session, keys: Iterable[Optional[RollupKey]]) -> None:
+    """
+    Recompute rollups from their transactions. Used after updates and
+    deletes, where the minimum and maximum cannot be adjusted in place.
+    The caller flushes pending changes first and commits afterwards.
+    """
+    keys = {key for key in keys if key is not None}
+    if not keys:
+        return
+    by_user: Dict[int, Set[RollupKey]] = defaultdict(set)
+    for key in keys:
+        by_user[key[0]].add(key)
+
+    now = datetime.utcnow()
+    for user_id, user_keys in by_user.items():
+        months = [key[1] for key in user_keys]
+        values = []
+        for row in _aggregate(
+            db,
+            Transaction.user_id == user_id,
+            Transaction.date >= datetime.combine(min(months), time()),
+            Transaction.date < datetime.combine(_next_month(max(months)), time()),
+        ):
+            key = (row[0], _to_month(row[1]), row[2], row[3])
+            if key in user_keys:
+                user_keys.discard(key)
+                values.append(_rollup_values(key, *row[4:], now))
+        if values:
+            _upsert(db, values, increment=False)
+        # Rollups left over have no transactions any more
+        if user_keys:
+            db.execute(
+                delete(SpendingRollup).where(
+                    SpendingRollup.user_id == user_id,
+                    tuple_(SpendingRollup.month, SpendingRollup.category, SpendingRollup.card_id).in_(
+                        [key[1:] for key in user_keys]
+                    ),
+                )
+            )
+    budget_service.evaluate(db, keys)
+
+def rebuild(db: Session, *, user_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute the rollups of the given users (all users by default) from
+    scratch, committing per chunk of users. Returns the rollups written.
+    """
+    if user_ids is None:
+        user_ids = list(db.scalars(select(User.id).order_by(User.id)))
+
+    written = 0
+    for start in range(0, len(user_ids), REBUILD_USER_CHUNK_SIZE):
+        chunk = user_ids[start:start + REBUILD_USER_CHUNK_SIZE]
+        now = datetime.utcnow()
+        values = [
+            _rollup_values((row[0], _to_month(row[1]), row[2], row[3]), *row[4:], now)
+            for row in _aggregate(db, Transaction.user_id.in_(chunk))
+        ]
+        try:
+            db.execute(delete(SpendingRollup).where(SpendingRollup.user_id.in_(chunk)))
+            if values:
+                db.execute(SpendingRollup.__table__.insert(), values)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        written += len(values)
+    return written
+
+def get_multi(
+    db: Session, *, user_id: int, start: Optional[date] = None, end: Optional[date] = None
+) -> List[SpendingRollup]:
+    query = db.query(SpendingRollup).filter(SpendingRollup.user_id == user_id)
+    if start is not None:
+        query = query.filter(SpendingRollup.month >= date(start.year, start.month, 1))
+    if end is not None:
+        query = query.filter(SpendingRollup.month <= end)
+    return query.order_by(SpendingRollup.month, SpendingRollup.category, SpendingRollup.card_id).all()
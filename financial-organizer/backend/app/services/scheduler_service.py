@@ -0,0 +1,147 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine as default_engine
+from app.services import recurring_detection_service, recurring_transaction_service
+
+# Key of the Postgres advisory lock held by the worker running a pass
+RECURRING_SCHEDULER_LOCK_KEY = 0x72656375727269  # "recurri"
+
+
+class RecurringScheduler:
+    """
+    Periodically processes due recurring transactions inside the app, then
+    runs the incremental subscription detection over new transactions.
+
+    Every worker runs the loop, but on each tick only the worker that wins
+    the Postgres advisory lock processes schedules; the others skip the tick.
+    Databases without advisory locks (SQLite in development) always run.
+    """
+
+    def __init__(
+        self,
+        *,
+        engine: Engine = default_engine,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval_seconds: int = settings.RECURRING_SCHEDULER_INTERVAL_SECONDS,
+        batch_size: int = settings.RECURRING_SCHEDULER_BATCH_SIZE,
+    ):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+        # Exported through status()
+        self.runs = 0
+        self.skipped_runs = 0
+        self.last_run_started_at: Optional[datetime] = None
+        self.last_run_duration_seconds: Optional[float] = None
+        self.last_run_rows_processed: Optional[int] = None
+        self.last_run_transactions_scanned: Optional[int] = None
+        self.last_run_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start the background loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                # The processor uses a blocking DB session, keep it off the event loop
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                # A tick that fails before processing (the database not
+                # accepting connections yet, a dropped connection) must not
+                # end the loop; the next tick tries again
+                self.last_run_error = str(e)
+                print(f"Error running the recurring scheduler: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def run_once(self) -> bool:
+        """
+        Process due recurring transactions if this worker is the leader.
+        Returns False when another worker holds the lock.
+        """
+        with self.engine.connect() as lock_conn:
+            if not self._try_lock(lock_conn):
+                self.skipped_runs += 1
+                return False
+
+            try:
+                self._process()
+            finally:
+                self._unlock(lock_conn)
+        return True
+
+    def _process(self) -> None:
+        self.last_run_started_at = datetime.utcnow()
+        started = time.perf_counter()
+        self.last_run_rows_processed = None
+        self.last_run_transactions_scanned = None
+        db = self.session_factory()
+        try:
+            rows = recurring_transaction_service.process_due_recurring_transactions(
+                db, batch_size=self.batch_size
+            )
+            self.last_run_rows_processed = rows
+            self.last_run_transactions_scanned = recurring_detection_service.run_incremental(db)
+            self.last_run_error = None
+        except Exception as e:
+            db.rollback()
+            self.last_run_error = str(e)
+            print(f"Error processing recurring transactions: {e}")
+        finally:
+            db.close()
+            self.last_run_duration_seconds = time.perf_counter() - started
+            self.runs += 1
+
+    def _try_lock(self, conn) -> bool:
+        if conn.dialect.name != "postgresql":
+            return True
+        # Session-level lock: it survives the processor's per-chunk commits
+        # and is released if this worker's connection dies.
+        acquired = conn.execute(
+            select(func.pg_try_advisory_lock(RECURRING_SCHEDULER_LOCK_KEY))
+        ).scalar()
+        conn.commit()
+        return bool(acquired)
+
+    def _unlock(self, conn) -> None:
+        if conn.dialect.name != "postgresql":
+            return
+        conn.execute(select(func.pg_advisory_unlock(RECURRING_SCHEDULER_LOCK_KEY)))
+        conn.commit()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "skipped_runs": self.skipped_runs,
+            "last_run_started_at": self.last_run_started_at,
+            "last_run_duration_seconds": self.last_run_duration_seconds,
+            "last_run_rows_processed": self.last_run_rows_processed,
+            "last_run_transactions_scanned": self.last_run_transactions_scanned,
+            "last_run_error": self.last_run_error,
+        }
+
+
+recurring_scheduler = RecurringScheduler()
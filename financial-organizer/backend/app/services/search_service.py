@@ -0,0 +1,159 @@
+import re
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.db.models import Transaction
+from app.core.money import to_cents
+from app.services.transaction_service import LIST_COLUMNS, list_row
+
+# Text a transaction is searched by. The Postgres GIN indexes (migrations
+# 9c3d1e5f7a80 and b8e1a3c5d768) are built on exactly these expressions, so they must not
+# change without a new migration.
+SEARCH_TEXT_SQL = (
+    "(coalesce(description, '') || ' ' || coalesce(merchant_name, '') || ' ' || "
+    "coalesce(receipt_text, ''))"
+)
+SEARCH_VECTOR_SQL = f"to_tsvector('simple', {SEARCH_TEXT_SQL})"
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+MAX_SEARCH_RESULTS = 200
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts "
+    "USING fts5(description, merchant_name, ocr_text, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN "
+    "INSERT INTO transactions_fts(rowid, description, merchant_name, ocr_text) "
+    "VALUES (new.id, new.description, new.merchant_name, new.receipt_text); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN "
+    "DELETE FROM transactions_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE ON transactions BEGIN "
+    "DELETE FROM transactions_fts WHERE rowid = old.id; "
+    "INSERT INTO transactions_fts(rowid, description, merchant_name, ocr_text) "
+    "VALUES (new.id, new.description, new.merchant_name, new.receipt_text); END",
+]
+
+def _filter_sql(filters: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    conditions = {
+        "start_date": "t.date >= :start_date",
+        "end_date": "t.date <= :end_date",
+        "min_amount": "t.amount_cents >= :min_amount",
+        "max_amount": "t.amount_cents <= :max_amount",
+        "category": "t.category = :category",
+        "card_id": "t.card_id = :card_id",
+    }
+    sql = []
+    params = {}
+    for name, condition in conditions.items():
+        if filters.get(name) is not None:
+            sql.append(f"AND {condition}")
+            params[name] = filters[name]
+    return " ".join(sql), params
+
+def _search_postgres(db: Session, query: str, where: str, params: Dict[str, Any]) -> List[Tuple[int, float, str]]:
+    # Full-text matches and fuzzy (trigram) matches are ranked together;
+    # highlights are only computed for the page that is returned
+    return db.execute(text(f"""
+        WITH matches AS (
+            SELECT t.id, t.date,
+                   greatest(ts_rank_cd({SEARCH_VECTOR_SQL}, q.tsq), word_similarity(:query, {SEARCH_TEXT_SQL})) AS rank
+            FROM transactions t, websearch_to_tsquery('simple', :query) AS q(tsq)
+            WHERE t.user_id = :user_id
+              AND ({SEARCH_VECTOR_SQL} @@ q.tsq OR :query <% {SEARCH_TEXT_SQL})
+              {where}
+            ORDER BY rank DESC, t.date DESC
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT m.id, m.rank,
+               ts_headline('simple', {SEARCH_TEXT_SQL}, websearch_to_tsquery('simple', :query),
+                           'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2')
+        FROM matches m JOIN transactions t ON t.id = m.id
+        ORDER BY m.rank DESC, m.date DESC
+    """), {**params, "query": query}).all()
+
+def ensure_sqlite_index(db: Session) -> None:
+    """
+    Create the FTS5 table used instead of the Postgres indexes on SQLite,
+    with triggers that keep it in sync, and fill it from existing rows.
+    """
+    exists = db.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'"
+    )).first()
+    if exists:
+        return
+    for statement in SQLITE_FTS_DDL:
+        db.execute(text(statement))
+    db.execute(text(
+        "INSERT INTO transactions_fts(rowid, description, merchant_name, ocr_text) "
+        "SELECT id, description, merchant_name, receipt_text FROM transactions"
+    ))
+    db.commit()
+
+def _search_sqlite(db: Session, query: str, where: str, params: Dict[str, Any]) -> List[Tuple[int, float, str]]:
+    ensure_sqlite_index(db)
+    # Every word must match, as a prefix, in any column
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return []
+    match = " ".join(f'"{term}"*' for term in terms)
+    return db.execute(text(f"""
+        SELECT t.id, -bm25(transactions_fts) AS rank,
+               snippet(transactions_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '...', 16)
+        FROM transactions_fts JOIN transactions t ON t.id = transactions_fts.rowid
+        WHERE transactions_fts MATCH :match AND t.user_id = :user_id
+          {where}
+        ORDER BY rank DESC, t.date DESC
+        LIMIT :limit OFFSET :offset
+    """), {**params, "match": match}).all()
+
+def search(
+    db: Session,
+    *,
+    user_id: int,
+    query: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[Decimal] = None,
+    max_amount: Optional[Decimal] = None,
+    category: Optional[str] = None,
+    card_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Search the user's transactions by description, merchant and receipt
+    text. Results are ordered by relevance and carry a highlighted snippet.
+    """
+    where, params = _filter_sql({
+        "start_date": start_date,
+        "end_date": end_date,
+        "min_amount": to_cents(min_amount),
+        "max_amount": to_cents(max_amount),
+        "category": category.lower() if category else None,
+        "card_id": card_id,
+    })
+    params.update(user_id=user_id, limit=min(limit, MAX_SEARCH_RESULTS), offset=skip)
+
+    if db.get_bind().dialect.name == "postgresql":
+        matches = _search_postgres(db, query, where, params)
+    else:
+        matches = _search_sqlite(db, query, where, params)
+    if not matches:
+        return []
+
+    rows = {
+        row[0]: row
+        for row in db.execute(
+            select(Transaction.id, *LIST_COLUMNS).where(Transaction.id.in_([match[0] for match in matches]))
+        )
+    }
+    return [
+        {**list_row(rows[id][1:]), "rank": rank, "highlight": highlight}
+        for id, rank, highlight in matches
+        if id in rows
+    ]
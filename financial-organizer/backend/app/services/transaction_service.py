@@ -1,70 +1,222 @@
-from typing import Any, Dict, Optional, Union, List
-from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Optional, Union, List
+from sqlalchemy.orm import Session, joinedload, noload
 from sqlalchemy.sql import text
-from sqlalchemy import String
+from sqlalchemy import String, and_, delete, func, insert, select
+from sqlalchemy import update as sql_update
 
-from app.db.models import Transaction
-from app.schemas.transaction import TransactionCreate, TransactionUpdate
+from app.core.money import DEFAULT_CURRENCY, to_cents
+from app.db.models import Category, Card, Receipt, Transaction, TransactionType
+from app.schemas.transaction import (
+    TransactionBulkResult,
+    TransactionBulkUpdate,
+    TransactionCreate,
+    TransactionFilters,
+    TransactionUpdate,
+    Transaction as TransactionSchema,
+)
+from app.services import (
+    categorization_service, dedupe_service, item_price_service, merchant_service, rollup_service, version_service
+)
 
-def get(db: Session, id: Any) -> Optional[Transaction]:
-    return db.query(Transaction).filter(Transaction.id == id).first()
+# Relationships a transaction can be read with, and how each is loaded:
+# joined into the transaction's query, the receipt's items in one more
+EMBEDS = {
+    # A card of another user is never shown
+    "card": joinedload(Transaction.card.and_(Card.user_id == Transaction.user_id)),
+    "receipt": joinedload(Transaction.receipt).selectinload(Receipt.line_items),
+}
 
-def get_multi(
-    db: Session, *, user_id: int, skip: int = 0, limit: int = 100
-) -> List[Transaction]:
+def get(db: Session, id: Any, *, embed: Optional[Iterable[str]] = None) -> Optional[Transaction]:
+    """
+    A transaction by id. With `embed`, the relationships it names (see
+    EMBEDS) are loaded with the transaction and the others are set to
+    None without a query, so that serializing it is a fixed number of
+    queries; such transactions are for reading only.
+    """
+    query = db.query(Transaction)
+    if embed is not None:
+        embed = set(embed)
+        query = query.options(*(
+            option if name in embed else noload(getattr(Transaction, name))
+            for name, option in EMBEDS.items()
+        ))
+    return query.filter(Transaction.id == id).first()
+
+# Sort keys of the list endpoint; a leading "-" sorts descending. Ties are
+# broken by id so that pages never overlap.
+SORT_COLUMNS = {
+    "date": Transaction.date,
+    "amount": Transaction.amount_cents,
+    "merchant": func.lower(Transaction.merchant_name),
+}
+
+def _merchant_prefix(dialect: str, prefix: str) -> Any:
+    merchant = func.lower(Transaction.merchant_name)
+    prefix = prefix.lower()
+    if dialect == "postgresql":
+        # Served by the text_pattern_ops index whatever the collation
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return merchant.like(escaped + "%", escape="\\")
+    # SQLite compares strings bytewise, so a prefix is a range of the index
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(merchant >= prefix, merchant < upper)
+
+def _filter_conditions(dialect: str, filters: TransactionFilters) -> List[Any]:
+    # Dates, amounts, categories, cards, merchant prefixes and receipts each
+    # have a (user_id, ...) index; the transaction type only narrows rows
+    # read through one of them
+    conditions = []
+    if filters.start_date is not None:
+        conditions.append(Transaction.date >= filters.start_date)
+    if filters.end_date is not None:
+        conditions.append(Transaction.date <= filters.end_date)
+    if filters.min_amount is not None:
+        conditions.append(Transaction.amount_cents >= to_cents(filters.min_amount))
+    if filters.max_amount is not None:
+        conditions.append(Transaction.amount_cents <= to_cents(filters.max_amount))
+    if filters.categories:
+        conditions.append(Transaction.category.in_([c.lower() for c in filters.categories]))
+    if filters.transaction_type:
+        conditions.append(Transaction.transaction_type == filters.transaction_type.lower())
+    if filters.card_id is not None:
+        conditions.append(Transaction.card_id == filters.card_id)
+    if filters.merchant_prefix:
+        conditions.append(_merchant_prefix(dialect, filters.merchant_prefix))
+    if filters.has_receipt is not None:
+        conditions.append(
+            Transaction.receipt_path.isnot(None) if filters.has_receipt else Transaction.receipt_path.is_(None)
+        )
+    return conditions
+
+def _order_by(sort: str) -> List[Any]:
+    column = SORT_COLUMNS[sort.lstrip("-")]
+    if sort.startswith("-"):
+        return [column.desc(), Transaction.id.desc()]
+    return [column.asc(), Transaction.id.asc()]
+
+def _list_query(
+    db: Session, query: Any, *, user_id: int, filters: Optional[TransactionFilters], skip: int, limit: int
+) -> Any:
+    filters = filters or TransactionFilters()
     return (
-        db.query(Transaction)
-        .filter(Transaction.user_id == user_id)
+        query.where(Transaction.user_id == user_id, *_filter_conditions(db.get_bind().dialect.name, filters))
+        .order_by(*_order_by(filters.sort))
         .offset(skip)
         .limit(limit)
-        .all()
     )
 
+def get_multi(
+    db: Session,
+    *,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[TransactionFilters] = None,
+) -> List[Transaction]:
+    return list(db.scalars(
+        _list_query(db, select(Transaction), user_id=user_id, filters=filters, skip=skip, limit=limit)
+    ))
+
+# Columns returned by the list endpoint, in the field order of its schema;
+# the amount is read in cents
+LIST_FIELDS = list(TransactionSchema.model_fields)
+LIST_COLUMNS = [
+    Transaction.amount_cents if field == "amount" else getattr(Transaction, field) for field in LIST_FIELDS
+]
+
+def list_row(values: Any) -> Dict[str, Any]:
+    # One LIST_COLUMNS result row as a dict of the list schema's fields.
+    # orjson cannot encode Decimal; cents / 100 is the float nearest the
+    # exact amount, the same number the schema writes to JSON.
+    row = dict(zip(LIST_FIELDS, values))
+    if row["amount"] is not None:
+        row["amount"] = row["amount"] / 100
+    return row
+
+def get_multi_rows(
+    db: Session,
+    *,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[TransactionFilters] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Same rows as get_multi, as plain dicts built from a column-only select
+    so no ORM objects are loaded.
+    """
+    result = db.execute(
+        _list_query(db, select(*LIST_COLUMNS), user_id=user_id, filters=filters, skip=skip, limit=limit)
+    )
+    return [list_row(row) for row in result]
+
+TRANSACTION_TYPES = [t.value for t in TransactionType]
+CATEGORIES = [c.value for c in Category]
+
+# Columns a client may set when creating a transaction
+CREATE_FIELDS = [
+    "card_id", "amount_cents", "currency", "description", "merchant_name", "date", "plaid_transaction_id",
+    "receipt_path", "transaction_type", "category",
+]
+
+# Fields the merchant of a transaction is derived from
+MERCHANT_FIELDS = {"merchant_name", "description"}
+
+def _prepare_create_data(obj_data: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    # Force lowercase for the transaction_type and category, falling back
+    # to the defaults for values outside the enums
+    transaction_type = obj_data.get("transaction_type")
+    if isinstance(transaction_type, str):
+        transaction_type = transaction_type.lower()
+    if transaction_type not in TRANSACTION_TYPES:
+        transaction_type = "purchase"
+
+    category = obj_data.get("category")
+    if isinstance(category, str):
+        category = category.lower()
+    if category not in CATEGORIES:
+        category = "other"
+
+    data = {field: obj_data.get(field) for field in CREATE_FIELDS}
+    data.update(
+        amount_cents=to_cents(obj_data.get("amount")),
+        currency=obj_data.get("currency") or DEFAULT_CURRENCY,
+        user_id=user_id, transaction_type=transaction_type, category=category, category_rule_id=None, category_predicted=False
+    )
+    return data
+
+def _prepare_update_data(update_data: Dict[str, Any]) -> Dict[str, Any]:
+    update_data = dict(update_data)
+    if "amount" in update_data:
+        update_data["amount_cents"] = to_cents(update_data.pop("amount"))
+    # Force lowercase for the transaction_type and category, ignoring
+    # values outside the enums
+    if "transaction_type" in update_data and isinstance(update_data["transaction_type"], str):
+        update_data["transaction_type"] = update_data["transaction_type"].lower()
+        if update_data["transaction_type"] not in TRANSACTION_TYPES:
+            del update_data["transaction_type"]
+
+    if "category" in update_data and isinstance(update_data["category"], str):
+        update_data["category"] = update_data["category"].lower()
+        if update_data["category"] not in CATEGORIES:
+            del update_data["category"]
+        else:
+            # Set by hand, so rules and predictions no longer apply to the
+            # transaction
+            update_data["category_rule_id"] = None
+            update_data["category_predicted"] = False
+    return update_data
+
 def create(db: Session, *, obj_in: TransactionCreate, user_id: int) -> Transaction:
     try:
-        # Convert obj_in to dict and extract values
-        obj_data = obj_in.model_dump()
-        
-        # Force lowercase for the transaction_type and category
-        if "transaction_type" in obj_data and isinstance(obj_data["transaction_type"], str):
-            obj_data["transaction_type"] = obj_data["transaction_type"].lower()
-            # Ensure it's one of the valid values
-            if obj_data["transaction_type"] not in ["purchase", "payment", "refund"]:
-                obj_data["transaction_type"] = "purchase"
-                
-        if "category" in obj_data and isinstance(obj_data["category"], str):
-            obj_data["category"] = obj_data["category"].lower()
-            # Ensure it's one of the valid values
-            if obj_data["category"] not in ["groceries", "utilities", "entertainment", "transportation", "shopping", "other"]:
-                obj_data["category"] = "other"
-        
-        print(f"Creating transaction with data: {obj_data}")
-        
-        # Create a manual SQL INSERT to bypass the enum issue
-        transaction_type = obj_data.get("transaction_type", "purchase")
-        category = obj_data.get("category", "other")
-        
-        # Create the transaction object with needed values for SQLAlchemy 
-        db_obj = Transaction(
-            user_id=user_id,
-            card_id=obj_data.get("card_id"),
-            amount=obj_data.get("amount"),
-            description=obj_data.get("description"),
-            merchant_name=obj_data.get("merchant_name"),
-            date=obj_data.get("date"),
-            plaid_transaction_id=obj_data.get("plaid_transaction_id"),
-            receipt_path=obj_data.get("receipt_path"),
-            ocr_data=obj_data.get("ocr_data"),
-            grocery_items=obj_data.get("grocery_items"),
-        )
-        
-        # Set the attributes directly on the object as strings
-        db_obj.transaction_type = transaction_type  
-        db_obj.category = category
-        
+        db_obj = Transaction(**_prepare_create_data(obj_in.model_dump(), user_id))
+        merchant_service.assign(db, [db_obj])
+        dedupe_service.link(db, [db_obj])
+        categorization_service.categorize(db, [db_obj], user_id=user_id)
         db.add(db_obj)
+        rollup_service.add(db, [db_obj])
+        version_service.bump(db, [user_id])
         db.commit()
-        db.refresh(db_obj)
         return db_obj
     except Exception as e:
         db.rollback()
@@ -81,31 +233,180 @@ def update(
         update_data = obj_in
     else:
         update_data = obj_in.model_dump(exclude_unset=True)
-        
-    # Force lowercase for the transaction_type and category
-    if "transaction_type" in update_data and isinstance(update_data["transaction_type"], str):
-        update_data["transaction_type"] = update_data["transaction_type"].lower()
-        # Ensure it's one of the valid values
-        if update_data["transaction_type"] not in ["purchase", "payment", "refund"]:
-            del update_data["transaction_type"]
-            
-    if "category" in update_data and isinstance(update_data["category"], str):
-        update_data["category"] = update_data["category"].lower()
-        # Ensure it's one of the valid values
-        if update_data["category"] not in ["groceries", "utilities", "entertainment", "transportation", "shopping", "other"]:
-            del update_data["category"]
-            
+
+    update_data = _prepare_update_data(update_data)
+    old_key = rollup_service.rollup_key(db_obj)
     for field, value in update_data.items():
         setattr(db_obj, field, value)
+    if MERCHANT_FIELDS.intersection(update_data):
+        merchant_service.assign(db, [db_obj])
+    if dedupe_service.DEDUPE_FIELDS.intersection(update_data):
+        dedupe_service.link(db, [db_obj])
         
     db.add(db_obj)
+    if rollup_service.ROLLUP_FIELDS.intersection(update_data):
+        db.flush()
+        rollup_service.refresh(db, [old_key, rollup_service.rollup_key(db_obj)])
+    if item_price_service.ITEM_PRICE_FIELDS.intersection(update_data):
+        db.flush()
+        item_price_service.refresh(db, item_price_service.items_of_transactions(db, [db_obj.id]))
+    version_service.bump(db, [db_obj.user_id])
     db.commit()
-    db.refresh(db_obj)
     return db_obj
 
 def remove(db: Session, *, id: int) -> Transaction:
     obj = db.query(Transaction).get(id)
     if obj:
+        items = item_price_service.items_of_transactions(db, [id])
         db.delete(obj)
+        db.flush()
+        rollup_service.refresh(db, [rollup_service.rollup_key(obj)])
+        item_price_service.refresh(db, items)
+        version_service.bump(db, [obj.user_id])
         db.commit()
-    return obj 
\ No newline at end of file
+    return obj
+
+# Columns needed to find the spending rollup of an existing transaction
+ROLLUP_COLUMNS = [getattr(Transaction, field) for field in sorted(rollup_service.ROLLUP_FIELDS)]
+
+def _bulk_result(index: int, id: Optional[int] = None, error: Optional[str] = None) -> TransactionBulkResult:
+    return TransactionBulkResult(index=index, id=id, ok=error is None, error=error)
+
+def create_multi(
+    db: Session, *, objs_in: List[TransactionCreate], user_id: int
+) -> List[TransactionBulkResult]:
+    """
+    Validate and insert many transactions with one multi-row
+    INSERT ... RETURNING in a single database transaction.
+    """
+    # Validate every item against one lookup of the user's cards
+    card_ids = {obj_in.card_id for obj_in in objs_in}
+    owned_cards = set(db.scalars(
+        select(Card.id).where(Card.id.in_(card_ids), Card.user_id == user_id)
+    )) if card_ids else set()
+
+
+    results: List[Optional[TransactionBulkResult]] = [None] * len(objs_in)
+    rows = []
+    row_indexes = []
+    for index, obj_in in enumerate(objs_in):
+        if obj_in.card_id not in owned_cards:
+            results[index] = _bulk_result(index, error="Card not found")
+            continue
+        rows.append(_prepare_create_data(obj_in.model_dump(), user_id))
+        row_indexes.append(index)
+
+    try:
+        if rows:
+            merchant_service.assign(db, rows)
+            dedupe_service.link(db, rows)
+            categorization_service.categorize(db, rows, user_id=user_id)
+            ids = db.scalars(
+                insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+                rows,
+            ).all()
+            for index, id in zip(row_indexes, ids):
+                results[index] = _bulk_result(index, id=id)
+            rollup_service.add(db, rows)
+            version_service.bump(db, [user_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return results
+
+def update_multi(
+    db: Session, *, objs_in: List[TransactionBulkUpdate], user_id: int
+) -> List[TransactionBulkResult]:
+    """
+    Apply many partial updates with one executemany UPDATE by primary key
+    in a single database transaction.
+    """
+    existing = {row.id: row for row in db.execute(
+        select(Transaction.id, *ROLLUP_COLUMNS).where(
+            Transaction.id.in_({obj_in.id for obj_in in objs_in})
+        )
+    )} if objs_in else {}
+
+    results: List[TransactionBulkResult] = []
+    rows = []
+    rollup_keys = []
+    # Transactions whose receipt items move to other price rollups
+    item_price_ids = []
+    # The stored fields a duplicate check needs, overlaid with the update
+    dedupe_rows = []
+    for index, obj_in in enumerate(objs_in):
+        if obj_in.id not in existing:
+            results.append(_bulk_result(index, id=obj_in.id, error="Transaction not found"))
+            continue
+        old = existing[obj_in.id]
+        if old.user_id != user_id:
+            results.append(_bulk_result(index, id=obj_in.id, error="Not enough permissions"))
+            continue
+        update_data = _prepare_update_data(obj_in.model_dump(exclude_unset=True, exclude={"id"}))
+        rows.append({"id": obj_in.id, **update_data})
+        results.append(_bulk_result(index, id=obj_in.id))
+        if dedupe_service.DEDUPE_FIELDS.intersection(update_data):
+            dedupe_rows.append((rows[-1], {**old._asdict(), **update_data}))
+        if rollup_service.ROLLUP_FIELDS.intersection(update_data):
+            rollup_keys.append(rollup_service.rollup_key(old))
+            rollup_keys.append(rollup_service.rollup_key({**old._asdict(), **update_data}))
+        if item_price_service.ITEM_PRICE_FIELDS.intersection(update_data):
+            item_price_ids.append(obj_in.id)
+
+    try:
+        if rows:
+            merchant_service.assign(db, [row for row in rows if MERCHANT_FIELDS.intersection(row)])
+            dedupe_service.link(db, [merged for _, merged in dedupe_rows])
+            for row, merged in dedupe_rows:
+                row.update(dedupe_key=merged["dedupe_key"], duplicate_of_id=merged["duplicate_of_id"])
+            db.execute(sql_update(Transaction), rows)
+            rollup_service.refresh(db, rollup_keys)
+            item_price_service.refresh(db, item_price_service.items_of_transactions(db, item_price_ids))
+            version_service.bump(db, [user_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return results
+
+def remove_multi(db: Session, *, ids: List[int], user_id: int) -> List[TransactionBulkResult]:
+    """
+    Delete many transactions with a single DELETE ... WHERE id IN (...).
+    """
+    existing = {row.id: row for row in db.execute(
+        select(Transaction.id, *ROLLUP_COLUMNS).where(Transaction.id.in_(set(ids)))
+    )} if ids else {}
+
+    results: List[TransactionBulkResult] = []
+    owned_ids = []
+    for index, id in enumerate(ids):
+        if id not in existing:
+            results.append(_bulk_result(index, id=id, error="Transaction not found"))
+        elif existing[id].user_id != user_id:
+            results.append(_bulk_result(index, id=id, error="Not enough permissions"))
+        else:
+            owned_ids.append(id)
+            results.append(_bulk_result(index, id=id))
+
+    try:
+        if owned_ids:
+            items = item_price_service.items_of_transactions(db, owned_ids)
+            # Clear receipt references first, like the ORM does for single deletes
+            db.execute(
+                sql_update(Receipt)
+                .where(Receipt.transaction_id.in_(owned_ids))
+                .values(transaction_id=None)
+            )
+            db.execute(
+                delete(Transaction).where(Transaction.id.in_(owned_ids)),
+                execution_options={"synchronize_session": False},
+            )
+            rollup_service.refresh(db, [rollup_service.rollup_key(existing[id]) for id in owned_ids])
+            item_price_service.refresh(db, items)
+            version_service.bump(db, [user_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return results
@@ -0,0 +1,25 @@
+from typing import Iterable
+
+from sqlalchemy import update as sql_update
+from sqlalchemy.orm import Session
+
+from app.db.models import User
+
+
+def bump(db: Session, user_ids: Iterable[int]) -> None:
+    """
+    Mark the users' transactions, cards, schedules and budgets as changed so
+    that conditional GETs stop matching their old ETags and cached budget
+    totals are reloaded. Runs in the caller's database transaction; the
+    caller commits.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    db.execute(
+        sql_update(User)
+        .where(User.id.in_(user_ids))
+        # Keep updated_at for profile changes only
+        .values(data_version=User.data_version + 1, updated_at=User.updated_at),
+        execution_options={"synchronize_session": False},
+    )
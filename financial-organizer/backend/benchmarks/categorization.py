@@ -0,0 +1,86 @@
+"""
+Time the category rule matcher on its own, the bulk re-categorization job
+over a large transaction history, and the incremental re-apply that follows
+a single rule change.
+
+    cd backend && python -m benchmarks.categorization --transactions 1000000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from benchmarks.common import make_session, timer
+
+from app.db.models import CategoryRule, Transaction
+from app.schemas.category_rule import CategoryRuleUpdate
+from app.services import categorization_service
+
+
+def merchants(count: int):
+    # Known chains from the default rules plus a long tail of local shops,
+    # each with store numbers like real card statements
+    known = [term.upper() for terms in categorization_service.DEFAULT_RULES.values() for term in terms]
+    local = [f"SHOP{index:05d}" for index in range(count)]
+    return known + local
+
+
+def seed(db, transactions: int, users: int) -> None:
+    rng = random.Random(42)
+    names = merchants(5_000)
+    now = datetime.utcnow()
+    rows = [{
+        "user_id": rng.randint(1, users),
+        "card_id": rng.randint(1, 3),
+        "amount_cents": rng.randint(300, 20000),
+        "description": "Card purchase",
+        "merchant_name": f"{rng.choice(names)} #{rng.randint(1, 999)}",
+        "transaction_type": "purchase",
+        "category": "other",
+        "date": now - timedelta(days=rng.randint(0, 730)),
+        "created_at": now,
+        "updated_at": now,
+    } for _ in range(transactions)]
+    for start in range(0, len(rows), 50_000):
+        db.execute(insert(Transaction.__table__), rows[start:start + 50_000])
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--rules", type=int, default=1_000, help="extra rules of user 1")
+    args = parser.parse_args()
+
+    db = make_session()
+    with timer(f"seed {args.transactions:,} transactions", args.transactions):
+        seed(db, args.transactions, args.users)
+    categorization_service.install_default_rules(db)
+    db.add_all([
+        CategoryRule(user_id=1, category="shopping", merchant_contains=f"shop{index:05d}", priority=100, is_active=True)
+        for index in range(args.rules)
+    ])
+    db.commit()
+
+    with timer(f"compile {args.rules:,} user rules + defaults"):
+        matcher = categorization_service.get_matcher(db, 1)
+    rows = db.execute(
+        select(Transaction.merchant_name, Transaction.description, Transaction.amount_cents, Transaction.card_id)
+    ).all()
+    with timer("match in memory", len(rows)):
+        matched = sum(1 for row in rows if matcher.match(*row) is not None)
+    print(f"matched: {matched:,}")
+
+    with timer("bulk re-categorization job", args.transactions):
+        result = categorization_service.recategorize(db)
+    print(f"scanned: {result.scanned:,}  updated: {result.updated:,}")
+
+    rule = db.scalar(select(CategoryRule).where(CategoryRule.merchant_contains == "costco"))
+    with timer("re-apply after one rule change"):
+        categorization_service.update(db, db_obj=rule, obj_in=CategoryRuleUpdate(category="shopping"))
+
+
+if __name__ == "__main__":
+    main()
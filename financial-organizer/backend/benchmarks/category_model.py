@@ -0,0 +1,90 @@
+"""
+Time training the per-user category model at several history sizes, report
+the size of the trained model, and measure batch prediction throughput and
+the cost of a cached model lookup during a sync.
+
+    cd backend && python -m benchmarks.category_model --predictions 100000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_session, timer
+
+from app.db.models import Transaction
+from app.services import category_model_service
+
+CATEGORIES = ["groceries", "utilities", "entertainment", "transportation", "shopping"]
+
+
+def history(rng: random.Random, size: int, merchants_per_category: int = 200):
+    # Each category has its own merchants, which show up with store numbers
+    # and in slightly different spellings as on real statements
+    merchants = {
+        category: [f"{category[:4].upper()}{index:04d} {rng.choice(['STORE', 'MKT', 'INC', 'LTD'])}"
+                   for index in range(merchants_per_category)]
+        for category in CATEGORIES
+    }
+    rows = []
+    for _ in range(size):
+        category = rng.choice(CATEGORIES)
+        merchant = rng.choice(merchants[category])
+        rows.append((f"{merchant} #{rng.randint(1, 999)}", "Card purchase", category))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    parser.add_argument("--predictions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    model = None
+    for size in args.sizes:
+        rows = history(rng, size)
+        category_model_service._hashed_features.cache_clear()
+        with timer(f"train on {size:,} transactions", size):
+            model = category_model_service.train(rows)
+        print(f"  features: {len(model.vocabulary):,}  model size: {model.nbytes / 1024:,.0f} KiB")
+
+    rows = history(rng, args.predictions)
+    pairs = [(merchant_name, description) for merchant_name, description, _ in rows]
+    category_model_service._hashed_features.cache_clear()
+    with timer(f"predict {len(pairs):,} in one batch", len(pairs)):
+        predictions = model.predict(pairs)
+    confident = sum(1 for _, probability in predictions if probability >= category_model_service.MIN_CONFIDENCE)
+    print(f"  confident enough to apply: {confident / len(predictions):.1%}")
+    batch = pairs[:500]
+    with timer("predict one sync batch of 500, 200 times", 500 * 200):
+        for _ in range(200):
+            model.predict(batch)
+
+    db = make_session()
+    now = datetime.utcnow()
+    size = args.sizes[-1]
+    db.execute(insert(Transaction.__table__), [{
+        "user_id": 1,
+        "card_id": 1,
+        "amount_cents": 1000,
+        "description": description,
+        "merchant_name": merchant_name,
+        "transaction_type": "purchase",
+        "category": category,
+        "category_predicted": False,
+        "date": now - timedelta(days=index % 730),
+        "created_at": now,
+        "updated_at": now,
+    } for index, (merchant_name, description, category) in enumerate(history(rng, size))])
+    db.commit()
+    with timer(f"load and train from {size:,} stored transactions", size):
+        category_model_service.get_model(db, user_id=1)
+    with timer("cached model lookup, 100 times"):
+        for _ in range(100):
+            category_model_service.get_model(db, user_id=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Shared helpers for the backend benchmarks.
+
+The benchmarks run against an in-memory SQLite database so they can be run
+without the docker-compose stack:
+
+    cd backend && python -m benchmarks.crud_statements
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+# The settings object requires the Postgres variables even though the
+# benchmarks never connect to Postgres.
+os.environ.setdefault("POSTGRES_USER", "bench")
+os.environ.setdefault("POSTGRES_PASSWORD", "bench")
+os.environ.setdefault("POSTGRES_DB", "bench")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+import app.db.models  # noqa: F401  (register the tables on Base.metadata)
+
+
+def make_session() -> Session:
+    """Create a fresh in-memory database and return a session bound to it."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+    )
+    return SessionLocal()
+
+
+class StatementCounter:
+    """Record every SQL statement sent to the database by an engine."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: List[str] = []
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @contextmanager
+    def count(self) -> Iterator[List[str]]:
+        """Collect the statements issued inside the ``with`` block."""
+        start = len(self.statements)
+        captured: List[str] = []
+        try:
+            yield captured
+        finally:
+            captured.extend(self.statements[start:])
+
+
+@contextmanager
+def timer(label: str, rows: int = 0) -> Iterator[None]:
+    """Print the elapsed time (and throughput when ``rows`` is given)."""
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    if rows:
+        print(f"{label:<55} {elapsed * 1000:10.1f} ms  {rows / elapsed:12,.0f} rows/s")
+    else:
+        print(f"{label:<55} {elapsed * 1000:10.1f} ms")
@@ -0,0 +1,129 @@
+"""
+Report how many SQL statements each service-level write issues.
+
+Every create/update should be a single INSERT/UPDATE (plus the implicit
+transaction bookkeeping), with no follow-up SELECT to reload the row.
+Writes to cards, transactions and schedules add one UPDATE of the user's
+data version, which the list endpoints use as their ETag.
+
+    cd backend && python -m benchmarks.crud_statements
+"""
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import StatementCounter, make_session
+
+from app.schemas.auth import UserCreate, UserUpdate
+from app.schemas.card import CardCreate, CardUpdate
+from app.schemas.receipt import ReceiptCreate, ReceiptUpdate
+from app.schemas.recurring_transaction import (
+    RecurringTransactionCreate,
+    RecurringTransactionUpdate,
+)
+from app.schemas.transaction import TransactionCreate
+from app.services import (
+    auth_service,
+    card_service,
+    receipt_service,
+    recurring_transaction_service,
+    transaction_service,
+)
+
+
+def report(label: str, statements) -> None:
+    selects = sum(1 for s in statements if s.lstrip().upper().startswith("SELECT"))
+    print(f"{label:<40} {len(statements):3d} statements  ({selects} SELECT)")
+
+
+def main() -> None:
+    db = make_session()
+    counter = StatementCounter(db.get_bind())
+
+    with counter.count() as stmts:
+        user = auth_service.create_user(
+            db,
+            obj_in=UserCreate(email="bench@example.com", password="x", full_name="Bench"),
+        )
+        user.id
+    report("auth_service.create_user", stmts)
+
+    with counter.count() as stmts:
+        user = auth_service.update_user(db, db_obj=user, obj_in=UserUpdate(full_name="B"))
+        user.full_name
+    report("auth_service.update_user", stmts)
+
+    card_in = CardCreate(card_number="****", card_type="VISA", last_four="1111", expiry_date="12/30")
+    with counter.count() as stmts:
+        card = card_service.create(db, obj_in=card_in, user_id=user.id)
+        card.id
+    report("card_service.create", stmts)
+
+    with counter.count() as stmts:
+        card = card_service.update(db, db_obj=card, obj_in=CardUpdate(**card_in.model_dump()))
+        card.updated_at
+    report("card_service.update", stmts)
+
+    transaction_in = TransactionCreate(
+        amount=12.5,
+        description="Coffee",
+        transaction_type="purchase",
+        category="other",
+        merchant_name="Cafe",
+        date=datetime.now(),
+        card_id=card.id,
+    )
+    with counter.count() as stmts:
+        transaction = transaction_service.create(db, obj_in=transaction_in, user_id=user.id)
+        transaction.id
+    report("transaction_service.create", stmts)
+
+    with counter.count() as stmts:
+        transaction = transaction_service.update(
+            db, db_obj=transaction, obj_in={"amount": 13.0}
+        )
+        transaction.amount
+    report("transaction_service.update", stmts)
+
+    with counter.count() as stmts:
+        receipt = receipt_service.create(
+            db,
+            obj_in=ReceiptCreate(
+                transaction_id=transaction.id,
+                file_path="r.png",
+                ocr_data={},
+                line_items=[{"name": f"Item {i}", "total": 1.0} for i in range(20)],
+            ),
+            user_id=transaction.user_id,
+        )
+        receipt.id
+    report("receipt_service.create", stmts)
+
+    with counter.count() as stmts:
+        receipt = receipt_service.update(
+            db, db_obj=receipt, obj_in=ReceiptUpdate(file_path="r2.png")
+        )
+        receipt.file_path
+    report("receipt_service.update", stmts)
+
+    recurring_in = RecurringTransactionCreate(
+        amount=10.0,
+        transaction_type="payment",
+        category="utilities",
+        description="Internet",
+        frequency="monthly",
+        start_date=date.today() - timedelta(days=40),
+    )
+    with counter.count() as stmts:
+        recurring = recurring_transaction_service.create(db, obj_in=recurring_in, user_id=user.id)
+        recurring.id
+    report("recurring_transaction_service.create", stmts)
+
+    with counter.count() as stmts:
+        recurring = recurring_transaction_service.update(
+            db, db_obj=recurring, obj_in=RecurringTransactionUpdate(amount=11.0)
+        )
+        recurring.next_date
+    report("recurring_transaction_service.update", stmts)
+
+
+if __name__ == "__main__":
+    main()
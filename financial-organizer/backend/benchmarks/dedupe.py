@@ -0,0 +1,88 @@
+"""
+Time the duplicate scan over one user's full history against comparing
+every pair of transactions, and the per-write duplicate check through the
+(user_id, dedupe_key, date) index.
+
+    cd backend && python -m benchmarks.dedupe --transactions 100000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from benchmarks.common import make_session, timer
+
+from app.db.models import Transaction
+from app.services import dedupe_service
+
+MERCHANTS = [f"SHOP {chr(65 + index // 26)}{chr(65 + index % 26)}" for index in range(500)]
+
+
+def seed(db, transactions: int) -> None:
+    rng = random.Random(42)
+    start = datetime(2022, 1, 1)
+    now = datetime.utcnow()
+    rows = []
+    for _ in range(transactions):
+        row = {
+            "user_id": 1,
+            "card_id": rng.randint(1, 3),
+            "amount_cents": rng.randint(300, 20000),
+            "description": "Card purchase",
+            "merchant_name": f"{rng.choice(MERCHANTS)} #{rng.randint(1, 99)}",
+            "transaction_type": "purchase",
+            "category": "other",
+            "date": start + timedelta(days=rng.randint(0, 1000)),
+            "created_at": now,
+            "updated_at": now,
+        }
+        rows.append(row)
+        # About 1% of purchases arrive twice
+        if rng.random() < 0.01:
+            rows.append({**row, "date": row["date"] + timedelta(days=rng.randint(0, 3))})
+    db.execute(insert(Transaction.__table__), rows)
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--pairwise", type=int, default=5_000, help="rows compared pairwise")
+    args = parser.parse_args()
+
+    db = make_session()
+    seed(db, args.transactions)
+    with timer(f"key {args.transactions:,} existing transactions", args.transactions):
+        dedupe_service.backfill(db)
+    with timer(f"sort-merge scan of {args.transactions:,} transactions", args.transactions):
+        clusters = dedupe_service.find_clusters(db, user_id=1)
+    print(f"  clusters: {len(clusters):,}")
+
+    rows = db.execute(
+        select(Transaction.id, Transaction.card_id, Transaction.date, Transaction.dedupe_key).limit(args.pairwise)
+    ).all()
+    with timer(f"pairwise comparison of {len(rows):,} transactions", len(rows)):
+        pairs = 0
+        for index, first in enumerate(rows):
+            for second in rows[index + 1:]:
+                if (
+                    first.dedupe_key == second.dedupe_key
+                    and first.card_id == second.card_id
+                    and abs((first.date - second.date).days) <= dedupe_service.DUPLICATE_WINDOW_DAYS
+                ):
+                    pairs += 1
+
+    sample = db.execute(
+        select(Transaction.user_id, Transaction.card_id, Transaction.amount_cents, Transaction.date,
+               Transaction.transaction_type, Transaction.merchant_name, Transaction.description).limit(1000)
+    ).all()
+    new_rows = [dict(row._mapping) for row in sample]
+    with timer("duplicate check, 1,000 single writes", len(new_rows)):
+        for row in new_rows:
+            dedupe_service.link(db, [row])
+    print(f"  re-written rows flagged as copies: {sum(1 for row in new_rows if row['duplicate_of_id']):,}")
+
+
+if __name__ == "__main__":
+    main()
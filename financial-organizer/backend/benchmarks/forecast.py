@@ -0,0 +1,64 @@
+"""
+Latency of the cash-flow forecast for a user with many schedules.
+
+    cd backend && python -m benchmarks.forecast --schedules 500 --years 5
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_session, timer
+
+from app.db.models import RecurringTransaction
+from app.services import forecast_service
+
+FREQUENCIES = ["daily", "weekly", "biweekly", "monthly", "quarterly", "yearly"]
+TYPES = ["purchase", "payment", "deposit", "withdrawal"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--schedules", type=int, default=500)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    today = date.today()
+    until = today + timedelta(days=365 * args.years)
+    now = datetime.utcnow()
+    db = make_session()
+    db.execute(
+        insert(RecurringTransaction.__table__),
+        [
+            {
+                "user_id": 1,
+                "amount_cents": 500 + 100 * i,
+                "transaction_type": TYPES[i % len(TYPES)],
+                "category": "other",
+                "description": f"Schedule {i}",
+                "frequency": FREQUENCIES[i % len(FREQUENCIES)],
+                "start_date": today - timedelta(days=i),
+                "next_date": today,
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(args.schedules)
+        ],
+    )
+    db.commit()
+
+    label = f"{args.schedules} schedules, {args.years} years"
+    with timer(f"project daily net change ({label})"):
+        schedules = db.execute(
+            RecurringTransaction.__table__.select().where(RecurringTransaction.user_id == 1)
+        ).all()
+        forecast_service.project_daily_net_change(schedules, start=today, until=until)
+    with timer(f"get_forecast, cold ({label})"):
+        forecast_service.get_forecast(db, user_id=1, until=until, start=today)
+    with timer(f"get_forecast, cached ({label})"):
+        forecast_service.get_forecast(db, user_id=1, until=until, start=today)
+
+
+if __name__ == "__main__":
+    main()
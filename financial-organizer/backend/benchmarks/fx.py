@@ -0,0 +1,87 @@
+"""
+Time converting a spending summary with foreign-currency transactions to
+USD: one rate query per transaction, per-row lookups through the rate
+cache, and one join of the transactions to the rate ranges.
+
+    cd backend && python -m benchmarks.fx --transactions 100000
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, or_, select
+
+from benchmarks.common import make_session, timer
+
+from app.core.money import DEFAULT_CURRENCY
+from app.db.models import ExchangeRate, Transaction
+from app.services import fx_service
+
+CURRENCIES = ["USD", "USD", "EUR", "GBP", "CAD", "JPY"]
+
+
+def seed(db, transactions: int, days: int) -> None:
+    rng = random.Random(42)
+    start = date(2022, 1, 1)
+    fx_service.load_rates(db, (
+        (currency, start + timedelta(days=day), rng.uniform(0.5, 1.5))
+        for currency in set(CURRENCIES) - {DEFAULT_CURRENCY}
+        for day in range(days)
+    ))
+    now = datetime.utcnow()
+    db.execute(insert(Transaction.__table__), [
+        {
+            "user_id": 1,
+            "amount_cents": rng.randint(300, 20000),
+            "currency": rng.choice(CURRENCIES),
+            "description": "Card purchase",
+            "transaction_type": "purchase",
+            "category": "other",
+            "date": datetime.combine(start, datetime.min.time()) + timedelta(days=rng.randint(0, days - 1)),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for _ in range(transactions)
+    ])
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=1000, help="days of rates per currency")
+    parser.add_argument("--per-row", type=int, default=5_000, help="rows converted with one query each")
+    args = parser.parse_args()
+
+    db = make_session()
+    seed(db, args.transactions, args.days)
+    rows = db.execute(select(Transaction.amount_cents, Transaction.currency, Transaction.date)).all()
+
+    sample = rows[:args.per_row]
+    with timer(f"one rate query per row, {len(sample):,} rows", len(sample)):
+        total = 0
+        for row in sample:
+            if row.currency == DEFAULT_CURRENCY:
+                total += row.amount_cents
+                continue
+            rate = db.scalar(select(ExchangeRate.rate).where(fx_service.rate_join(row.currency, row.date.date())))
+            total += fx_service.convert(row.amount_cents, rate)
+
+    fx_service._rates.clear()
+    with timer(f"cached rates, cold, {len(rows):,} rows", len(rows)):
+        cached_total = sum(cents for cents in fx_service.reporting_cents(db, rows) if cents is not None)
+    with timer(f"cached rates, warm, {len(rows):,} rows", len(rows)):
+        fx_service.reporting_cents(db, rows)
+
+    with timer(f"one join to the rate ranges, {len(rows):,} rows", len(rows)):
+        joined_total = db.scalar(
+            select(func.sum(fx_service.converted_cents()))
+            .select_from(Transaction)
+            .outerjoin(ExchangeRate, fx_service.RATE_JOIN)
+            .where(or_(Transaction.currency == DEFAULT_CURRENCY, ExchangeRate.id.isnot(None)))
+        )
+    print(f"  totals agree: {cached_total == joined_total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Time the cost of the request instrumentation: statements executed with and
+without the timing listeners, and requests served with and without the
+middleware.
+
+    cd backend && python -m benchmarks.instrumentation --statements 100000
+"""
+import argparse
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from benchmarks.common import make_session, timer
+
+from app.middleware import instrumentation
+from app.middleware.instrumentation import Instrumentation, RequestStats
+
+
+def make_app(engine, instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(Instrumentation, engine=engine)
+
+    @app.get("/rows")
+    def read_rows():
+        with engine.connect() as conn:
+            return [conn.execute(text("SELECT 1")).scalar() for _ in range(5)]
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--statements", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    args = parser.parse_args()
+
+    engine = make_session().get_bind()
+    with engine.connect() as conn:
+        with timer(f"{args.statements:,} statements, no listeners", args.statements):
+            for _ in range(args.statements):
+                conn.execute(text("SELECT 1"))
+
+        instrumentation.instrument_engine(engine)
+        with timer(f"{args.statements:,} statements, outside a request", args.statements):
+            for _ in range(args.statements):
+                conn.execute(text("SELECT 1"))
+        token = instrumentation._current.set(RequestStats())
+        with timer(f"{args.statements:,} statements, timed", args.statements):
+            for _ in range(args.statements):
+                conn.execute(text("SELECT 1"))
+        instrumentation._current.reset(token)
+
+    for instrumented in (False, True):
+        client = TestClient(make_app(engine, instrumented))
+        label = "with" if instrumented else "without"
+        with timer(f"{args.requests:,} requests of 5 statements, {label} middleware", args.requests):
+            for _ in range(args.requests):
+                client.get("/rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Time monthly price histories of a household's most bought items, read from
+the daily item price rollups against grouping the line items of five years
+of grocery receipts on every request.
+
+    cd backend && python -m benchmarks.item_prices --receipts 1500
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import make_session, timer
+
+from app.core.money import from_cents
+from app.db.models import Receipt, ReceiptLineItem, Transaction
+from app.schemas.receipt import ItemPricePoint
+from app.services import item_price_service
+
+ITEMS = [(str(4000 + index), f"PRODUCE {index}") for index in range(100)] + [
+    (None, f"PACKAGED ITEM {index}") for index in range(300)
+]
+STORES = 3
+
+
+def seed(db, receipts: int, items_per_receipt: int) -> None:
+    rng = random.Random(42)
+    start = datetime(2019, 1, 1)
+    now = datetime.utcnow()
+    db.execute(insert(Transaction.__table__), [
+        {
+            "user_id": 1,
+            "amount_cents": 5000,
+            "description": "Groceries",
+            "transaction_type": "purchase",
+            "category": "groceries",
+            "merchant_id": rng.randint(1, STORES),
+            "date": start + timedelta(days=rng.randint(0, 5 * 365)),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for _ in range(receipts)
+    ])
+    db.execute(insert(Receipt.__table__), [
+        {"transaction_id": id, "file_path": "r.png", "ocr_data": {}, "created_at": now, "updated_at": now}
+        for id in range(1, receipts + 1)
+    ])
+    # A few items are on most receipts, most items are bought now and then
+    weights = [1 / (rank + 1) for rank in range(len(ITEMS))]
+    rows = []
+    for receipt_id in range(1, receipts + 1):
+        for sku, name in set(rng.choices(ITEMS, weights, k=items_per_receipt)):
+            quantity = rng.randint(1, 4)
+            unit_cents = rng.randint(50, 900)
+            rows.append({
+                "receipt_id": receipt_id, "user_id": 1, "sku": sku, "name": name,
+                "item_key": item_price_service.item_key(sku, name), "quantity": quantity,
+                "unit_price_cents": unit_cents, "total_cents": unit_cents * quantity,
+                "created_at": now, "updated_at": now,
+            })
+    db.execute(insert(ReceiptLineItem.__table__), rows)
+    db.commit()
+
+
+def history_from_line_items(db, key: str) -> List[ItemPricePoint]:
+    # The same points as item_price_service.get_history, grouped per request
+    month = func.strftime("%Y-%m-01", Transaction.date)
+    return [
+        ItemPricePoint(
+            date=date.fromisoformat(row[0]), merchant_id=row[1], currency=row[2],
+            unit_price=from_cents(round(row[3] / row[4])), min_unit_price=from_cents(row[6]),
+            max_unit_price=from_cents(row[7]), quantity=row[4], total=from_cents(row[3]), count=row[5],
+        )
+        for row in db.execute(
+            select(
+                month, Transaction.merchant_id, Transaction.currency, func.sum(ReceiptLineItem.total_cents),
+                func.sum(ReceiptLineItem.quantity), func.count(), func.min(ReceiptLineItem.unit_price_cents),
+                func.max(ReceiptLineItem.unit_price_cents),
+            )
+            .join(Receipt, Receipt.id == ReceiptLineItem.receipt_id)
+            .join(Transaction, Transaction.id == Receipt.transaction_id)
+            .where(ReceiptLineItem.user_id == 1, ReceiptLineItem.item_key == key)
+            .group_by(month, Transaction.merchant_id, Transaction.currency)
+            .order_by(month)
+        )
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--receipts", type=int, default=1_500)
+    parser.add_argument("--items-per-receipt", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=20, help="most bought items charted")
+    args = parser.parse_args()
+
+    db = make_session()
+    seed(db, args.receipts, args.items_per_receipt)
+    line_items = db.scalar(select(func.count(ReceiptLineItem.id)))
+    with timer(f"rebuild rollups from {line_items:,} line items", line_items):
+        written = item_price_service.rebuild(db, user_ids=[1])
+    print(f"  rollups: {written:,}")
+
+    keys = [item_price_service.item_key(sku, name) for sku, name in ITEMS[:args.queries]]
+    with timer(f"{len(keys)} monthly histories from the rollups"):
+        for key in keys:
+            item_price_service.get_history(db, user_id=1, sku=key, interval="month")
+    with timer(f"{len(keys)} monthly histories grouped from the line items"):
+        for key in keys:
+            history_from_line_items(db, key)
+    with timer(f"{len(keys)} daily histories from the rollups"):
+        for key in keys:
+            item_price_service.get_history(db, user_id=1, sku=key)
+
+
+if __name__ == "__main__":
+    main()
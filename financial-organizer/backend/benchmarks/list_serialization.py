@@ -0,0 +1,69 @@
+"""
+Latency of GET /transactions/ at different page sizes: the ORM path with
+response_model validation and JSON encoding, against the column-tuple
+path encoded with orjson.
+
+    cd backend && python -m benchmarks.list_serialization
+"""
+import json
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from benchmarks.common import make_session, timer
+
+from app.db.models import Transaction
+from app.schemas.transaction import Transaction as TransactionSchema
+from app.services import transaction_service
+
+LIMITS = [100, 1000, 10000]
+REPEATS = 5
+
+
+def main() -> None:
+    db = make_session()
+    now = datetime.utcnow()
+    db.execute(
+        insert(Transaction.__table__),
+        [
+            {
+                "user_id": 1,
+                "card_id": 1,
+                "amount_cents": 1000 + 100 * (i % 500),
+                "description": f"Transaction {i}",
+                "transaction_type": "purchase",
+                "category": "other",
+                "merchant_name": f"Merchant {i % 300}",
+                "date": now - timedelta(hours=i),
+                "receipt_text": f"ITEM {i} 1.00" if i % 10 == 0 else None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(max(LIMITS))
+        ],
+    )
+    db.commit()
+
+    # What FastAPI does with a response_model: validate from attributes,
+    # dump to JSON-compatible values, then json.dumps in JSONResponse
+    adapter = TypeAdapter(List[TransactionSchema])
+
+    for limit in LIMITS:
+        with timer(f"ORM + response_model (limit={limit}, x{REPEATS})", rows=limit * REPEATS):
+            for _ in range(REPEATS):
+                db.expunge_all()
+                objs = transaction_service.get_multi(db, user_id=1, limit=limit)
+                content = adapter.dump_python(
+                    adapter.validate_python(objs, from_attributes=True), mode="json"
+                )
+                json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+        with timer(f"columns + orjson (limit={limit}, x{REPEATS})", rows=limit * REPEATS):
+            for _ in range(REPEATS):
+                orjson.dumps(transaction_service.get_multi_rows(db, user_id=1, limit=limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Time the merchant normalizer cold and memoized, the chunked backfill that
+links an existing history to canonical merchants, and per-merchant spending
+grouped by merchant id against grouping by the raw name.
+
+    cd backend && python -m benchmarks.merchants --transactions 200000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, insert, select
+
+from benchmarks.common import make_session, timer
+
+from app.db.models import Merchant, Transaction
+from app.services import merchant_service
+from app.services.rollup_service import SPENDING_SIGNS
+
+# Raw spellings as they come from bank feeds and statements
+TEMPLATES = [
+    "AMZN Mktp US*{ref}", "AMAZON.COM*{ref}", "Amazon Prime*{ref}", "WM SUPERCENTER #{num}",
+    "SQ *CAFE {shop}", "PAYPAL *NETFLIX.COM", "UBER   *TRIP {ref}", "SHELL OIL {num} HOUSTON TX",
+    "LOCAL SHOP {shop} #{num}", "TST* BISTRO {shop}",
+]
+
+
+def raw_names(rng: random.Random, count: int):
+    shops = ["".join(rng.choice("BCDFGKLMNPRSTV") + rng.choice("AEIOU") for _ in range(3)) for _ in range(2000)]
+    return [
+        rng.choice(TEMPLATES).format(
+            ref="".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(6)),
+            num=rng.randint(1, 9999),
+            shop=rng.choice(shops),
+        )
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    names = raw_names(rng, args.transactions)
+    merchant_service._canonical_words.cache_clear()
+    with timer("normalize, cold cache", len(names)):
+        for name in names:
+            merchant_service.canonical_name(name)
+    with timer("normalize, memoized", len(names)):
+        for name in names:
+            merchant_service.canonical_name(name)
+
+    db = make_session()
+    now = datetime.utcnow()
+    db.execute(insert(Transaction.__table__), [{
+        "user_id": rng.randint(1, args.users),
+        "card_id": 1,
+        "amount_cents": rng.randint(300, 20000),
+        "description": "Card purchase",
+        "merchant_name": name,
+        "transaction_type": "purchase",
+        "category": "other",
+        "category_predicted": False,
+        "date": now - timedelta(days=rng.randint(0, 730)),
+        "created_at": now,
+        "updated_at": now,
+    } for name in names])
+    db.commit()
+
+    merchant_service._canonical_words.cache_clear()
+    with timer(f"backfill {args.transactions:,} transactions", args.transactions):
+        linked = merchant_service.backfill(db)
+    merchants = db.scalar(select(func.count(Merchant.id)))
+    raw = db.scalar(select(func.count(func.distinct(Transaction.merchant_name))))
+    print(f"  linked: {linked:,}  distinct raw names: {raw:,}  merchants: {merchants:,}")
+
+    with timer(f"spending per merchant id, {args.users} users"):
+        for user_id in range(1, args.users + 1):
+            merchant_service.get_spending(db, user_id=user_id)
+    # The same aggregate keyed by the raw text, as before merchants existed
+    signed = case(
+        *[(Transaction.transaction_type == name, Transaction.amount_cents * sign) for name, sign in SPENDING_SIGNS.items()]
+    )
+    merchant = func.lower(Transaction.merchant_name)
+    with timer(f"spending per raw merchant name, {args.users} users"):
+        for user_id in range(1, args.users + 1):
+            db.execute(
+                select(merchant, func.sum(signed), func.count(), func.max(Transaction.date))
+                .where(Transaction.user_id == user_id, Transaction.transaction_type.in_(SPENDING_SIGNS))
+                .group_by(merchant)
+                .order_by(func.sum(signed).desc())
+                .limit(50)
+            ).all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Time the subscription detector over a large transaction history, then an
+incremental run that only sees a handful of new transactions.
+
+    cd backend && python -m benchmarks.recurring_detection --transactions 1000000
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import make_session, timer
+
+from app.db.models import RecurringSuggestion, Transaction
+from app.services import recurring_detection_service
+
+MERCHANTS = ["Grocer", "Gas Station", "Coffee Shop", "Restaurant", "Pharmacy", "Hardware"]
+
+
+def seed(db, transactions: int, users: int, today: date) -> None:
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    rows = []
+    # One monthly subscription per user, the rest is random spending
+    for user_id in range(1, users + 1):
+        for month in range(24):
+            rows.append({
+                "user_id": user_id,
+                "amount_cents": 1599,
+                "description": "Streaming",
+                "merchant_name": f"STREAMFLIX*{rng.randint(1000, 9999)}",
+                "transaction_type": "purchase",
+                "category": "entertainment",
+                "date": datetime.combine(today, datetime.min.time()) - timedelta(days=30 * month),
+                "created_at": now,
+                "updated_at": now,
+            })
+    while len(rows) < transactions:
+        rows.append({
+            "user_id": rng.randint(1, users),
+            "amount_cents": rng.randint(300, 20000),
+            "description": "Card purchase",
+            "merchant_name": rng.choice(MERCHANTS),
+            "transaction_type": "purchase",
+            "category": "other",
+            "date": now - timedelta(days=rng.randint(0, 730)),
+            "created_at": now,
+            "updated_at": now,
+        })
+    for start in range(0, len(rows), 50_000):
+        db.execute(insert(Transaction.__table__), rows[start:start + 50_000])
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    args = parser.parse_args()
+
+    today = date.today()
+    db = make_session()
+    with timer(f"seed {args.transactions:,} transactions", args.transactions):
+        seed(db, args.transactions, args.users, today)
+
+    with timer("full detection run", args.transactions):
+        recurring_detection_service.run_incremental(db, today=today)
+    found = db.scalar(select(func.count()).select_from(RecurringSuggestion))
+    print(f"suggestions: {found:,}")
+
+    db.execute(insert(Transaction.__table__), [{
+        "user_id": 1, "amount_cents": 1599, "description": "Streaming",
+        "merchant_name": "STREAMFLIX*0000", "date": datetime.utcnow(),
+    }])
+    db.commit()
+    with timer("incremental run (1 new transaction)"):
+        recurring_detection_service.run_incremental(db, today=today)
+
+
+if __name__ == "__main__":
+    main()
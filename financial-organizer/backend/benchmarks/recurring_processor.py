@@ -0,0 +1,67 @@
+"""
+Throughput of process_due_recurring_transactions over many due schedules.
+
+    cd backend && python -m benchmarks.recurring_processor --schedules 1000000
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import StatementCounter, make_session, timer
+
+from app.db.models import RecurringTransaction, Transaction
+from app.services import recurring_transaction_service
+
+FREQUENCIES = ["daily", "weekly", "biweekly", "monthly", "quarterly", "yearly"]
+
+
+def seed(db, schedules: int, today: date) -> None:
+    now = datetime.utcnow()
+    chunk = 50_000
+    for offset in range(0, schedules, chunk):
+        rows = [
+            {
+                "user_id": i % 10_000 + 1,
+                "amount_cents": 999,
+                "transaction_type": "payment",
+                "category": "utilities",
+                "description": f"Schedule {i}",
+                "frequency": FREQUENCIES[i % len(FREQUENCIES)],
+                "start_date": today - timedelta(days=i % 3),
+                "next_date": today - timedelta(days=i % 3),
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(offset, min(offset + chunk, schedules))
+        ]
+        db.execute(insert(RecurringTransaction.__table__), rows)
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--schedules", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=recurring_transaction_service.DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    today = date.today()
+    db = make_session()
+    with timer(f"seed {args.schedules:,} due schedules", args.schedules):
+        seed(db, args.schedules, today)
+
+    counter = StatementCounter(db.get_bind())
+    with counter.count() as stmts:
+        with timer(f"process (batch size {args.batch_size:,})", args.schedules):
+            created = recurring_transaction_service.process_due_recurring_transactions(
+                db, batch_size=args.batch_size, today=today
+            )
+
+    assert created == db.scalar(select(func.count()).select_from(Transaction))
+    print(f"transactions created: {created:,}")
+    print(f"statements issued:    {len(stmts):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Add index for the due recurring transaction scan
+
+Revision ID: 2b6c4d8e0f13
+Revises: 1a5b3c7d9e2f
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = '2b6c4d8e0f13'
+down_revision = '1a5b3c7d9e2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    if 'recurring_transactions' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [index['name'] for index in inspector.get_indexes('recurring_transactions')]
+    if 'ix_recurring_transactions_due' not in existing_indexes:
+        op.create_index(
+            'ix_recurring_transactions_due',
+            'recurring_transactions',
+            ['is_active', 'next_date'],
+            unique=False,
+        )
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+    if 'recurring_transactions' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [index['name'] for index in inspector.get_indexes('recurring_transactions')]
+    if 'ix_recurring_transactions_due' in existing_indexes:
+        op.drop_index('ix_recurring_transactions_due', table_name='recurring_transactions')
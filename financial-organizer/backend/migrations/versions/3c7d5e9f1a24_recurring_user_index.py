@@ -0,0 +1,40 @@
+"""Index recurring transactions by user
+
+Revision ID: 3c7d5e9f1a24
+Revises: 2b6c4d8e0f13
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = '3c7d5e9f1a24'
+down_revision = '2b6c4d8e0f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    if 'recurring_transactions' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [index['name'] for index in inspector.get_indexes('recurring_transactions')]
+    if 'ix_recurring_transactions_user_id' not in existing_indexes:
+        op.create_index(
+            op.f('ix_recurring_transactions_user_id'),
+            'recurring_transactions',
+            ['user_id'],
+            unique=False,
+        )
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+    if 'recurring_transactions' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [index['name'] for index in inspector.get_indexes('recurring_transactions')]
+    if 'ix_recurring_transactions_user_id' in existing_indexes:
+        op.drop_index(op.f('ix_recurring_transactions_user_id'), table_name='recurring_transactions')
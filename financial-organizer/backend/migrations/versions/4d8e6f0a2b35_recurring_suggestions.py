@@ -0,0 +1,84 @@
+"""Add recurring suggestions and job state tables
+
+Revision ID: 4d8e6f0a2b35
+Revises: 3c7d5e9f1a24
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = '4d8e6f0a2b35'
+down_revision = '3c7d5e9f1a24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'transactions' in existing_tables:
+        existing_indexes = [index['name'] for index in inspector.get_indexes('transactions')]
+        if 'ix_transactions_user_id' not in existing_indexes:
+            op.create_index(op.f('ix_transactions_user_id'), 'transactions', ['user_id'], unique=False)
+
+    if 'recurring_suggestions' not in existing_tables:
+        op.create_table('recurring_suggestions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('merchant_key', sa.String(), nullable=False),
+            sa.Column('amount_band', sa.Integer(), nullable=False),
+            sa.Column('merchant_name', sa.String(), nullable=True),
+            sa.Column('description', sa.String(), nullable=True),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('transaction_type', sa.String(), nullable=True),
+            sa.Column('category', sa.String(), nullable=True),
+            sa.Column('frequency', sa.String(), nullable=False),
+            sa.Column('last_date', sa.Date(), nullable=False),
+            sa.Column('next_date', sa.Date(), nullable=False),
+            sa.Column('occurrences', sa.Integer(), nullable=False),
+            sa.Column('confidence', sa.Float(), nullable=False),
+            sa.Column('is_dismissed', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'merchant_key', 'amount_band', name='uq_recurring_suggestions_group')
+        )
+        op.create_index(op.f('ix_recurring_suggestions_id'), 'recurring_suggestions', ['id'], unique=False)
+        op.create_index(op.f('ix_recurring_suggestions_user_id'), 'recurring_suggestions', ['user_id'], unique=False)
+
+    if 'job_states' not in existing_tables:
+        op.create_table('job_states',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.Column('last_transaction_id', sa.Integer(), nullable=False),
+            sa.Column('last_run_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+        op.create_index(op.f('ix_job_states_id'), 'job_states', ['id'], unique=False)
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'job_states' in existing_tables:
+        op.drop_index(op.f('ix_job_states_id'), table_name='job_states')
+        op.drop_table('job_states')
+
+    if 'recurring_suggestions' in existing_tables:
+        op.drop_index(op.f('ix_recurring_suggestions_user_id'), table_name='recurring_suggestions')
+        op.drop_index(op.f('ix_recurring_suggestions_id'), table_name='recurring_suggestions')
+        op.drop_table('recurring_suggestions')
+
+    if 'transactions' in existing_tables:
+        existing_indexes = [index['name'] for index in inspector.get_indexes('transactions')]
+        if 'ix_transactions_user_id' in existing_indexes:
+            op.drop_index(op.f('ix_transactions_user_id'), table_name='transactions')
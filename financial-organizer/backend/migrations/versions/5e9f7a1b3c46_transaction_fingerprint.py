@@ -0,0 +1,44 @@
+"""Add import fingerprint to transactions
+
+Revision ID: 5e9f7a1b3c46
+Revises: 4d8e6f0a2b35
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = '5e9f7a1b3c46'
+down_revision = '4d8e6f0a2b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    if 'transactions' not in inspector.get_table_names():
+        return
+
+    existing_columns = [column['name'] for column in inspector.get_columns('transactions')]
+    if 'fingerprint' not in existing_columns:
+        op.add_column('transactions', sa.Column('fingerprint', sa.String(), nullable=True))
+
+    existing_indexes = [index['name'] for index in inspector.get_indexes('transactions')]
+    if 'ix_transactions_user_fingerprint' not in existing_indexes:
+        op.create_index('ix_transactions_user_fingerprint', 'transactions', ['user_id', 'fingerprint'], unique=False)
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+    if 'transactions' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [index['name'] for index in inspector.get_indexes('transactions')]
+    if 'ix_transactions_user_fingerprint' in existing_indexes:
+        op.drop_index('ix_transactions_user_fingerprint', table_name='transactions')
+
+    existing_columns = [column['name'] for column in inspector.get_columns('transactions')]
+    if 'fingerprint' in existing_columns:
+        op.drop_column('transactions', 'fingerprint')
@@ -0,0 +1,36 @@
+"""Add data version to users
+
+Revision ID: 6f0a8b2c4d57
+Revises: 5e9f7a1b3c46
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = '6f0a8b2c4d57'
+down_revision = '5e9f7a1b3c46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    if 'users' not in inspector.get_table_names():
+        return
+
+    existing_columns = [column['name'] for column in inspector.get_columns('users')]
+    if 'data_version' not in existing_columns:
+        op.add_column('users', sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+    if 'users' not in inspector.get_table_names():
+        return
+
+    existing_columns = [column['name'] for column in inspector.get_columns('users')]
+    if 'data_version' in existing_columns:
+        op.drop_column('users', 'data_version')
@@ -0,0 +1,59 @@
+"""Add spending rollups
+
+Revision ID: 7a1b9c3d5e68
+Revises: 6f0a8b2c4d57
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = '7a1b9c3d5e68'
+down_revision = '6f0a8b2c4d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'transactions' in existing_tables:
+        existing_indexes = [index['name'] for index in inspector.get_indexes('transactions')]
+        if 'ix_transactions_user_date' not in existing_indexes:
+            op.create_index('ix_transactions_user_date', 'transactions', ['user_id', 'date'], unique=False)
+
+    if 'spending_rollups' not in existing_tables:
+        op.create_table('spending_rollups',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('month', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(), nullable=False),
+            sa.Column('card_id', sa.Integer(), nullable=False),
+            sa.Column('total', sa.Float(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('min_amount', sa.Float(), nullable=True),
+            sa.Column('max_amount', sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'month', 'category', 'card_id', name='uq_spending_rollups_key')
+        )
+        op.create_index(op.f('ix_spending_rollups_id'), 'spending_rollups', ['id'], unique=False)
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'spending_rollups' in existing_tables:
+        op.drop_index(op.f('ix_spending_rollups_id'), table_name='spending_rollups')
+        op.drop_table('spending_rollups')
+
+    if 'transactions' in existing_tables:
+        existing_indexes = [index['name'] for index in inspector.get_indexes('transactions')]
+        if 'ix_transactions_user_date' in existing_indexes:
+            op.drop_index('ix_transactions_user_date', table_name='transactions')
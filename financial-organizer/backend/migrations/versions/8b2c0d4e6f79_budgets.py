@@ -0,0 +1,73 @@
+"""Add budgets and budget events
+
+Revision ID: 8b2c0d4e6f79
+Revises: 7a1b9c3d5e68
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = '8b2c0d4e6f79'
+down_revision = '7a1b9c3d5e68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'budgets' not in existing_tables:
+        op.create_table('budgets',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('category', sa.String(), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('alert_threshold', sa.Float(), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'category', name='uq_budgets_user_category')
+        )
+        op.create_index(op.f('ix_budgets_id'), 'budgets', ['id'], unique=False)
+        op.create_index(op.f('ix_budgets_user_id'), 'budgets', ['user_id'], unique=False)
+
+    if 'budget_events' not in existing_tables:
+        op.create_table('budget_events',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('budget_id', sa.Integer(), nullable=False),
+            sa.Column('month', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(), nullable=False),
+            sa.Column('threshold', sa.Float(), nullable=False),
+            sa.Column('spent', sa.Float(), nullable=False),
+            sa.Column('budget_amount', sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['budget_id'], ['budgets.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('budget_id', 'month', 'threshold', name='uq_budget_events_threshold')
+        )
+        op.create_index(op.f('ix_budget_events_id'), 'budget_events', ['id'], unique=False)
+        op.create_index(op.f('ix_budget_events_user_id'), 'budget_events', ['user_id'], unique=False)
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'budget_events' in existing_tables:
+        op.drop_index(op.f('ix_budget_events_user_id'), table_name='budget_events')
+        op.drop_index(op.f('ix_budget_events_id'), table_name='budget_events')
+        op.drop_table('budget_events')
+
+    if 'budgets' in existing_tables:
+        op.drop_index(op.f('ix_budgets_user_id'), table_name='budgets')
+        op.drop_index(op.f('ix_budgets_id'), table_name='budgets')
+        op.drop_table('budgets')
@@ -0,0 +1,52 @@
+"""Add full-text and trigram search indexes on transactions
+
+Revision ID: 9c3d1e5f7a80
+Revises: 8b2c0d4e6f79
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = '9c3d1e5f7a80'
+down_revision = '8b2c0d4e6f79'
+branch_labels = None
+depends_on = None
+
+# Must match SEARCH_TEXT_SQL in app/services/search_service.py for the
+# planner to use the indexes
+SEARCH_TEXT_SQL = (
+    "(coalesce(description, '') || ' ' || coalesce(merchant_name, '') || ' ' || "
+    "coalesce(ocr_data->>'raw_text', ''))"
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    # SQLite builds its FTS5 table at runtime instead
+    if bind.dialect.name != 'postgresql':
+        return
+
+    existing_indexes = [index['name'] for index in inspect(bind).get_indexes('transactions')]
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    if 'ix_transactions_search_vector' not in existing_indexes:
+        op.execute(
+            "CREATE INDEX ix_transactions_search_vector ON transactions "
+            f"USING gin (to_tsvector('simple', {SEARCH_TEXT_SQL}))"
+        )
+    if 'ix_transactions_search_trgm' not in existing_indexes:
+        op.execute(
+            "CREATE INDEX ix_transactions_search_trgm ON transactions "
+            f"USING gin ({SEARCH_TEXT_SQL} gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX IF EXISTS ix_transactions_search_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_transactions_search_vector')
@@ -0,0 +1,56 @@
+"""Add indexes for transaction list filters and sorting
+
+Revision ID: a1d4f6b8c091
+Revises: 9c3d1e5f7a80
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'a1d4f6b8c091'
+down_revision = '9c3d1e5f7a80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing_indexes = [index['name'] for index in inspect(op.get_bind()).get_indexes('transactions')]
+
+    if 'ix_transactions_user_amount' not in existing_indexes:
+        op.create_index('ix_transactions_user_amount', 'transactions', ['user_id', 'amount'], unique=False)
+    if 'ix_transactions_user_category_date' not in existing_indexes:
+        op.create_index('ix_transactions_user_category_date', 'transactions', ['user_id', 'category', 'date'], unique=False)
+    if 'ix_transactions_user_card_date' not in existing_indexes:
+        op.create_index('ix_transactions_user_card_date', 'transactions', ['user_id', 'card_id', 'date'], unique=False)
+    if 'ix_transactions_user_merchant' not in existing_indexes:
+        op.create_index(
+            'ix_transactions_user_merchant',
+            'transactions',
+            ['user_id', sa.text('lower(merchant_name) text_pattern_ops')],
+            unique=False,
+        )
+    if 'ix_transactions_user_receipt_date' not in existing_indexes:
+        op.create_index(
+            'ix_transactions_user_receipt_date',
+            'transactions',
+            ['user_id', 'date'],
+            unique=False,
+            postgresql_where=sa.text('receipt_path IS NOT NULL'),
+        )
+
+
+def downgrade():
+    existing_indexes = [index['name'] for index in inspect(op.get_bind()).get_indexes('transactions')]
+
+    for name in [
+        'ix_transactions_user_receipt_date',
+        'ix_transactions_user_merchant',
+        'ix_transactions_user_card_date',
+        'ix_transactions_user_category_date',
+        'ix_transactions_user_amount',
+    ]:
+        if name in existing_indexes:
+            op.drop_index(name, table_name='transactions')
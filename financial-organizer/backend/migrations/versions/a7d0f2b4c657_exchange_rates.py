@@ -0,0 +1,43 @@
+"""Add exchange rates
+
+Revision ID: a7d0f2b4c657
+Revises: f6c9e1a3b546
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'a7d0f2b4c657'
+down_revision = 'f6c9e1a3b546'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+
+    # Rates are loaded by `python -m app.commands.load_fx_rates`
+    if 'exchange_rates' not in inspector.get_table_names():
+        op.create_table('exchange_rates',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('currency', sa.String(3), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('rate', sa.Float(), nullable=False),
+            sa.Column('valid_until', sa.Date(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('currency', 'date', name='uq_exchange_rates_currency_date')
+        )
+        op.create_index(op.f('ix_exchange_rates_id'), 'exchange_rates', ['id'], unique=False)
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+
+    if 'exchange_rates' in inspector.get_table_names():
+        op.drop_index(op.f('ix_exchange_rates_id'), table_name='exchange_rates')
+        op.drop_table('exchange_rates')
@@ -0,0 +1,66 @@
+"""Add category rules
+
+Revision ID: b2e5a7c9d102
+Revises: a1d4f6b8c091
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'b2e5a7c9d102'
+down_revision = 'a1d4f6b8c091'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'category_rules' not in existing_tables:
+        op.create_table('category_rules',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('category', sa.String(), nullable=False),
+            sa.Column('merchant_contains', sa.String(), nullable=True),
+            sa.Column('merchant_pattern', sa.String(), nullable=True),
+            sa.Column('min_amount', sa.Float(), nullable=True),
+            sa.Column('max_amount', sa.Float(), nullable=True),
+            sa.Column('card_id', sa.Integer(), nullable=True),
+            sa.Column('priority', sa.Integer(), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['card_id'], ['cards.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_category_rules_id'), 'category_rules', ['id'], unique=False)
+        op.create_index(op.f('ix_category_rules_user_id'), 'category_rules', ['user_id'], unique=False)
+
+    columns = [column['name'] for column in inspector.get_columns('transactions')]
+    if 'category_rule_id' not in columns:
+        op.add_column('transactions', sa.Column('category_rule_id', sa.Integer(), nullable=True))
+        op.create_foreign_key(
+            'fk_transactions_category_rule_id', 'transactions', 'category_rules',
+            ['category_rule_id'], ['id'], ondelete='SET NULL'
+        )
+        op.create_index(op.f('ix_transactions_category_rule_id'), 'transactions', ['category_rule_id'], unique=False)
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+
+    columns = [column['name'] for column in inspector.get_columns('transactions')]
+    if 'category_rule_id' in columns:
+        op.drop_index(op.f('ix_transactions_category_rule_id'), table_name='transactions')
+        op.drop_constraint('fk_transactions_category_rule_id', 'transactions', type_='foreignkey')
+        op.drop_column('transactions', 'category_rule_id')
+
+    if 'category_rules' in inspector.get_table_names():
+        op.drop_index(op.f('ix_category_rules_user_id'), table_name='category_rules')
+        op.drop_index(op.f('ix_category_rules_id'), table_name='category_rules')
+        op.drop_table('category_rules')
@@ -0,0 +1,124 @@
+"""Store receipt items as line items and drop the OCR JSON from transactions
+
+Revision ID: b8e1a3c5d768
+Revises: a7d0f2b4c657
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1a3c5d768'
+down_revision = 'a7d0f2b4c657'
+branch_labels = None
+depends_on = None
+
+# Must match SEARCH_TEXT_SQL in app/services/search_service.py for the
+# planner to use the indexes
+SEARCH_TEXT_SQL = (
+    "(coalesce(description, '') || ' ' || coalesce(merchant_name, '') || ' ' || "
+    "coalesce(receipt_text, ''))"
+)
+# The expression of migration 9c3d1e5f7a80, restored on downgrade
+OCR_SEARCH_TEXT_SQL = (
+    "(coalesce(description, '') || ' ' || coalesce(merchant_name, '') || ' ' || "
+    "coalesce(ocr_data->>'raw_text', ''))"
+)
+
+
+def _columns(table):
+    return [column['name'] for column in inspect(op.get_bind()).get_columns(table)]
+
+
+def _rebuild_search_index(search_text_sql):
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_transactions_search_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_transactions_search_vector')
+        op.execute(
+            "CREATE INDEX ix_transactions_search_vector ON transactions "
+            f"USING gin (to_tsvector('simple', {search_text_sql}))"
+        )
+        op.execute(
+            "CREATE INDEX ix_transactions_search_trgm ON transactions "
+            f"USING gin ({search_text_sql} gin_trgm_ops)"
+        )
+    else:
+        # The FTS5 table and its triggers read the old column; they are
+        # recreated from the new one on the next search
+        for trigger in ('transactions_fts_insert', 'transactions_fts_delete', 'transactions_fts_update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS transactions_fts')
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if 'receipt_line_items' not in inspect(bind).get_table_names():
+        op.create_table('receipt_line_items',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('receipt_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('sku', sa.String(), nullable=True),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.Column('quantity', sa.Float(), nullable=False),
+            sa.Column('unit_price_cents', sa.BigInteger(), nullable=True),
+            sa.Column('total_cents', sa.BigInteger(), nullable=False),
+            sa.ForeignKeyConstraint(['receipt_id'], ['receipts.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_receipt_line_items_id'), 'receipt_line_items', ['id'], unique=False)
+        op.create_index(
+            op.f('ix_receipt_line_items_receipt_id'), 'receipt_line_items', ['receipt_id'], unique=False
+        )
+        op.create_index('ix_receipt_line_items_user_sku', 'receipt_line_items', ['user_id', 'sku'], unique=False)
+        op.create_index(
+            'ix_receipt_line_items_user_name', 'receipt_line_items', ['user_id', sa.text('lower(name)')], unique=False
+        )
+
+    # The OCR parser never filled in items before line items existed, so
+    # there are none to move; only the raw text is kept, for search
+    if 'ocr_data' in _columns('transactions'):
+        op.add_column('transactions', sa.Column('receipt_text', sa.Text(), nullable=True))
+        if bind.dialect.name == 'postgresql':
+            op.execute("UPDATE transactions SET receipt_text = ocr_data->>'raw_text' WHERE ocr_data IS NOT NULL")
+        else:
+            op.execute(
+                "UPDATE transactions SET receipt_text = json_extract(ocr_data, '$.raw_text') "
+                "WHERE ocr_data IS NOT NULL"
+            )
+        _rebuild_search_index(SEARCH_TEXT_SQL)
+        op.drop_column('transactions', 'grocery_items')
+        op.drop_column('transactions', 'ocr_data')
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if 'ocr_data' not in _columns('transactions'):
+        op.add_column('transactions', sa.Column('ocr_data', sa.JSON(), nullable=True))
+        op.add_column('transactions', sa.Column('grocery_items', sa.JSON(), nullable=True))
+        if bind.dialect.name == 'postgresql':
+            op.execute(
+                "UPDATE transactions SET ocr_data = json_build_object('raw_text', receipt_text) "
+                "WHERE receipt_text IS NOT NULL"
+            )
+        else:
+            op.execute(
+                "UPDATE transactions SET ocr_data = json_object('raw_text', receipt_text) "
+                "WHERE receipt_text IS NOT NULL"
+            )
+        _rebuild_search_index(OCR_SEARCH_TEXT_SQL)
+        op.drop_column('transactions', 'receipt_text')
+
+    if 'receipt_line_items' in inspect(bind).get_table_names():
+        op.drop_index('ix_receipt_line_items_user_name', table_name='receipt_line_items')
+        op.drop_index('ix_receipt_line_items_user_sku', table_name='receipt_line_items')
+        op.drop_index(op.f('ix_receipt_line_items_receipt_id'), table_name='receipt_line_items')
+        op.drop_index(op.f('ix_receipt_line_items_id'), table_name='receipt_line_items')
+        op.drop_table('receipt_line_items')
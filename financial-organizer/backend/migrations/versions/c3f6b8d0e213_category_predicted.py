@@ -0,0 +1,31 @@
+"""Mark transactions whose category was predicted
+
+Revision ID: c3f6b8d0e213
+Revises: b2e5a7c9d102
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'c3f6b8d0e213'
+down_revision = 'b2e5a7c9d102'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column['name'] for column in inspect(op.get_bind()).get_columns('transactions')]
+    if 'category_predicted' not in columns:
+        op.add_column(
+            'transactions',
+            sa.Column('category_predicted', sa.Boolean(), nullable=False, server_default=sa.false()),
+        )
+
+
+def downgrade():
+    columns = [column['name'] for column in inspect(op.get_bind()).get_columns('transactions')]
+    if 'category_predicted' in columns:
+        op.drop_column('transactions', 'category_predicted')
@@ -0,0 +1,102 @@
+"""Add item keys to receipt line items and daily item price rollups
+
+Revision ID: c9f2b4d6e879
+Revises: b8e1a3c5d768
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'c9f2b4d6e879'
+down_revision = 'b8e1a3c5d768'
+branch_labels = None
+depends_on = None
+
+# As item_price_service.item_key at the time of this migration
+_NON_WORD_RE = re.compile(r"[^a-z0-9%]+")
+
+
+def _item_key(sku, name):
+    if sku:
+        return sku
+    return _NON_WORD_RE.sub(" ", (name or "").lower()).strip()
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    columns = [column['name'] for column in inspector.get_columns('receipt_line_items')]
+    if 'item_key' not in columns:
+        op.add_column('receipt_line_items', sa.Column('item_key', sa.String(), nullable=True))
+        line_items = sa.table(
+            'receipt_line_items', sa.column('id'), sa.column('sku'), sa.column('name'), sa.column('item_key')
+        )
+        rows = bind.execute(sa.select(line_items.c.id, line_items.c.sku, line_items.c.name)).all()
+        if rows:
+            bind.execute(
+                line_items.update().where(line_items.c.id == sa.bindparam('_id')).values(item_key=sa.bindparam('_key')),
+                [{'_id': row.id, '_key': _item_key(row.sku, row.name)} for row in rows],
+            )
+        with op.batch_alter_table('receipt_line_items') as batch_op:
+            batch_op.alter_column('item_key', existing_type=sa.String(), nullable=False)
+        # SQLite recreates the table in a batch operation, without the
+        # expression index it cannot reflect
+        if 'ix_receipt_line_items_user_name' not in [
+            index['name'] for index in inspect(bind).get_indexes('receipt_line_items')
+        ]:
+            op.create_index(
+                'ix_receipt_line_items_user_name', 'receipt_line_items', ['user_id', sa.text('lower(name)')],
+                unique=False
+            )
+        op.create_index(
+            'ix_receipt_line_items_user_item', 'receipt_line_items', ['user_id', 'item_key'], unique=False
+        )
+
+    if op.f('ix_receipts_transaction_id') not in [index['name'] for index in inspector.get_indexes('receipts')]:
+        op.create_index(op.f('ix_receipts_transaction_id'), 'receipts', ['transaction_id'], unique=False)
+
+    # Filled by `python -m app.commands.rebuild_item_prices`
+    if 'item_price_rollups' not in inspector.get_table_names():
+        op.create_table('item_price_rollups',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('item_key', sa.String(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('merchant_id', sa.Integer(), nullable=False),
+            sa.Column('currency', sa.String(3), nullable=False),
+            sa.Column('quantity', sa.Float(), nullable=False),
+            sa.Column('total_cents', sa.BigInteger(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('min_unit_cents', sa.BigInteger(), nullable=True),
+            sa.Column('max_unit_cents', sa.BigInteger(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint(
+                'user_id', 'item_key', 'day', 'merchant_id', 'currency', name='uq_item_price_rollups_key'
+            )
+        )
+        op.create_index(op.f('ix_item_price_rollups_id'), 'item_price_rollups', ['id'], unique=False)
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+
+    if 'item_price_rollups' in inspector.get_table_names():
+        op.drop_index(op.f('ix_item_price_rollups_id'), table_name='item_price_rollups')
+        op.drop_table('item_price_rollups')
+
+    if op.f('ix_receipts_transaction_id') in [index['name'] for index in inspector.get_indexes('receipts')]:
+        op.drop_index(op.f('ix_receipts_transaction_id'), table_name='receipts')
+
+    columns = [column['name'] for column in inspector.get_columns('receipt_line_items')]
+    if 'item_key' in columns:
+        op.drop_index('ix_receipt_line_items_user_item', table_name='receipt_line_items')
+        op.drop_column('receipt_line_items', 'item_key')
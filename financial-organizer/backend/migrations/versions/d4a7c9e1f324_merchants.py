@@ -0,0 +1,57 @@
+"""Add canonical merchants
+
+Revision ID: d4a7c9e1f324
+Revises: c3f6b8d0e213
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7c9e1f324'
+down_revision = 'c3f6b8d0e213'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'merchants' not in existing_tables:
+        op.create_table('merchants',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.Column('display_name', sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_merchants_id'), 'merchants', ['id'], unique=False)
+        op.create_index(op.f('ix_merchants_name'), 'merchants', ['name'], unique=True)
+
+    # Existing rows are linked by `python -m app.commands.backfill_merchants`
+    columns = [column['name'] for column in inspector.get_columns('transactions')]
+    if 'merchant_id' not in columns:
+        op.add_column('transactions', sa.Column('merchant_id', sa.Integer(), nullable=True))
+        op.create_foreign_key(
+            'fk_transactions_merchant_id', 'transactions', 'merchants', ['merchant_id'], ['id']
+        )
+        op.create_index('ix_transactions_user_merchant_id', 'transactions', ['user_id', 'merchant_id'], unique=False)
+
+
+def downgrade():
+    inspector = inspect(op.get_bind())
+
+    columns = [column['name'] for column in inspector.get_columns('transactions')]
+    if 'merchant_id' in columns:
+        op.drop_index('ix_transactions_user_merchant_id', table_name='transactions')
+        op.drop_constraint('fk_transactions_merchant_id', 'transactions', type_='foreignkey')
+        op.drop_column('transactions', 'merchant_id')
+
+    if 'merchants' in inspector.get_table_names():
+        op.drop_index(op.f('ix_merchants_name'), table_name='merchants')
+        op.drop_index(op.f('ix_merchants_id'), table_name='merchants')
+        op.drop_table('merchants')
@@ -0,0 +1,46 @@
+"""Add dedupe keys and duplicate links to transactions
+
+Revision ID: e5b8d0f2a435
+Revises: d4a7c9e1f324
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8d0f2a435'
+down_revision = 'd4a7c9e1f324'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = inspect(op.get_bind())
+    columns = [column['name'] for column in inspector.get_columns('transactions')]
+
+    # Existing rows are keyed by `python -m app.commands.backfill_dedupe_keys`,
+    # or per user on their first duplicate scan
+    if 'dedupe_key' not in columns:
+        op.add_column('transactions', sa.Column('dedupe_key', sa.BigInteger(), nullable=True))
+        op.create_index(
+            'ix_transactions_user_dedupe_date', 'transactions', ['user_id', 'dedupe_key', 'date'], unique=False
+        )
+    if 'duplicate_of_id' not in columns:
+        op.add_column('transactions', sa.Column('duplicate_of_id', sa.Integer(), nullable=True))
+        op.create_foreign_key(
+            'fk_transactions_duplicate_of_id', 'transactions', 'transactions',
+            ['duplicate_of_id'], ['id'], ondelete='SET NULL'
+        )
+
+
+def downgrade():
+    columns = [column['name'] for column in inspect(op.get_bind()).get_columns('transactions')]
+
+    if 'duplicate_of_id' in columns:
+        op.drop_constraint('fk_transactions_duplicate_of_id', 'transactions', type_='foreignkey')
+        op.drop_column('transactions', 'duplicate_of_id')
+    if 'dedupe_key' in columns:
+        op.drop_index('ix_transactions_user_dedupe_date', table_name='transactions')
+        op.drop_column('transactions', 'dedupe_key')
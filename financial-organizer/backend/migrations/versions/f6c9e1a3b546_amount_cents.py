@@ -0,0 +1,81 @@
+"""Store amounts as integer cents with a currency code
+
+Revision ID: f6c9e1a3b546
+Revises: e5b8d0f2a435
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'f6c9e1a3b546'
+down_revision = 'e5b8d0f2a435'
+branch_labels = None
+depends_on = None
+
+# (table, float column, cents column) pairs converted in place
+MONEY_COLUMNS = [
+    ('transactions', 'amount', 'amount_cents'),
+    ('recurring_transactions', 'amount', 'amount_cents'),
+    ('spending_rollups', 'total', 'total_cents'),
+    ('spending_rollups', 'min_amount', 'min_cents'),
+    ('spending_rollups', 'max_amount', 'max_cents'),
+]
+
+# Cents columns replacing NOT NULL float columns
+REQUIRED_COLUMNS = [('recurring_transactions', 'amount_cents'), ('spending_rollups', 'total_cents')]
+
+
+def _columns(table):
+    return [column['name'] for column in inspect(op.get_bind()).get_columns(table)]
+
+
+def _indexes(table):
+    return [index['name'] for index in inspect(op.get_bind()).get_indexes(table)]
+
+
+def upgrade():
+    for table, float_column, cents_column in MONEY_COLUMNS:
+        if cents_column in _columns(table):
+            continue
+        op.add_column(table, sa.Column(cents_column, sa.BigInteger(), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET {cents_column} = CAST(ROUND({float_column} * 100) AS BIGINT) "
+            f"WHERE {float_column} IS NOT NULL"
+        )
+        if 'ix_transactions_user_amount' in _indexes(table):
+            op.drop_index('ix_transactions_user_amount', table_name=table)
+        # Plain ALTER TABLE ... DROP COLUMN, so that SQLite keeps the search
+        # triggers on transactions (a batch operation recreates the table)
+        op.drop_column(table, float_column)
+
+    for table, cents_column in REQUIRED_COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(cents_column, existing_type=sa.BigInteger(), nullable=False)
+
+    for table in ('transactions', 'recurring_transactions'):
+        if 'currency' not in _columns(table):
+            op.add_column(table, sa.Column('currency', sa.String(3), nullable=False, server_default='USD'))
+
+    if 'ix_transactions_user_amount' not in _indexes('transactions'):
+        op.create_index('ix_transactions_user_amount', 'transactions', ['user_id', 'amount_cents'], unique=False)
+
+
+def downgrade():
+    for table in ('transactions', 'recurring_transactions'):
+        if 'currency' in _columns(table):
+            op.drop_column(table, 'currency')
+
+    for table, float_column, cents_column in MONEY_COLUMNS:
+        if cents_column not in _columns(table):
+            continue
+        op.add_column(table, sa.Column(float_column, sa.Float(), nullable=True))
+        op.execute(f"UPDATE {table} SET {float_column} = {cents_column} / 100.0")
+        if 'ix_transactions_user_amount' in _indexes(table):
+            op.drop_index('ix_transactions_user_amount', table_name=table)
+        op.drop_column(table, cents_column)
+
+    if 'ix_transactions_user_amount' not in _indexes('transactions'):
+        op.create_index('ix_transactions_user_amount', 'transactions', ['user_id', 'amount'], unique=False)
@@ -0,0 +1,95 @@
+import pytest
+
+TRANSACTION = {
+    "amount": 12.5, "description": "Lunch", "transaction_type": "purchase", "category": "dining",
+    "merchant_name": "Cafe", "date": "2024-03-01T12:00:00",
+}
+CARD = {"card_number": "4111", "card_type": "visa", "last_four": "1111", "expiry_date": "12/30"}
+SCHEDULE = {
+    "amount": 9.99, "transaction_type": "purchase", "category": "entertainment", "description": "Music",
+    "frequency": "monthly", "start_date": "2024-03-01",
+}
+LISTS = ["/api/v1/transactions/", "/api/v1/cards/", "/api/v1/recurring-transactions/"]
+
+
+@pytest.fixture
+def client(client, auth_headers):
+    client.headers.update(auth_headers)
+    return client
+
+
+def assert_invalidated(client, write):
+    """Every list is served from cache until `write` runs, then re-sent."""
+    etags = {path: client.get(path).headers["etag"] for path in LISTS}
+    for path, etag in etags.items():
+        response = client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+
+    assert write().status_code == 200
+
+    for path, etag in etags.items():
+        response = client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+
+def test_current_etag_is_not_modified_and_stale_etag_is_sent(client):
+    for path in LISTS:
+        response = client.get(path)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert etag.startswith('W/"') and response.headers["cache-control"] == "private, no-cache"
+        # Weak comparison, several candidates and the wildcard
+        assert client.get(path, headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+        assert client.get(path, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+        assert client.get(path, headers={"If-None-Match": "*"}).status_code == 304
+        stale = client.get(path, headers={"If-None-Match": 'W/"1-999"'})
+        assert stale.status_code == 200 and stale.headers["etag"] == etag
+
+
+def test_transaction_writes_invalidate_the_etag(client, card):
+    url = "/api/v1/transactions/"
+    created = {}
+
+    def create():
+        response = client.post(url, json={**TRANSACTION, "card_id": card.id})
+        created.update(response.json())
+        return response
+
+    assert_invalidated(client, create)
+    assert_invalidated(client, lambda: client.put(f"{url}{created['id']}", json={**TRANSACTION, "amount": 13}))
+    assert_invalidated(client, lambda: client.delete(f"{url}{created['id']}"))
+
+    bulk = {}
+
+    def create_bulk():
+        response = client.post(f"{url}bulk", json=[{**TRANSACTION, "card_id": card.id}] * 2)
+        bulk["ids"] = [result["id"] for result in response.json()["results"]]
+        return response
+
+    assert_invalidated(client, create_bulk)
+    assert_invalidated(client, lambda: client.put(
+        f"{url}bulk", json=[{**TRANSACTION, "id": id, "amount": 14} for id in bulk["ids"]]
+    ))
+    assert_invalidated(client, lambda: client.post(f"{url}bulk/delete", json={"ids": bulk["ids"]}))
+
+
+def test_card_writes_invalidate_the_etag(client, card):
+    assert_invalidated(client, lambda: client.post("/api/v1/cards/", json={**CARD, "last_four": "2222"}))
+    assert_invalidated(client, lambda: client.put(f"/api/v1/cards/{card.id}", json={**CARD, "card_type": "amex"}))
+    assert_invalidated(client, lambda: client.delete(f"/api/v1/cards/{card.id}"))
+
+
+def test_recurring_transaction_writes_invalidate_the_etag(client):
+    url = "/api/v1/recurring-transactions/"
+    created = {}
+
+    def create():
+        response = client.post(url, json=SCHEDULE)
+        created.update(response.json())
+        return response
+
+    assert_invalidated(client, create)
+    assert_invalidated(client, lambda: client.put(f"{url}{created['id']}", json={"amount": 10.99}))
+    assert_invalidated(client, lambda: client.delete(f"{url}{created['id']}"))
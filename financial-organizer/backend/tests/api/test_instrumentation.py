@@ -0,0 +1,70 @@
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.middleware.instrumentation import Histogram, Instrumentation, metrics
+
+
+@pytest.fixture
+def client(engine):
+    """A client of an app instrumented on the test database, with no metrics yet."""
+    app = FastAPI()
+    app.add_middleware(Instrumentation, engine=engine)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        # Sync endpoints run in the threadpool
+        with engine.connect() as conn:
+            for _ in range(item_id):
+                conn.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    @app.get("/metrics")
+    async def read_metrics():
+        return metrics.render()
+
+    metrics.clear()
+    return TestClient(app)
+
+
+def series(body, name, route):
+    match = re.search(rf'^{name}{{method="GET",route="{re.escape(route)}"}} (\S+)$', body, re.M)
+    return float(match.group(1)) if match else None
+
+
+def test_server_timing_counts_the_statements_of_the_request(client, engine):
+    response = client.get("/items/3")
+    timing = response.headers["server-timing"]
+    assert 'db;desc="3 statements"' in timing
+    assert "db-slowest;dur=" in timing and "app;dur=" in timing
+
+    # Statements outside a request are not counted
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert 'db;desc="0 statements"' in client.get("/items/0").headers["server-timing"]
+
+
+def test_metrics_keep_histograms_per_route(client):
+    client.get("/items/2")
+    client.get("/items/5")
+    client.get("/nothing/here")
+    body = client.get("/metrics").json()
+
+    assert series(body, "http_request_duration_seconds_count", "/items/{item_id}") == 2
+    assert series(body, "http_request_db_statements_sum", "/items/{item_id}") == 7
+    assert 'http_request_db_statements_bucket{method="GET",route="/items/{item_id}",le="2"} 1' in body
+    assert 'http_request_db_statements_bucket{method="GET",route="/items/{item_id}",le="+Inf"} 2' in body
+    assert series(body, "http_request_duration_seconds_count", "unmatched") == 1
+    # Scrapes are not recorded
+    assert series(body, "http_request_duration_seconds_count", "/metrics") is None
+
+
+def test_histogram_buckets_include_their_upper_bound():
+    histogram = Histogram((1, 5))
+    for value in (0, 1, 2, 5, 6):
+        histogram.observe(value)
+    assert histogram.counts == [2, 2, 1]
+    assert histogram.sum == 14 and histogram.count == 5
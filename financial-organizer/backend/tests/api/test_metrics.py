@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+from app.main import app
+
+
+def get_metrics(host):
+    """GET /metrics from a client at `host`, which TestClient cannot set."""
+    async def get():
+        transport = httpx.ASGITransport(app=app, client=(host, 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await client.get("/metrics")
+    return asyncio.run(get())
+
+
+def test_metrics_are_only_served_to_allowed_hosts(client, monkeypatch):
+    client.get("/")
+    for host in ["127.0.0.1", "::1"]:
+        response = get_metrics(host)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "http_request_duration_seconds" in response.text
+
+    response = get_metrics("203.0.113.7")
+    assert response.status_code == 403
+    assert "http_request_duration_seconds" not in response.text
+    # Requests without a client address are refused too
+    assert client.get("/metrics").status_code == 403
+
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_HOSTS", ["10.0.0.5"])
+    assert get_metrics("10.0.0.5").status_code == 200
+    assert get_metrics("127.0.0.1").status_code == 403
@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.db.models import Receipt, ReceiptLineItem, Transaction
+
+ROWS = 30
+
+
+@contextmanager
+def assert_max_queries(engine, limit):
+    """
+    Fail when the block sends more than `limit` statements to the database.
+    Requests are checked with more rows than the limit, so a query per row
+    can't pass.
+    """
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    assert len(statements) <= limit, f"{len(statements)} queries:\n" + "\n".join(statements)
+
+
+@pytest.fixture
+def transactions(db, user, card):
+    """ROWS transactions of `card`, each with a receipt of three items."""
+    transactions = [
+        Transaction(
+            user_id=user.id, card_id=card.id, amount=12.5, description="Groceries", merchant_name="Market",
+            transaction_type="purchase", category="groceries", date=datetime(2024, 1, 1 + index % 28),
+        )
+        for index in range(ROWS)
+    ]
+    db.add_all(transactions)
+    db.flush()
+    receipts = [Receipt(transaction_id=transaction.id, file_path="r.png", ocr_data={}) for transaction in transactions]
+    db.add_all(receipts)
+    db.flush()
+    db.add_all([
+        ReceiptLineItem(
+            receipt_id=receipt.id, user_id=user.id, name=f"ITEM {index}", item_key=f"item {index}",
+            quantity=1, unit_price_cents=250, total_cents=250,
+        )
+        for receipt in receipts
+        for index in range(3)
+    ])
+    db.commit()
+    return transactions
+
+
+@pytest.fixture
+def client(client, auth_headers, transactions):
+    client.headers.update(auth_headers)
+    return client
+
+
+def test_transaction_embeds_card_and_receipt_in_fixed_queries(client, engine, card, transactions):
+    with assert_max_queries(engine, 3):
+        response = client.get(f"/api/v1/transactions/{transactions[0].id}?embed=card,receipt")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["card"] == {"id": card.id, "card_type": "visa", "last_four": card.last_four}
+    assert [item["name"] for item in data["receipt"]["line_items"]] == ["ITEM 0", "ITEM 1", "ITEM 2"]
+
+    with assert_max_queries(engine, 2):
+        response = client.get(f"/api/v1/transactions/{transactions[0].id}")
+    assert response.status_code == 200
+    assert response.json()["card"] is None and response.json()["receipt"] is None
+
+    assert client.get(f"/api/v1/transactions/{transactions[0].id}?embed=user").status_code == 400
+
+
+def test_list_endpoints_do_not_query_per_row(client, engine, transactions):
+    with assert_max_queries(engine, 2):
+        response = client.get("/api/v1/transactions/?limit=100")
+    assert len(response.json()) == ROWS
+
+    with assert_max_queries(engine, 2):
+        response = client.get("/api/v1/cards/")
+    assert len(response.json()) == 1
+
+    with assert_max_queries(engine, 4):
+        response = client.get(f"/api/v1/receipts/{transactions[0].id}")
+    assert len(response.json()["line_items"]) == 3
+
+
+def test_card_delete_does_not_load_its_transactions(client, engine, card):
+    with assert_max_queries(engine, 5) as statements:
+        response = client.delete(f"/api/v1/cards/{card.id}")
+    assert response.status_code == 200
+    assert not any("FROM transactions" in statement for statement in statements)
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).where(Transaction.card_id.isnot(None))) == 0
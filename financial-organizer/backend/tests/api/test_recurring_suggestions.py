@@ -0,0 +1,41 @@
+from datetime import date
+
+from app.db.models import RecurringSuggestion
+
+URL = "/api/v1/recurring-transactions/suggestions"
+
+
+def suggestion(user_id, merchant_key, next_date, **fields):
+    return RecurringSuggestion(
+        user_id=user_id, merchant_key=merchant_key, amount_band=29, merchant_name=merchant_key.title(),
+        amount=15.99, frequency="monthly", last_date=date(2024, 3, 5), next_date=next_date,
+        occurrences=3, confidence=1.0, is_dismissed=fields.pop("is_dismissed", False), **fields,
+    )
+
+
+def test_suggestion_endpoints(client, db, user, other_user, auth_headers):
+    db.add_all([
+        suggestion(user.id, "spotify", date(2024, 4, 20)),
+        suggestion(user.id, "netflix", date(2024, 4, 5)),
+        suggestion(user.id, "hulu", date(2024, 4, 1), is_dismissed=True),
+        suggestion(other_user.id, "netflix", date(2024, 4, 5)),
+    ])
+    db.commit()
+    spotify, netflix, _, theirs = db.query(RecurringSuggestion).order_by(RecurringSuggestion.id)
+
+    # The user's suggestions that are not dismissed, next charge first
+    response = client.get(URL, headers=auth_headers)
+    assert response.status_code == 200
+    assert [(s["id"], s["merchant_name"], s["next_date"]) for s in response.json()] == [
+        (netflix.id, "Netflix", "2024-04-05"), (spotify.id, "Spotify", "2024-04-20"),
+    ]
+
+    response = client.post(f"{URL}/{netflix.id}/dismiss", headers=auth_headers)
+    assert response.status_code == 200 and response.json()["id"] == netflix.id
+    assert [s["id"] for s in client.get(URL, headers=auth_headers).json()] == [spotify.id]
+
+    assert client.post(f"{URL}/{theirs.id}/dismiss", headers=auth_headers).status_code == 403
+    assert client.post(f"{URL}/999/dismiss", headers=auth_headers).status_code == 404
+    assert client.get(URL).status_code == 401
+    db.expire_all()
+    assert theirs.is_dismissed is False
@@ -0,0 +1,63 @@
+from app.api.endpoints import transactions
+from app.core.security import create_access_token
+
+URL = "/api/v1/transactions/bulk"
+TRANSACTION = {
+    "amount": 12.5, "description": "Lunch", "transaction_type": "purchase", "category": "dining",
+    "merchant_name": "Cafe", "date": "2024-03-01T12:00:00",
+}
+
+
+def summary(response):
+    body = response.json()
+    return body["succeeded"], body["failed"], [(r["index"], r["ok"], r["error"]) for r in body["results"]]
+
+
+def test_bulk_endpoints_report_partial_failures(client, card, other_card, auth_headers):
+    mine = auth_headers
+    theirs = {"Authorization": f"Bearer {create_access_token(other_card.user_id)}"}
+    response = client.post(URL, headers=mine, json=[
+        {**TRANSACTION, "card_id": card.id},
+        {**TRANSACTION, "card_id": other_card.id},
+        {**TRANSACTION, "card_id": card.id, "amount": 3},
+    ])
+    assert response.status_code == 200
+    assert summary(response) == (2, 1, [(0, True, None), (1, False, "Card not found"), (2, True, None)])
+    ids = [result["id"] for result in response.json()["results"] if result["ok"]]
+    [other_id] = [
+        result["id"] for result in
+        client.post(URL, headers=theirs, json=[{**TRANSACTION, "card_id": other_card.id}]).json()["results"]
+    ]
+
+    response = client.put(URL, headers=mine, json=[
+        {**TRANSACTION, "id": ids[0], "amount": 20},
+        {**TRANSACTION, "id": other_id, "amount": 20},
+        {**TRANSACTION, "id": 999},
+    ])
+    assert response.status_code == 200
+    assert summary(response) == (1, 2, [
+        (0, True, None), (1, False, "Not enough permissions"), (2, False, "Transaction not found"),
+    ])
+
+    response = client.post(f"{URL}/delete", headers=mine, json={"ids": [other_id, ids[1]]})
+    assert response.status_code == 200
+    assert summary(response) == (1, 1, [(0, False, "Not enough permissions"), (1, True, None)])
+
+    listed = client.get("/api/v1/transactions/", headers=mine).json()
+    assert [(t["id"], t["amount"]) for t in listed] == [(ids[0], 20)]
+    listed = client.get("/api/v1/transactions/", headers=theirs).json()
+    assert [(t["id"], t["amount"]) for t in listed] == [(other_id, 12.5)]
+
+
+def test_bulk_endpoints_reject_oversized_batches(client, card, auth_headers, monkeypatch):
+    monkeypatch.setattr(transactions, "MAX_BULK_ITEMS", 2)
+    response = client.post(URL, headers=auth_headers, json=[{**TRANSACTION, "card_id": card.id}] * 3)
+    assert response.status_code == 413
+    assert response.json()["detail"] == "At most 2 items per bulk request"
+    assert client.put(URL, headers=auth_headers, json=[{**TRANSACTION, "id": 1}] * 3).status_code == 413
+    assert client.post(f"{URL}/delete", headers=auth_headers, json={"ids": [1, 2, 3]}).status_code == 413
+    # Nothing was written
+    assert client.get("/api/v1/transactions/", headers=auth_headers).json() == []
+
+    response = client.post(URL, headers=auth_headers, json=[{**TRANSACTION, "card_id": card.id}] * 2)
+    assert response.status_code == 200 and response.json()["succeeded"] == 2
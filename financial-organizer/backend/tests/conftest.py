@@ -4,59 +4,111 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.app.main import app
-from app.app.db.base import Base
-from app.app.db.session import get_db
-from app.app.core.config import settings
-from app.app.services import auth_service
-from app.app.schemas.auth import UserCreate
+from app.api import deps
+from app.core import cache
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.models import Card, User
+from app.main import app
 
 # In-memory SQLite for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
-@pytest.fixture(scope="session")
-def test_db_engine():
-    """Create an in-memory SQLite database for testing."""
+def _create_engine():
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
     Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Every test starts without the in-process caches of earlier ones."""
+    cache.clear_all()
+
+@pytest.fixture(scope="session")
+def make_engine():
+    """
+    Creates in-memory SQLite databases with every table, for fixtures that
+    seed one database for all the tests of a module.
+    """
+    return _create_engine
+
+@pytest.fixture
+def engine(make_engine):
+    """A new in-memory SQLite database with every table, for one test."""
+    engine = make_engine()
     yield engine
-    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 @pytest.fixture
-def db_session(test_db_engine):
-    """Create a new database session for a test."""
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_db_engine)
-    session = SessionLocal()
+def session_factory(engine):
+    """Sessions configured like app.db.session.SessionLocal."""
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+@pytest.fixture
+def db(session_factory):
+    """A database session for a test."""
+    session = session_factory()
     try:
         yield session
     finally:
         session.close()
 
 @pytest.fixture
-def client(db_session):
-    """Create a test client with the test database session."""
+def user(db):
+    """A user without a usable password."""
+    user = User(email="user@example.com", hashed_password="x", full_name="User")
+    db.add(user)
+    db.commit()
+    return user
+
+@pytest.fixture
+def card(db, user):
+    """A card of `user`."""
+    card = Card(user_id=user.id, card_number="4111", card_type="visa", last_four="4242", expiry_date="12/30")
+    db.add(card)
+    db.commit()
+    return card
+
+@pytest.fixture
+def other_user(db):
+    """A second user, whose data `user` must not reach."""
+    user = User(email="other@example.com", hashed_password="x", full_name="Other")
+    db.add(user)
+    db.commit()
+    return user
+
+@pytest.fixture
+def other_card(db, other_user):
+    """A card of `other_user`."""
+    card = Card(user_id=other_user.id, card_number="4111", card_type="visa", last_four="1111", expiry_date="12/30")
+    db.add(card)
+    db.commit()
+    return card
+
+@pytest.fixture
+def auth_headers(user):
+    """Authorization headers of `user`."""
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+@pytest.fixture
+def client(session_factory):
+    """
+    A test client of the app, each request with its own session of the
+    test database. Startup events, like the recurring scheduler, don't run.
+    """
     def override_get_db():
+        db = session_factory()
         try:
-            yield db_session
+            yield db
         finally:
-            pass
-    
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        yield c
-    app.dependency_overrides.clear()
-
-@pytest.fixture
-def test_user(db_session):
-    """Create a test user in the database."""
-    user_in = UserCreate(
-        email="test@example.com",
-        password="testpassword",
-        full_name="Test User"
-    )
-    user = auth_service.create_user(db_session, obj_in=user_in)
-    return user 
\ No newline at end of file
+            db.close()
+
+    app.dependency_overrides[deps.get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
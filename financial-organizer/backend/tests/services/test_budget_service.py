@@ -0,0 +1,53 @@
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from app.db.models import BudgetEvent
+from app.schemas.budget import BudgetCreate
+from app.schemas.transaction import TransactionCreate
+from app.services import budget_service, transaction_service
+
+
+def spend(db, user, card, amount, category="groceries"):
+    return transaction_service.create(
+        db,
+        obj_in=TransactionCreate(
+            card_id=card.id, amount=amount, description="Food", merchant_name="Market",
+            transaction_type="purchase", category=category, date=datetime(2024, 5, 10),
+        ),
+        user_id=user.id,
+    )
+
+
+def events(db):
+    return [(e.threshold, e.spent) for e in db.scalars(select(BudgetEvent).order_by(BudgetEvent.id))]
+
+
+def test_threshold_events_are_recorded_once_per_month(db, user, card):
+    budget_service.create(db, obj_in=BudgetCreate(category="Groceries", amount=100.0), user_id=user.id)
+
+    spend(db, user, card, 50.0)
+    spend(db, user, card, 10.0, category="shopping")
+    assert events(db) == []
+
+    spend(db, user, card, 35.0)
+    assert events(db) == [(0.8, 85.0)]
+
+    spend(db, user, card, 5.0)
+    spend(db, user, card, 10.0)
+    spend(db, user, card, 1.0)
+    assert events(db) == [(0.8, 85.0), (1.0, 100.0)]
+
+
+def test_status_reads_cached_counters_until_the_next_write(db, user, card):
+    budget_service.create(db, obj_in=BudgetCreate(category="groceries", amount=200.0), user_id=user.id)
+    spend(db, user, card, 50.0)
+    db.refresh(user)
+
+    status = budget_service.get_status(db, user=user, month=date(2024, 5, 20))
+    assert [(item.category, item.spent, item.remaining) for item in status.budgets] == [("groceries", 50.0, 150.0)]
+
+    spend(db, user, card, 150.0)
+    db.refresh(user)
+    status = budget_service.get_status(db, user=user, month=date(2024, 5, 1))
+    assert status.budgets[0].over_budget
@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from app.db.models import SpendingRollup, Transaction
+from app.schemas.category_rule import CategoryRuleCreate, CategoryRuleUpdate
+from app.schemas.transaction import TransactionCreate, TransactionUpdate
+from app.services import categorization_service, transaction_service
+
+
+def _create(db, merchant_name, amount=10.0, card_id=1, category="other", user_id=1):
+    return transaction_service.create(db, obj_in=TransactionCreate(
+        card_id=card_id, amount=amount, description="Card purchase", transaction_type="purchase",
+        category=category, merchant_name=merchant_name, date=datetime(2024, 3, 1),
+    ), user_id=user_id)
+
+
+def _rule(db, user_id=1, **fields):
+    return categorization_service.create(db, obj_in=CategoryRuleCreate(**fields), user_id=user_id)
+
+
+def test_automaton_finds_overlapping_word_sequences():
+    tokenize = categorization_service.tokenize
+    terms = [tokenize(term) for term in ["amazon", "amazon prime", "prime video", "at&t", "video"]]
+    automaton = categorization_service._Automaton(terms)
+    assert automaton.find(tokenize("AMAZON PRIME VIDEO*2K4")) == {
+        ("amazon",), ("amazon", "prime"), ("prime", "video"), ("video",)
+    }
+    assert automaton.find(tokenize("AT&T Bill 0412")) == {("at", "t")}
+    # Whole words only
+    assert automaton.find(tokenize("amazonian videos")) == set()
+
+
+def test_rules_apply_at_write_time_in_order(db):
+    _rule(db, user_id=None, category="shopping", merchant_contains="amazon")
+    _rule(db, category="entertainment", merchant_contains="amazon prime")
+    _rule(db, category="groceries", merchant_pattern=r"^whole\s*foods")
+    _rule(db, category="utilities", min_amount=500, card_id=2, priority=10)
+
+    assert _create(db, "AMAZON PRIME VIDEO").category == "entertainment"
+    assert _create(db, "Amazon Mktp").category == "shopping"
+    assert _create(db, "WHOLEFOODS #10").category == "groceries"
+    assert _create(db, "Big Bill", amount=600, card_id=2).category == "utilities"
+    assert _create(db, "Big Bill", amount=600, card_id=1).category == "other"
+    # A category chosen by the user is kept
+    manual = _create(db, "Amazon", category="groceries")
+    assert manual.category == "groceries" and manual.category_rule_id is None
+    # Other users only get the global rules
+    assert _create(db, "Amazon Prime", user_id=2).category == "shopping"
+
+
+def test_rule_changes_reapply_to_affected_rows_only(db):
+    netflix = _create(db, "NETFLIX.COM")
+    amazon = _create(db, "AMZN Mktp")
+    manual = _create(db, "Netflix gift", category="shopping")
+
+    rule = _rule(db, category="entertainment", merchant_contains="netflix")
+    db.expire_all()
+    assert netflix.category == "entertainment" and netflix.category_rule_id == rule.id
+    assert manual.category == "shopping"
+    assert amazon.category == "other"
+
+    categorization_service.update(db, db_obj=rule, obj_in=CategoryRuleUpdate(merchant_contains="amzn"))
+    db.expire_all()
+    assert netflix.category == "other" and netflix.category_rule_id is None
+    assert amazon.category == "entertainment"
+
+    # Editing the category by hand takes the row away from the rules
+    transaction_service.update(db, db_obj=amazon, obj_in=TransactionUpdate(
+        amount=10.0, description="Card purchase", transaction_type="purchase", category="shopping",
+        merchant_name="AMZN Mktp", date=datetime(2024, 3, 1),
+    ))
+    assert amazon.category_rule_id is None
+    categorization_service.remove(db, id=rule.id)
+    db.expire_all()
+    assert amazon.category == "shopping"
+
+    rollups = {row.category: row.total for row in db.query(SpendingRollup).all()}
+    assert rollups == {"other": 10.0, "shopping": 20.0}
+
+
+def test_recategorize_job_matches_row_by_row(db):
+    for index in range(50):
+        _create(db, f"{['UBER TRIP', 'Shell Oil', 'Corner shop', 'Spotify'][index % 4]} {index}", amount=index)
+    categorization_service.install_default_rules(db)
+    _rule(db, category="groceries", merchant_contains="corner", max_amount=20)
+
+    result = categorization_service.recategorize(db, chunk_size=7)
+    assert result.scanned == 50
+    matcher = categorization_service.get_matcher(db, 1)
+    for row in db.query(Transaction).all():
+        rule = matcher.match(row.merchant_name, row.description, row.amount_cents, row.card_id)
+        assert row.category == (rule.category if rule else "other")
+        assert row.category_rule_id == (rule.id if rule else None)
+    assert categorization_service.recategorize(db).updated == 0
+
+
+def test_matchers_of_more_users_than_the_cache_holds(db, monkeypatch):
+    monkeypatch.setattr(categorization_service._matchers, "maxsize", 2)
+    categories = {1: "groceries", 2: "utilities", 3: "entertainment"}
+    for user_id, category in categories.items():
+        _rule(db, user_id=user_id, category=category, merchant_contains="shop")
+    _rule(db, user_id=None, category="shopping", merchant_contains="mall")
+
+    matchers = categorization_service.get_matchers(db, [1, 2, 3, 4])
+    assert {user_id: [rule.category for rule in matcher.rules] for user_id, matcher in matchers.items()} == {
+        **{user_id: [category, "shopping"] for user_id, category in categories.items()},
+        4: ["shopping"],
+    }
+    assert len(categorization_service._matchers) == 2
@@ -0,0 +1,105 @@
+from datetime import datetime
+
+from app.db.models import Transaction
+from app.schemas.category_rule import CategoryRuleCreate
+from app.schemas.transaction import TransactionCreate, TransactionUpdate
+from app.services import categorization_service, category_model_service, transaction_service
+
+HISTORY = {
+    "groceries": ["FRESHCO STORE", "FRESHCO MARKET", "NOFRILLS", "METRO GROCERS"],
+    "transportation": ["PRESTO TRANSIT", "GREEN CAB CO", "CITY PARKING LOT"],
+    "entertainment": ["CINEPLEX ODEON", "CINEPLEX VIP", "BOWLARAMA"],
+}
+
+
+def _create(db, merchant_name, category="other", user_id=1):
+    return transaction_service.create(db, obj_in=TransactionCreate(
+        card_id=1, amount=12.5, description="Card purchase", transaction_type="purchase",
+        category=category, merchant_name=merchant_name, date=datetime(2024, 3, 1),
+    ), user_id=user_id)
+
+
+def _seed_history(db, user_id=1):
+    for category, merchants in HISTORY.items():
+        for repeat in range(3):
+            for merchant in merchants:
+                _create(db, f"{merchant} #{100 + repeat}", category=category, user_id=user_id)
+
+
+def _new(merchant_name, user_id=1):
+    return Transaction(
+        user_id=user_id, card_id=1, amount=20.0, description="Card purchase", transaction_type="purchase",
+        category="other", merchant_name=merchant_name, date=datetime(2024, 4, 1),
+    )
+
+
+def test_model_learns_from_merchant_words_and_trigrams():
+    rows = [
+        (f"{merchant} #{index}", "Card purchase", category)
+        for category, merchants in HISTORY.items()
+        for merchant in merchants
+        for index in range(3)
+    ]
+    model = category_model_service.train(rows)
+    predictions = model.predict([("FRESHCO #9912", None), ("CINEPLEX", ""), ("GREENCAB", None)])
+    assert [category for category, _ in predictions] == ["groceries", "entertainment", "transportation"]
+    assert all(0 < probability <= 1 for _, probability in predictions)
+    # Too little or too uniform history gives no model
+    assert category_model_service.train(rows[:5]) is None
+    assert category_model_service.train([(m, d, "groceries") for m, d, _ in rows]) is None
+
+
+def test_predict_fills_only_unmatched_rows_and_is_not_learned_from(db):
+    _seed_history(db)
+    categorization_service.create(
+        db, obj_in=CategoryRuleCreate(category="shopping", merchant_contains="freshco online"), user_id=1
+    )
+    rows = [_new("FRESHCO #7"), _new("FRESHCO ONLINE"), _new("ZZZ UNKNOWN QQQ"), _new("CINEPLEX", user_id=2)]
+    categorization_service.categorize(db, rows[:3], user_id=1)
+    assert category_model_service.predict(db, rows[:3], user_id=1) == 1
+    assert [(row.category, bool(row.category_predicted)) for row in rows[:3]] == [
+        ("groceries", True), ("shopping", False), ("other", False)
+    ]
+    # The second user has no history to learn from
+    assert category_model_service.predict(db, rows[3:], user_id=2) == 0
+
+    db.add_all(rows)
+    db.commit()
+    version = category_model_service.get_training_version(db, user_id=1)
+    assert version[0] == sum(len(merchants) for merchants in HISTORY.values()) * 3 + 1
+
+    # Fixing a prediction by hand makes it training data
+    predicted = rows[0]
+    transaction_service.update(db, db_obj=predicted, obj_in=TransactionUpdate(
+        amount=20.0, description="Card purchase", transaction_type="purchase", category="shopping",
+        merchant_name="FRESHCO #7", date=datetime(2024, 4, 1),
+    ))
+    assert predicted.category_predicted is False
+    assert category_model_service.get_training_version(db, user_id=1)[0] == version[0] + 1
+
+
+def test_models_are_cached_until_history_changes(db):
+    _seed_history(db)
+    model = category_model_service.get_model(db, user_id=1)
+    assert model is not None
+    assert category_model_service.get_model(db, user_id=1) is model
+    _create(db, "BOWLARAMA #9", category="entertainment")
+    assert category_model_service.get_model(db, user_id=1) is not model
+
+
+def test_rules_replace_predictions_but_no_match_keeps_them(db):
+    _seed_history(db)
+    rows = [_new("FRESHCO #7"), _new("NOFRILLS #8")]
+    category_model_service.predict(db, rows, user_id=1)
+    db.add_all(rows)
+    db.commit()
+    assert [row.category for row in rows] == ["groceries", "groceries"]
+
+    categorization_service.create(
+        db, obj_in=CategoryRuleCreate(category="shopping", merchant_contains="nofrills"), user_id=1
+    )
+    db.expire_all()
+    assert (rows[0].category, rows[0].category_predicted) == ("groceries", True)
+    assert (rows[1].category, rows[1].category_predicted, rows[1].category_rule_id is not None) == (
+        "shopping", False, True
+    )
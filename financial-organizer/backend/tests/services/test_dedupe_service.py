@@ -0,0 +1,126 @@
+import random
+from datetime import date, datetime, timedelta
+from itertools import combinations
+
+from sqlalchemy import event, insert, select
+
+from app.db.models import RecurringTransaction, Transaction
+from app.schemas.transaction import TransactionCreate, TransactionUpdate
+from app.services import dedupe_service, recurring_transaction_service, transaction_service
+
+
+def _create(db, merchant_name, day, amount=12.5, card_id=1, transaction_type="purchase"):
+    return transaction_service.create(db, obj_in=TransactionCreate(
+        card_id=card_id, amount=amount, description="Card purchase", transaction_type=transaction_type,
+        category="other", merchant_name=merchant_name, date=datetime(2024, 3, day),
+    ), user_id=1)
+
+
+def test_writes_are_flagged_against_earlier_copies(db):
+    original = _create(db, "AMZN Mktp US*2K4X", 1)
+    assert original.duplicate_of_id is None
+    # Same purchase from another source, two days later
+    assert _create(db, "AMAZON.COM", 3).duplicate_of_id == original.id
+    # Too far apart, another card, another amount or a refund are not copies
+    assert _create(db, "AMAZON.COM", 9).duplicate_of_id is None
+    assert _create(db, "AMAZON.COM", 2, card_id=2).duplicate_of_id is None
+    assert _create(db, "AMAZON.COM", 2, amount=12.51).duplicate_of_id is None
+    assert _create(db, "AMAZON.COM", 2, transaction_type="refund").duplicate_of_id is None
+
+
+def test_editing_the_original_after_its_copy_was_flagged(db):
+    original = _create(db, "AMAZON.COM", 1)
+    copy = _create(db, "AMAZON.COM", 2)
+    assert copy.duplicate_of_id == original.id
+
+    transaction_service.update(db, db_obj=original, obj_in=TransactionUpdate(
+        amount=12.5, description="Card purchase, edited", transaction_type="purchase", category="other",
+        merchant_name="AMAZON.COM", date=datetime(2024, 3, 1),
+    ))
+    assert original.duplicate_of_id is None
+    assert dedupe_service.find_clusters(db, user_id=1) == [[original.id, copy.id]]
+
+
+def test_recurring_charges_match_any_card(db):
+    synced = _create(db, "NETFLIX.COM", 14, amount=15.49)
+    db.add(RecurringTransaction(
+        user_id=1, amount=15.49, description="Netflix", transaction_type="purchase", category="entertainment",
+        frequency="monthly", start_date=date(2024, 2, 15), next_date=date(2024, 3, 15), is_active=True,
+    ))
+    db.commit()
+    recurring_transaction_service.process_due_recurring_transactions(db, today=date(2024, 3, 15))
+    generated = db.scalar(select(Transaction).where(Transaction.description == "Netflix (Recurring)"))
+    assert generated.card_id is None and generated.duplicate_of_id == synced.id
+
+
+def _pairwise_clusters(rows):
+    # Reference: components of the "is a copy of" relation over every pair
+    parent = {row["id"]: row["id"] for row in rows}
+
+    def find(id):
+        while parent[id] != id:
+            id = parent[id]
+        return id
+
+    for first, second in combinations(rows, 2):
+        if (
+            first["key"] == second["key"]
+            and abs((first["date"] - second["date"]).days) <= dedupe_service.DUPLICATE_WINDOW_DAYS
+            and first["card_id"] == second["card_id"]
+        ):
+            parent[find(first["id"])] = find(second["id"])
+    groups = {}
+    for row in rows:
+        groups.setdefault(find(row["id"]), []).append(row["id"])
+    return sorted(sorted(ids) for ids in groups.values() if len(ids) > 1)
+
+
+def test_scan_matches_pairwise_comparison(db):
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    rows = [{
+        "user_id": 1,
+        "card_id": rng.choice([1, 2]),
+        "amount_cents": rng.choice([999, 1250, 4000]),
+        "description": "Card purchase",
+        "merchant_name": rng.choice(["AMAZON.COM", "AMZN Mktp US*1", "Netflix", "Costco #12"]),
+        "transaction_type": "purchase",
+        "category": "other",
+        "date": start + timedelta(days=rng.randint(0, 60)),
+    } for _ in range(300)]
+    db.execute(insert(Transaction), rows)
+    db.commit()
+    assert dedupe_service.backfill(db) == 300
+
+    clusters = dedupe_service.find_clusters(db, user_id=1)
+    stored = [
+        {"id": row.id, "key": row.dedupe_key, "date": row.date.date(), "card_id": row.card_id}
+        for row in db.execute(select(Transaction.id, Transaction.dedupe_key, Transaction.date, Transaction.card_id))
+    ]
+    assert sorted(sorted(ids) for ids in clusters) == _pairwise_clusters(stored)
+    assert dedupe_service.find_clusters(db, user_id=2) == []
+
+
+def test_scan_leaves_rows_without_a_key_alone(db):
+    row = {
+        "user_id": 1, "card_id": 1, "amount_cents": 999, "description": "Card purchase", "merchant_name": "Netflix",
+        "transaction_type": "purchase", "category": "other", "date": datetime(2024, 1, 5),
+    }
+    db.execute(insert(Transaction), [row, {**row, "date": datetime(2024, 1, 6)}])
+    db.commit()
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", on_execute)
+    try:
+        assert dedupe_service.find_clusters(db, user_id=1) == []
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", on_execute)
+    assert all(statement.startswith("SELECT") for statement in statements), statements
+    assert db.scalars(select(Transaction.dedupe_key)).all() == [None, None]
+
+    # Found once the backfill command keyed them
+    dedupe_service.backfill(db, user_id=1)
+    assert dedupe_service.find_clusters(db, user_id=1) == [[1, 2]]
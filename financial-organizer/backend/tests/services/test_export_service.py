@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app.db.models import Transaction
+from app.services import export_service as service
+
+
+@pytest.fixture(autouse=True)
+def transactions(db):
+    db.add_all([
+        Transaction(
+            user_id=1 if i < 7 else 2, card_id=1, amount=i + 0.5, description=f"Row {i}",
+            merchant_name="Shop", date=datetime(2024, 1, i + 1),
+            transaction_type="purchase", category="other",
+        )
+        for i in range(9)
+    ])
+    db.commit()
+
+
+def export(fmt, session_factory, **kwargs):
+    return b"".join(service.stream_export(fmt, user_id=1, session_factory=session_factory, **kwargs))
+
+
+def test_csv_export_streams_every_batch(session_factory):
+    chunks = list(service.encode_csv(service.iter_partitions(
+        session_factory(), user_id=1, batch_size=2
+    )))
+    assert len(chunks) == 4
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == service.EXPORT_FIELDS
+    assert [row[6] for row in rows[1:]] == [f"Row {i}" for i in range(7)]
+
+
+def test_csv_export_without_rows_has_header(session_factory):
+    body = export("csv", session_factory, start_date=datetime(2030, 1, 1))
+    assert body.decode().strip() == ",".join(service.EXPORT_FIELDS)
+
+
+def test_ndjson_export_filters_dates(session_factory):
+    body = export("ndjson", session_factory, start_date=datetime(2024, 1, 3), end_date=datetime(2024, 1, 4))
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    assert [row["description"] for row in rows] == ["Row 2", "Row 3"]
+    assert rows[0]["date"] == "2024-01-03 00:00:00"
+
+
+def test_parquet_export_round_trips(session_factory):
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(export("parquet", session_factory)))
+    assert table.num_rows == 7
+    assert table.column("amount").to_pylist()[0] == 0.5
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.db.models import ExchangeRate, RecurringTransaction
+from app.schemas.recurring_transaction import RecurringTransactionUpdate
+from app.services import forecast_service, recurring_transaction_service
+
+START = date(2024, 3, 1)
+UNTIL = date(2024, 3, 31)
+
+
+def schedule(user_id, amount, frequency, start_date, next_date, **fields):
+    return RecurringTransaction(
+        user_id=user_id, amount=amount, description="Item", category="other",
+        transaction_type=fields.pop("transaction_type", "purchase"), frequency=frequency,
+        start_date=start_date, next_date=next_date, is_active=fields.pop("is_active", True), **fields,
+    )
+
+
+def balances(forecast):
+    return {day.date: day.balance for day in forecast.days}
+
+
+def get_forecast(db, user_id):
+    return forecast_service.get_forecast(
+        db, user_id=user_id, start=START, until=UNTIL, opening_balance=Decimal(100)
+    )
+
+
+def test_forecast_matches_a_hand_computed_projection(db, user, other_user):
+    db.add_all([
+        # 9.99 out on the 15th; January and February are already booked
+        schedule(user.id, 9.99, "monthly", date(2024, 1, 15), date(2024, 3, 15)),
+        # 50 in every Monday from the 4th
+        schedule(user.id, 50, "weekly", date(2024, 3, 4), date(2024, 3, 4), transaction_type="deposit"),
+        # 1 out on the 29th and 30th, then the schedule ends
+        schedule(user.id, 1, "daily", date(2024, 2, 1), date(2024, 3, 29), end_date=date(2024, 3, 30)),
+        # Left out: inactive, another user's, and in a currency without a rate
+        schedule(user.id, 500, "daily", START, START, is_active=False),
+        schedule(other_user.id, 500, "daily", START, START),
+        schedule(user.id, 10, "monthly", date(2024, 3, 20), date(2024, 3, 20), currency="EUR"),
+    ])
+    db.commit()
+
+    forecast = get_forecast(db, user.id)
+
+    expected = {}
+    balance = Decimal(100)
+    day = START
+    while day <= UNTIL:
+        if day.day == 15:
+            balance -= Decimal("9.99")
+        if day >= date(2024, 3, 4) and day.weekday() == 0:
+            balance += 50
+        if day.day in (29, 30):
+            balance -= 1
+        expected[day] = balance
+        day += timedelta(days=1)
+
+    assert balances(forecast) == expected
+    assert forecast.opening_balance == 100
+    assert forecast.closing_balance == Decimal("100") - Decimal("9.99") + 4 * 50 - 2
+    assert [day.net_change for day in forecast.days if day.date.weekday() == 0] == [50] * 4
+
+
+def test_forecast_is_cached_until_a_schedule_changes(db, user):
+    db.add(schedule(user.id, 10, "monthly", date(2024, 2, 10), date(2024, 3, 10)))
+    db.commit()
+    recurring = db.query(RecurringTransaction).one()
+
+    forecast = get_forecast(db, user.id)
+    assert get_forecast(db, user.id) is forecast
+    assert forecast.closing_balance == 90
+
+    recurring_transaction_service.update(db, db_obj=recurring, obj_in=RecurringTransactionUpdate(amount=25))
+    forecast = get_forecast(db, user.id)
+    assert forecast.closing_balance == 75
+    assert get_forecast(db, user.id) is forecast
+
+    recurring_transaction_service.remove(db, id=recurring.id)
+    assert get_forecast(db, user.id).closing_balance == 100
+
+
+def test_processing_a_schedule_invalidates_the_forecast(db, user):
+    db.add(schedule(user.id, 10, "weekly", START, START))
+    db.commit()
+
+    # The 1st, 8th, 15th, 22nd and 29th
+    assert get_forecast(db, user.id).closing_balance == 50
+
+    # The 1st is booked and leaves the projection
+    assert recurring_transaction_service.process_due_recurring_transactions(db, today=START) == 1
+    assert get_forecast(db, user.id).closing_balance == 60
+
+
+def test_new_exchange_rates_invalidate_the_forecast(db, user):
+    db.add(schedule(user.id, 10, "monthly", date(2024, 2, 20), date(2024, 3, 20), currency="EUR"))
+    db.commit()
+
+    assert get_forecast(db, user.id).closing_balance == 100
+
+    db.add(ExchangeRate(currency="EUR", date=date(2024, 2, 1), rate=1.1))
+    db.commit()
+    assert get_forecast(db, user.id).closing_balance == 89
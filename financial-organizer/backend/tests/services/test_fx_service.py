@@ -0,0 +1,105 @@
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, select
+
+from app.db.models import ExchangeRate, SpendingRollup
+from app.schemas.transaction import TransactionCreate, TransactionUpdate
+from app.services import fx_service, merchant_service, rollup_service, transaction_service
+
+
+def fields(amount, day, currency="USD"):
+    return dict(
+        amount=amount, currency=currency, description="Item", merchant_name="Shop",
+        transaction_type="purchase", category="groceries", date=datetime(2024, 1, day),
+    )
+
+
+def transaction_in(card, amount, day, currency="USD"):
+    return TransactionCreate(card_id=card.id, **fields(amount, day, currency))
+
+
+def snapshot(db):
+    return sorted((r.month, r.category, r.total, r.count, r.min_amount, r.max_amount) for r in db.scalars(select(SpendingRollup)))
+
+
+def test_parse_rates_skips_the_reporting_currency_and_reports_bad_lines():
+    rates = list(fx_service.parse_rates(io.StringIO("Date,Currency,Rate\n2024-01-01,eur,1.1\n2024-01-01,USD,1\n")))
+    assert rates == [("EUR", date(2024, 1, 1), 1.1)]
+
+    with pytest.raises(ValueError, match="Line 3"):
+        list(fx_service.parse_rates(io.StringIO("date,currency,rate\n2024-01-01,EUR,1.1\n2024-01-02,EUR,x\n")))
+
+
+def test_rates_cover_the_days_until_the_next_rate(db):
+    fx_service.load_rates(db, [("EUR", date(2024, 1, 10), 1.2), ("EUR", date(2024, 1, 1), 1.1)])
+    assert [(r.date, r.valid_until) for r in db.scalars(select(ExchangeRate).order_by(ExchangeRate.date))] == [
+        (date(2024, 1, 1), date(2024, 1, 10)),
+        (date(2024, 1, 10), None),
+    ]
+
+    keys = [("EUR", date(2023, 12, 31)), ("EUR", date(2024, 1, 9)), ("EUR", date(2024, 1, 10)), ("GBP", date(2024, 1, 9))]
+    assert fx_service.get_rates(db, keys) == dict(zip(keys, [None, 1.1, 1.2, None]))
+
+    # A rate loaded in between splits the range, and cached rates are not served
+    fx_service.load_rates(db, [("EUR", date(2024, 1, 5), 1.15)])
+    assert fx_service.get_rates(db, keys[1:2]) == {keys[1]: 1.15}
+    assert db.scalar(select(ExchangeRate.valid_until).where(ExchangeRate.date == date(2024, 1, 1))) == date(2024, 1, 5)
+
+
+def test_rates_are_read_in_one_query_and_then_cached(db):
+    fx_service.load_rates(db, [
+        ("EUR", date(2024, 1, 1), 1.1), ("EUR", date(2024, 1, 5), 1.15), ("GBP", date(2024, 1, 3), 1.3),
+        ("EUR", date(2023, 1, 1), 1.0), ("EUR", date(2024, 6, 1), 1.2),
+    ])
+    keys = [(currency, date(2024, 1, day)) for currency in ("EUR", "GBP", "JPY") for day in range(1, 11)]
+    expected = {
+        key: {"EUR": 1.1 if key[1].day < 5 else 1.15, "GBP": 1.3 if key[1].day >= 3 else None}.get(key[0])
+        for key in keys
+    }
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", on_execute)
+    try:
+        # The version of the rates, then every rate in one query
+        assert fx_service.get_rates(db, keys) == expected
+        assert len(statements) == 2, statements
+        # Only the version
+        assert fx_service.get_rates(db, keys) == expected
+        assert len(statements) == 3, statements
+        # A cached key and a new one
+        july = ("EUR", date(2024, 7, 1))
+        assert fx_service.get_rates(db, [keys[0], july]) == {keys[0]: 1.1, july: 1.2}
+        assert len(statements) == 5, statements
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", on_execute)
+
+
+def test_rollups_convert_foreign_amounts_and_match_a_rebuild(db, user, card):
+    fx_service.load_rates(db, [("EUR", date(2024, 1, 1), 1.1), ("EUR", date(2024, 1, 15), 1.2)])
+
+    transaction_service.create(db, obj_in=transaction_in(card, 10.0, 5), user_id=user.id)
+    transaction_service.create_multi(
+        db, objs_in=[transaction_in(card, 10.0, 6, "EUR"), transaction_in(card, 0.05, 20, "EUR")], user_id=user.id
+    )
+    # No rate for JPY: left out of the totals rather than counted as dollars
+    late = transaction_service.create(db, obj_in=transaction_in(card, 500.0, 7, "JPY"), user_id=user.id)
+
+    incremental = snapshot(db)
+    assert incremental == [(date(2024, 1, 1), "groceries", Decimal("21.06"), 3, Decimal("0.06"), Decimal("11.00"))]
+    rollup_service.rebuild(db)
+    assert snapshot(db) == incremental
+
+    transaction_service.update(db, db_obj=late, obj_in=TransactionUpdate(**fields(5.0, 16, "EUR")))
+    incremental = snapshot(db)
+    rollup_service.rebuild(db)
+    assert snapshot(db) == incremental
+    assert incremental[0][2:4] == (Decimal("27.06"), 4)
+
+    spending = merchant_service.get_spending(db, user_id=user.id)
+    assert [item.total for item in spending] == [Decimal("27.06")]
@@ -0,0 +1,84 @@
+import io
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.db.models import Transaction
+from app.services import import_service as service
+
+CSV_STATEMENT = """Date,Description,Debit,Credit
+2024-01-05,STARBUCKS #123,4.50,
+2024-01-05,STARBUCKS #123,4.50,
+01/06/2024,Payroll,,"1,250.00"
+not a date,Broken,1.00,
+"""
+
+OFX_STATEMENT = (
+    "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+    "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000[-5:EST]<TRNAMT>-12.34"
+    "<FITID>A1<NAME>NETFLIX.COM</STMTTRN>"
+    "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240107<TRNAMT>100.00"
+    "<FITID>A2<NAME>REFUND<MEMO>Store refund</STMTTRN>"
+    "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+)
+
+QIF_STATEMENT = """!Type:Bank
+D1/ 5'24
+T-25.00
+PShell
+^
+D01/09/2024
+T(3.00)
+PFee
+MMonthly fee
+^
+"""
+
+
+def test_parse_amount_formats():
+    assert service.parse_amount("$1,234.56") == Decimal("1234.56")
+    assert service.parse_amount("(12.00)") == Decimal("-12.00")
+    assert service.parse_amount("12.00-") == Decimal("-12.00")
+
+
+def test_parse_date_formats():
+    assert service.parse_date("20240105120000[-5:EST]").day == 5
+    assert service.parse_date("1/ 5'24").year == 2024
+    assert service.parse_date("Jan 05, 2024").month == 1
+
+
+def test_ofx_parser_reads_single_line_files_in_small_reads(monkeypatch):
+    monkeypatch.setattr(service, "OFX_READ_SIZE", 7)
+    records = list(service.parse_ofx(io.StringIO(OFX_STATEMENT)))
+    assert [r["external_id"] for r in records] == ["A1", "A2"]
+    assert records[0]["amount"] == "-12.34"
+    assert records[1]["description"] == "Store refund"
+
+
+def test_qif_parser():
+    records = list(service.parse_qif(io.StringIO(QIF_STATEMENT)))
+    assert [r["merchant_name"] for r in records] == ["Shell", "Fee"]
+    assert records[1]["amount"] == "(3.00)"
+
+
+def test_csv_import_keeps_same_day_repeats_and_skips_reimports(db, user, card):
+    summary = service.import_statement(
+        db, io.StringIO(CSV_STATEMENT), fmt="csv", user_id=user.id, card_id=card.id, chunk_size=2
+    )
+    assert (summary.rows_read, summary.imported, summary.failed) == (4, 3, 1)
+    assert summary.errors[0].startswith("Line 5")
+
+    payroll = db.scalars(select(Transaction).where(Transaction.amount_cents == 125000)).one()
+    assert payroll.transaction_type == "payment"
+
+    again = service.import_statement(
+        db, io.StringIO(CSV_STATEMENT), fmt="csv", user_id=user.id, card_id=card.id
+    )
+    assert (again.imported, again.duplicates) == (0, 3)
+    assert db.scalar(select(func.count(Transaction.id))) == 3
+
+
+def test_ofx_import_dedupes_on_bank_id(db, user, card):
+    service.import_statement(db, io.StringIO(OFX_STATEMENT), fmt="ofx", user_id=user.id, card_id=card.id)
+    summary = service.import_statement(db, io.StringIO(OFX_STATEMENT), fmt="ofx", user_id=user.id, card_id=card.id)
+    assert (summary.imported, summary.duplicates) == (0, 2)
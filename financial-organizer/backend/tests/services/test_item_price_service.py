@@ -0,0 +1,97 @@
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.db.models import ItemPriceRollup
+from app.schemas.receipt import ReceiptCreate
+from app.schemas.transaction import TransactionBulkUpdate, TransactionCreate
+from app.services import item_price_service, receipt_service, transaction_service
+from app.services.ocr_service import OCRService
+
+
+def shop(db, user, card, store, day, items, month=1):
+    transaction = transaction_service.create(
+        db,
+        obj_in=TransactionCreate(
+            card_id=card.id, amount=sum(item["total"] for item in items), description="Groceries",
+            merchant_name=store, transaction_type="purchase", category="groceries", date=datetime(2024, month, day),
+        ),
+        user_id=user.id,
+    )
+    receipt_service.create(
+        db,
+        obj_in=ReceiptCreate(transaction_id=transaction.id, file_path="r.png", ocr_data={}, line_items=items),
+        user_id=user.id,
+    )
+    return transaction
+
+
+def snapshot(db):
+    return sorted(
+        (r.item_key, r.day, r.merchant_id, r.quantity, r.total_cents, r.count, r.min_unit_cents, r.max_unit_cents)
+        for r in db.scalars(select(ItemPriceRollup))
+    )
+
+
+def test_grocery_receipts_carry_item_codes(monkeypatch):
+    async def process_receipt(file_path):
+        return OCRService._parse_receipt_text("MARKET\nBANANAS 000000004011KF 1.18\n00000004225 AVOCADO 1.50\nBREAD 2.99\n")
+
+    monkeypatch.setattr(OCRService, "process_receipt", process_receipt)
+    items = asyncio.run(OCRService.process_grocery_receipt("r.png"))["items"]
+    assert [(item["sku"], item["name"]) for item in items] == [
+        ("4011", "BANANAS"), ("4225", "AVOCADO"), (None, "BREAD"),
+    ]
+
+
+def test_price_history_across_stores(db, user, card):
+    shop(db, user, card, "Metro", 5, [
+        {"sku": "4011", "name": "BANANAS", "quantity": 2, "unit_price": 0.50, "total": 1.00},
+        {"name": "Whole Milk", "total": 3.00},
+    ])
+    shop(db, user, card, "Metro", 5, [{"sku": "4011", "name": "BANANAS", "quantity": 1, "total": 0.60}])
+    shop(db, user, card, "Corner Market", 9, [{"name": "WHOLE MILK,", "total": 3.20}])
+    shop(db, user, card, "Metro", 2, [{"sku": "4011", "name": "Bananas", "quantity": 4, "total": 2.40}], month=3)
+
+    history = item_price_service.get_history(db, user_id=user.id, sku="4011")
+    assert [(p.date, p.merchant, p.unit_price, p.min_unit_price, p.max_unit_price, p.count) for p in history.points] == [
+        (date(2024, 1, 5), "Metro", Decimal("0.53"), Decimal("0.50"), Decimal("0.60"), 2),
+        (date(2024, 3, 2), "Metro", Decimal("0.60"), Decimal("0.60"), Decimal("0.60"), 1),
+    ]
+    # 1.60 for 3 in January, 2.40 for 4 in March
+    assert history.price_change == 0.125
+
+    milk = item_price_service.get_history(db, user_id=user.id, name="whole milk")
+    assert [(p.merchant, p.unit_price) for p in milk.points] == [("Metro", Decimal("3.00")), ("Corner Market", Decimal("3.20"))]
+    assert milk.price_change is None
+
+    assert item_price_service.get_history(db, user_id=user.id, sku="4011", start=date(2024, 2, 1)).points[0].date == date(2024, 3, 2)
+    assert item_price_service.get_history(db, user_id=user.id + 1, sku="4011").points == []
+    # Codes are looked up like the OCR stores them, without the zero padding
+    padded = item_price_service.get_history(db, user_id=user.id, sku="0000000004011")
+    assert padded.points == history.points
+
+
+def test_rollups_follow_transaction_changes_and_match_a_rebuild(db, user, card):
+    first = shop(db, user, card, "Metro", 5, [{"sku": "4011", "name": "BANANAS", "quantity": 2, "total": 1.00}])
+    second = shop(db, user, card, "Metro", 6, [{"sku": "4011", "name": "BANANAS", "quantity": 1, "total": 0.60}])
+    third = shop(db, user, card, "Metro", 7, [{"name": "Bread", "total": 2.99}])
+
+    # Moving a purchase to another day and store, then deleting one
+    transaction_service.update_multi(
+        db,
+        objs_in=[TransactionBulkUpdate(
+            id=second.id, amount=0.60, description="Groceries", merchant_name="Corner Market",
+            transaction_type="purchase", category="groceries", date=datetime(2024, 1, 5),
+        )],
+        user_id=user.id,
+    )
+    transaction_service.remove(db, id=first.id)
+    transaction_service.remove_multi(db, ids=[third.id], user_id=user.id)
+
+    incremental = snapshot(db)
+    assert [(row[0], row[1], row[4]) for row in incremental] == [("4011", date(2024, 1, 5), 60)]
+    item_price_service.rebuild(db)
+    assert snapshot(db) == incremental
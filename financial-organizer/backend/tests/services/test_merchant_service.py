@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.db.models import Merchant, Transaction
+from app.schemas.transaction import TransactionBulkUpdate, TransactionCreate
+from app.services import merchant_service, transaction_service
+
+
+def _create(db, merchant_name, amount=10.0, description="Card purchase", transaction_type="purchase"):
+    return transaction_service.create(db, obj_in=TransactionCreate(
+        card_id=1, amount=amount, description=description, transaction_type=transaction_type,
+        category="other", merchant_name=merchant_name, date=datetime(2024, 3, 1),
+    ), user_id=1)
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("AMZN Mktp US*2K4X81", "amazon"),
+    ("AMAZON.COM", "amazon"),
+    ("Amazon Prime*AB12C", "amazon prime"),
+    ("WM SUPERCENTER #1234", "walmart"),
+    ("SQ *BLUE BOTTLE COFFEE", "blue bottle coffee"),
+    ("PAYPAL *NETFLIX.COM", "netflix"),
+    ("TRADER JOE'S #552", "trader joes"),
+    ("AT&T*BILL PAYMENT", "att"),
+    ("UBER   EATS", "uber eats"),
+    ("12345 ***", None),
+    ("", None),
+])
+def test_canonical_name_collapses_variants(raw, expected):
+    assert merchant_service.canonical_name(raw) == expected
+
+
+def test_transactions_are_interned_on_write(db):
+    first = _create(db, "AMZN Mktp US*2K4X81")
+    second = _create(db, "AMAZON.COM")
+    no_merchant = _create(db, "", description="SQ *BLUE BOTTLE")
+    assert first.merchant_id == second.merchant_id
+    assert db.get(Merchant, first.merchant_id).display_name == "Amazon"
+    assert db.get(Merchant, no_merchant.merchant_id).name == "blue bottle"
+
+    transaction_service.update_multi(db, objs_in=[TransactionBulkUpdate(
+        id=second.id, amount=10.0, description="Card purchase", transaction_type="purchase",
+        category="other", merchant_name="Netflix.com", date=datetime(2024, 3, 1),
+    )], user_id=1)
+    db.expire_all()
+    assert db.get(Merchant, db.get(Transaction, second.id).merchant_id).name == "netflix"
+    assert db.scalar(select(Merchant.id).where(Merchant.name == "amazon")) == first.merchant_id
+
+
+def test_backfill_links_existing_rows_in_chunks(db):
+    now = datetime(2024, 3, 1)
+    names = ["AMZN Mktp US*1", "AMAZON.COM", "WAL-MART #12", "COSTCO WHSE #0001", "", "SHELL OIL 5744"]
+    db.execute(insert(Transaction), [{
+        "user_id": 1, "card_id": 1, "amount_cents": 500, "description": "" if name == "" else "Card purchase",
+        "merchant_name": name, "transaction_type": "purchase", "category": "other", "date": now,
+    } for name in names])
+    db.commit()
+
+    assert merchant_service.backfill(db, chunk_size=2) == 5
+    assert merchant_service.backfill(db, chunk_size=2) == 0
+    linked = dict(db.execute(
+        select(Transaction.merchant_name, Merchant.name).join(Merchant, Transaction.merchant_id == Merchant.id)
+    ).all())
+    assert linked == {
+        "AMZN Mktp US*1": "amazon",
+        "AMAZON.COM": "amazon",
+        "WAL-MART #12": "walmart",
+        "COSTCO WHSE #0001": "costco",
+        "SHELL OIL 5744": "shell",
+    }
+
+
+def test_spending_groups_by_merchant(db):
+    _create(db, "AMZN Mktp US*1", amount=30.0)
+    _create(db, "AMAZON.COM", amount=20.0)
+    _create(db, "AMAZON.COM", amount=5.0, transaction_type="refund")
+    _create(db, "AMAZON.COM", amount=100.0, transaction_type="payment")
+    _create(db, "Netflix", amount=15.0)
+
+    spending = merchant_service.get_spending(db, user_id=1)
+    assert [(row.display_name, row.total, row.count) for row in spending] == [
+        ("Amazon", 45.0, 3), ("Netflix", 15.0, 1)
+    ]
+    assert merchant_service.get_spending(db, user_id=2) == []
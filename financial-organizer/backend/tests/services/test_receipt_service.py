@@ -0,0 +1,110 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event, select
+
+from app.db.models import ReceiptLineItem, Transaction
+from app.schemas.receipt import Receipt as ReceiptSchema, ReceiptCreate
+from app.services import fx_service, receipt_service
+from app.services.ocr_service import OCRService
+
+
+def add_receipt(db, user, day, items, currency="USD"):
+    transaction = Transaction(
+        user_id=user.id, card_id=1, amount=sum(item["total"] for item in items), currency=currency,
+        description="Groceries", transaction_type="purchase", category="groceries", date=datetime(2024, 1, day),
+    )
+    db.add(transaction)
+    db.commit()
+    return receipt_service.create(
+        db,
+        obj_in=ReceiptCreate(transaction_id=transaction.id, file_path="r.png", ocr_data={}, line_items=items),
+        user_id=user.id,
+    )
+
+
+def test_ocr_lines_become_line_items():
+    parsed = OCRService._parse_receipt_text(
+        "CORNER MARKET\n4011 BANANAS 2 @ 0.59 1.18 F\n2% MILK $3.49\nSUBTOTAL 4.67\nTAX 0.00\nTOTAL $4.67\n"
+    )
+    assert parsed["merchant_name"] == "CORNER MARKET"
+    assert parsed["total"] == 4.67
+    assert parsed["items"] == [
+        {"sku": "4011", "name": "BANANAS", "quantity": 2.0, "unit_price": 0.59, "total": 1.18},
+        {"sku": None, "name": "2% MILK", "quantity": 1.0, "unit_price": 3.49, "total": 3.49},
+    ]
+
+
+def test_create_stores_line_items_in_cents(db, user):
+    receipt = add_receipt(db, user, 5, [
+        {"sku": "4011", "name": "BANANAS", "quantity": 2, "unit_price": 0.59, "total": 1.18},
+        {"name": "2% MILK", "total": 3.49},
+    ])
+
+    rows = db.execute(
+        select(ReceiptLineItem.user_id, ReceiptLineItem.sku, ReceiptLineItem.unit_price_cents, ReceiptLineItem.total_cents)
+        .order_by(ReceiptLineItem.id)
+    ).all()
+    assert rows == [(user.id, "4011", 59, 118), (user.id, None, None, 349)]
+
+    response = ReceiptSchema.model_validate(receipt_service.get(db, receipt.id))
+    assert [(item.name, item.total) for item in response.line_items] == [
+        ("BANANAS", Decimal("1.18")), ("2% MILK", Decimal("3.49")),
+    ]
+
+
+def test_create_returns_the_inserted_items_without_reloading(db, user):
+    items = [{"sku": f"{i:04d}", "name": f"ITEM {i}", "total": i + 1} for i in range(30)]
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", on_execute)
+    try:
+        receipt = add_receipt(db, user, 5, items)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", on_execute)
+
+    # The transaction, the receipt, its items in one batch, and the price refresh
+    inserts = [statement for statement in statements if statement.startswith("INSERT INTO receipt_line_items")]
+    assert len(inserts) == 1 and len(statements) <= 6, "\n".join(statements)
+    assert not any(statement.startswith("SELECT receipts") for statement in statements)
+
+    response = ReceiptSchema.model_validate(receipt)
+    assert [(item.sku, item.total) for item in response.line_items] == [
+        (f"{i:04d}", Decimal(i + 1)) for i in range(30)
+    ]
+    assert all(item.id and item.receipt_id == receipt.id for item in response.line_items)
+
+def test_item_spending_by_code_or_name(db, user):
+    fx_service.load_rates(db, [("EUR", date(2024, 1, 1), 1.1)])
+    add_receipt(db, user, 5, [{"sku": "4011", "name": "BANANAS", "quantity": 2, "total": 1.18}])
+    # Entered with the zero padding some stores print
+    add_receipt(db, user, 12, [
+        {"sku": "000000004011", "name": "Bananas", "quantity": 3, "total": 1.77},
+        {"name": "2% MILK", "total": 3.49},
+    ])
+    add_receipt(db, user, 20, [{"name": "bananas", "total": 1.00}], currency="EUR")
+
+    by_code = receipt_service.get_item_spending(db, user_id=user.id, sku="4011")
+    assert (by_code.total, by_code.quantity, by_code.count) == (Decimal("2.95"), 5, 2)
+    assert by_code.last_date == datetime(2024, 1, 12)
+    padded = receipt_service.get_item_spending(db, user_id=user.id, sku="0004011")
+    assert (padded.total, padded.count) == (by_code.total, by_code.count)
+    assert set(db.scalars(select(ReceiptLineItem.sku).where(ReceiptLineItem.sku.isnot(None)))) == {"4011"}
+
+    by_name = receipt_service.get_item_spending(db, user_id=user.id, name="BANANAS")
+    assert (by_name.total, by_name.count) == (Decimal("4.05"), 3)
+
+    since = receipt_service.get_item_spending(db, user_id=user.id, sku="4011", start_date=datetime(2024, 1, 10))
+    assert (since.total, since.count) == (Decimal("1.77"), 1)
+    assert receipt_service.get_item_spending(db, user_id=user.id + 1, sku="4011").count == 0
+
+
+def test_remove_returns_none_for_a_missing_receipt(db, user):
+    receipt = add_receipt(db, user, 5, [{"sku": "4011", "name": "BANANAS", "total": 1.18}])
+    assert receipt_service.remove(db, id=receipt.id + 1) is None
+    assert receipt_service.remove(db, id=receipt.id).id == receipt.id
+    assert receipt_service.get(db, receipt.id) is None
+    assert db.scalars(select(ReceiptLineItem)).all() == []
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import recurring_transaction_service as service
+
+
+def naive_occurrences(frequency: str, anchor: date, end: date):
+    """Reference implementation that steps one period at a time."""
+    dates = []
+    index = 0
+    while True:
+        occurrence = service.get_occurrence(frequency, anchor, index)
+        if occurrence > end:
+            return dates
+        dates.append(occurrence)
+        index += 1
+
+
+def test_add_months_clamps_to_end_of_month():
+    assert service.add_months(date(2023, 1, 31), 1) == date(2023, 2, 28)
+    assert service.add_months(date(2024, 1, 31), 1) == date(2024, 2, 29)
+    assert service.add_months(date(2024, 1, 31), 2) == date(2024, 3, 31)
+    assert service.add_months(date(2024, 2, 29), 12) == date(2025, 2, 28)
+    assert service.add_months(date(2024, 11, 15), 3) == date(2025, 2, 15)
+
+
+def test_monthly_occurrences_do_not_drift_after_short_months():
+    anchor = date(2024, 1, 31)
+    assert [service.get_occurrence("monthly", anchor, i) for i in range(4)] == [
+        date(2024, 1, 31),
+        date(2024, 2, 29),
+        date(2024, 3, 31),
+        date(2024, 4, 30),
+    ]
+
+
+@pytest.mark.parametrize(
+    "frequency", ["daily", "weekly", "biweekly", "monthly", "quarterly", "yearly"]
+)
+def test_calculate_next_date_is_first_occurrence_after_today(frequency):
+    anchor = date(2014, 5, 31)
+    today = date(2024, 7, 15)
+    next_date = service.calculate_next_date(frequency, anchor, today=today)
+    expected = naive_occurrences(frequency, anchor, today + timedelta(days=400))
+    assert next_date == next(d for d in expected if d > today)
+
+
+def test_calculate_next_date_keeps_future_reference_date():
+    today = date(2024, 7, 15)
+    assert service.calculate_next_date("monthly", date(2024, 8, 1), today=today) == date(2024, 8, 1)
+
+
+@pytest.mark.parametrize(
+    "frequency", ["daily", "weekly", "biweekly", "monthly", "quarterly", "yearly"]
+)
+def test_occurrences_between_matches_stepping(frequency):
+    anchor = date(2020, 1, 31)
+    start = date(2021, 3, 1)
+    end = date(2024, 2, 29)
+    expected = [d for d in naive_occurrences(frequency, anchor, end) if d >= start]
+    assert service.occurrences_between(frequency, anchor, start, end).tolist() == expected
+
+
+def test_occurrences_between_empty_range():
+    result = service.occurrences_between("monthly", date(2024, 1, 15), date(2024, 1, 16), date(2024, 2, 14))
+    assert len(result) == 0
+
+
+def test_unknown_frequency_raises():
+    with pytest.raises(ValueError):
+        service.calculate_next_date("fortnightly", date(2024, 1, 1), today=date(2024, 6, 1))
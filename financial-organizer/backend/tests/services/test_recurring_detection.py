@@ -0,0 +1,162 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+from app.db.models import JobState, RecurringSuggestion, Transaction
+from app.services import recurring_detection_service as service
+
+
+def test_amount_band_groups_close_amounts():
+    assert service.amount_band(15.99) == service.amount_band(16.49)
+    assert service.amount_band(15.99) != service.amount_band(45.00)
+
+
+def test_group_key_skips_generated_transactions():
+    assert service.group_key(None, "Rent (Recurring)", 1200) is None
+    assert service.group_key("Spotify", "Music", 9.99) == ("spotify", service.amount_band(9.99))
+
+
+def test_group_key_groups_spellings_of_one_merchant():
+    # Grouped by the canonical name transactions are linked to merchants with
+    keys = {service.group_key(name, None, 14.99) for name in ["NETFLIX.COM #1234", "Netflix.com", "PAYPAL *NETFLIX"]}
+    assert keys == {("netflix", service.amount_band(14.99))}
+    assert service.group_key("AMZN Mktp US*2K4X", None, 20) == service.group_key("AMAZON.COM", None, 20)
+    assert service.group_key(None, "#1234", 20) is None
+
+
+def test_detect_monthly_with_short_months():
+    dates = [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+    assert service.detect_frequency(dates) == ("monthly", 1.0)
+
+
+def test_detect_weekly_tolerates_one_day_jitter():
+    start = date(2024, 1, 1)
+    dates = [start + timedelta(days=7 * i + (i % 2)) for i in range(8)]
+    frequency, confidence = service.detect_frequency(dates)
+    assert frequency == "weekly"
+    assert confidence >= service.MIN_CONFIDENCE
+
+
+def test_detect_rejects_irregular_or_short_histories():
+    assert service.detect_frequency([date(2024, 1, 1), date(2024, 2, 1)]) is None
+    irregular = [date(2024, 1, 1), date(2024, 1, 3), date(2024, 2, 20), date(2024, 3, 1), date(2024, 5, 9)]
+    assert service.detect_frequency(irregular) is None
+
+
+def charge(db, user_id, merchant_name, day, amount=15.99, **fields):
+    db.add(Transaction(
+        user_id=user_id, amount=amount, merchant_name=merchant_name, description="Card purchase",
+        transaction_type="purchase", category="entertainment", date=datetime.combine(day, time()), **fields,
+    ))
+
+
+def monthly(db, user_id, merchant_name, months, **fields):
+    for month in months:
+        charge(db, user_id, merchant_name, date(2024, month, 5), **fields)
+
+
+def suggested(db):
+    return sorted(
+        (s.user_id, s.merchant_key, s.frequency, s.occurrences, s.last_date, s.next_date, s.is_dismissed)
+        for s in db.scalars(select(RecurringSuggestion))
+    )
+
+
+def test_first_run_analyses_the_whole_history(db, user, other_user):
+    monthly(db, user.id, "NETFLIX.COM #1", [1, 2])
+    monthly(db, user.id, "Netflix.com", [3, 4])
+    charge(db, user.id, "Corner Shop", date(2024, 2, 11))
+    charge(db, user.id, "Corner Shop", date(2024, 3, 30))
+    charge(db, user.id, "Corner Shop", date(2024, 4, 2))
+    monthly(db, other_user.id, "Spotify", [2, 3, 4], amount=9.99)
+    db.commit()
+
+    assert service.run_incremental(db, today=date(2024, 4, 20)) == 10
+    assert suggested(db) == [
+        (user.id, "netflix", "monthly", 4, date(2024, 4, 5), date(2024, 5, 5), False),
+        (other_user.id, "spotify", "monthly", 3, date(2024, 4, 5), date(2024, 5, 5), False),
+    ]
+    assert db.get(JobState, 1).last_transaction_id == 10
+    assert [s.merchant_key for s in service.get_multi(db, user_id=user.id)] == ["netflix"]
+
+
+def test_incremental_run_reanalyses_only_groups_with_new_rows(db, user, other_user, monkeypatch):
+    monkeypatch.setattr(service, "WATERMARK_OVERLAP", 0)
+    monthly(db, user.id, "Netflix", [1, 2])
+    monthly(db, other_user.id, "Spotify", [1, 2, 3], amount=9.99)
+    db.commit()
+    assert service.run_incremental(db, today=date(2024, 3, 20)) == 5
+    assert [s.merchant_key for s in db.scalars(select(RecurringSuggestion))] == ["spotify"]
+
+    # Nothing new
+    assert service.run_incremental(db, today=date(2024, 3, 20)) == 0
+
+    # The third charge completes the Netflix group; Spotify is left alone
+    charge(db, user.id, "Netflix", date(2024, 3, 5))
+    charge(db, user.id, "Corner Shop", date(2024, 3, 6))
+    db.commit()
+    spotify = db.scalars(select(RecurringSuggestion)).one()
+    updated_at = spotify.updated_at
+    assert service.run_incremental(db, today=date(2024, 3, 20)) == 2
+    assert [row[:4] for row in suggested(db)] == [
+        (user.id, "netflix", "monthly", 3), (other_user.id, "spotify", "monthly", 3),
+    ]
+    db.refresh(spotify)
+    assert spotify.updated_at == updated_at
+
+
+def test_rows_committed_below_the_watermark_are_picked_up(db, user, monkeypatch):
+    monkeypatch.setattr(service, "WATERMARK_OVERLAP", 5)
+    charge(db, user.id, "Netflix", date(2024, 1, 5), id=1)
+    charge(db, user.id, "Corner Shop", date(2024, 3, 1), id=5)
+    db.commit()
+    assert service.run_incremental(db, today=date(2024, 3, 20)) == 2
+    assert suggested(db) == []
+
+    # Ids 2 and 3 were handed to a transaction still open during that run
+    charge(db, user.id, "Netflix", date(2024, 2, 5), id=2)
+    charge(db, user.id, "Netflix", date(2024, 3, 5), id=3)
+    db.commit()
+    service.run_incremental(db, today=date(2024, 3, 20))
+    assert [row[:4] for row in suggested(db)] == [(user.id, "netflix", "monthly", 3)]
+    assert db.get(JobState, 1).last_transaction_id == 5
+
+
+def test_dismissed_suggestions_stay_hidden(db, user):
+    monthly(db, user.id, "Netflix", [1, 2, 3])
+    db.commit()
+    service.run_incremental(db, today=date(2024, 3, 20))
+    [suggestion] = service.get_multi(db, user_id=user.id)
+    service.dismiss(db, db_obj=suggestion)
+    assert service.get_multi(db, user_id=user.id) == []
+
+    monthly(db, user.id, "Netflix", [4])
+    db.commit()
+    service.run_incremental(db, today=date(2024, 4, 20))
+    assert suggested(db) == [(user.id, "netflix", "monthly", 4, date(2024, 4, 5), date(2024, 5, 5), True)]
+    assert service.get_multi(db, user_id=user.id) == []
+
+    # Kept after the charges stop, so they stay hidden if they resume
+    service.run_incremental(db, today=date(2025, 1, 1))
+    assert [row[-1] for row in suggested(db)] == [True]
+
+
+def test_suggestions_expire_without_new_rows(db, user):
+    monthly(db, user.id, "Netflix", [1, 2, 3])
+    for day in range(1, 30, 7):
+        charge(db, user.id, "Gym", date(2024, 3, day), amount=20)
+    db.commit()
+    service.run_incremental(db, today=date(2024, 3, 30))
+    assert [row[1:3] for row in suggested(db)] == [("gym", "weekly"), ("netflix", "monthly")]
+
+    # Two weeks after the last weekly charge (the 29th), then two periods
+    # and a day
+    service.run_incremental(db, today=date(2024, 4, 12))
+    assert [row[1] for row in suggested(db)] == ["gym", "netflix"]
+    service.run_incremental(db, today=date(2024, 4, 13))
+    assert [row[1] for row in suggested(db)] == ["netflix"]
+    # 60 and 61 days after the last monthly charge, against 60.88
+    service.run_incremental(db, today=date(2024, 5, 4))
+    assert [row[1] for row in suggested(db)] == ["netflix"]
+    service.run_incremental(db, today=date(2024, 5, 5))
+    assert suggested(db) == []
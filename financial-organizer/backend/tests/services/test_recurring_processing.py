@@ -0,0 +1,78 @@
+from collections import Counter
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app.db.models import RecurringTransaction, Transaction
+from app.services import recurring_transaction_service as service
+
+TODAY = date(2024, 3, 15)
+FREQUENCIES = ["daily", "weekly", "biweekly", "monthly", "quarterly", "yearly"]
+
+
+def stepped_occurrences(frequency, anchor, start, end):
+    """Reference dates in [start, end], stepping one period at a time."""
+    dates = []
+    index = 0
+    while (occurrence := service.get_occurrence(frequency, anchor, index)) <= end:
+        if occurrence >= start:
+            dates.append(occurrence)
+        index += 1
+    return dates, occurrence
+
+
+def test_processing_posts_each_occurrence_once_across_batches(db, user, other_user):
+    user_ids = [user.id, other_user.id]
+    schedules = []
+    for i in range(23):
+        frequency = FREQUENCIES[i % len(FREQUENCIES)]
+        start_date = date(2023, 1, 1) + timedelta(days=17 * i)
+        # Part of the history is already booked for some schedules
+        booked = stepped_occurrences(frequency, start_date, start_date, TODAY)[0]
+        next_date = booked[min(i % 3, len(booked) - 1)]
+        schedules.append(RecurringTransaction(
+            user_id=user_ids[i % 2], amount=i + 1, description=f"Schedule {i}", transaction_type="purchase",
+            category="other", frequency=frequency, start_date=start_date, next_date=next_date,
+            # Every fourth schedule ends before today
+            end_date=TODAY - timedelta(days=20) if i % 4 == 0 else None, is_active=True,
+        ))
+    # Not due yet, and inactive
+    schedules.append(RecurringTransaction(
+        user_id=user_ids[0], amount=1, description="Future", transaction_type="purchase", category="other",
+        frequency="monthly", start_date=TODAY + timedelta(days=1), next_date=TODAY + timedelta(days=1), is_active=True,
+    ))
+    schedules.append(RecurringTransaction(
+        user_id=user_ids[0], amount=1, description="Inactive", transaction_type="purchase", category="other",
+        frequency="daily", start_date=date(2024, 1, 1), next_date=date(2024, 1, 1), is_active=False,
+    ))
+    db.add_all(schedules)
+    db.commit()
+
+    expected = Counter()
+    expected_next = {}
+    for schedule in schedules[:23]:
+        cutoff = min(TODAY, schedule.end_date) if schedule.end_date else TODAY
+        dates, next_date = stepped_occurrences(schedule.frequency, schedule.start_date, schedule.next_date, cutoff)
+        expected.update((schedule.user_id, f"{schedule.description} (Recurring)", day, schedule.amount) for day in dates)
+        expected_next[schedule.id] = (next_date, not (schedule.end_date and next_date > schedule.end_date))
+
+    created = service.process_due_recurring_transactions(db, batch_size=4, today=TODAY)
+
+    posted = Counter(
+        (row.user_id, row.description, row.date.date(), row.amount)
+        for row in db.scalars(select(Transaction))
+    )
+    assert created == sum(expected.values()) == sum(posted.values())
+    assert posted == expected
+    assert max(posted.values()) == 1
+
+    db.expire_all()
+    for schedule in db.scalars(select(RecurringTransaction)):
+        if schedule.id in expected_next:
+            assert (schedule.next_date, schedule.is_active) == expected_next[schedule.id]
+    assert db.get(RecurringTransaction, schedules[23].id).next_date == TODAY + timedelta(days=1)
+    assert db.get(RecurringTransaction, schedules[24].id).next_date == date(2024, 1, 1)
+
+    # Every schedule has moved past today
+    assert service.process_due_recurring_transactions(db, batch_size=4, today=TODAY) == 0
+    assert db.query(Transaction).count() == created
@@ -0,0 +1,74 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.db.models import SpendingRollup
+from app.schemas.transaction import TransactionBulkUpdate, TransactionCreate, TransactionUpdate
+from app.services import rollup_service, transaction_service
+
+
+def snapshot(db):
+    return sorted(
+        (r.month, r.category, r.card_id, round(r.total, 2), r.count, r.min_amount, r.max_amount)
+        for r in db.scalars(select(SpendingRollup))
+    )
+
+
+def fields(amount, day, category="groceries", transaction_type="purchase", month=1):
+    return dict(
+        amount=amount, description="Item", merchant_name="Shop", transaction_type=transaction_type,
+        category=category, date=datetime(2024, month, day),
+    )
+
+
+def transaction_in(card, amount, day, **kwargs):
+    return TransactionCreate(card_id=card.id, **fields(amount, day, **kwargs))
+
+
+def test_incremental_rollups_match_a_rebuild(db, user, card):
+    first = transaction_service.create(db, obj_in=transaction_in(card, 10.0, 5), user_id=user.id)
+    transaction_service.create(db, obj_in=transaction_in(card, 30.0, 6), user_id=user.id)
+    transaction_service.create(db, obj_in=transaction_in(card, 4.0, 7, transaction_type="refund"), user_id=user.id)
+    transaction_service.create(db, obj_in=transaction_in(card, 99.0, 8, transaction_type="payment"), user_id=user.id)
+    results = transaction_service.create_multi(
+        db, objs_in=[transaction_in(card, 7.0, 9, category="shopping"), transaction_in(card, 2.0, 10)],
+        user_id=user.id,
+    )
+
+    assert snapshot(db) == [
+        (date(2024, 1, 1), "groceries", card.id, 38.0, 4, -4.0, 30.0),
+        (date(2024, 1, 1), "shopping", card.id, 7.0, 1, 7.0, 7.0),
+    ]
+
+    # Moving the maximum out of the month, re-categorising and deleting the minimum
+    transaction_service.update(db, db_obj=first, obj_in=TransactionUpdate(**fields(50.0, 1, month=2)))
+    transaction_service.update_multi(
+        db, objs_in=[TransactionBulkUpdate(id=results[0].id, **fields(7.0, 9))], user_id=user.id
+    )
+    transaction_service.remove_multi(db, ids=[results[1].id], user_id=user.id)
+
+    incremental = snapshot(db)
+    rollup_service.rebuild(db)
+    assert incremental == snapshot(db)
+    assert incremental == [
+        (date(2024, 1, 1), "groceries", card.id, 33.0, 3, -4.0, 30.0),
+        (date(2024, 2, 1), "groceries", card.id, 50.0, 1, 50.0, 50.0),
+    ]
+
+
+def test_totals_are_exact_in_cents(db, user, card):
+    transaction_service.create_multi(
+        db, objs_in=[transaction_in(card, "0.10", day) for day in range(1, 11)], user_id=user.id
+    )
+    transaction_service.create(db, obj_in=transaction_in(card, 0.2, 11), user_id=user.id)
+
+    rollup = db.scalars(select(SpendingRollup)).one()
+    assert (rollup.total_cents, rollup.min_cents, rollup.max_cents) == (120, 10, 20)
+    assert rollup.total == Decimal("1.20")
+
+
+def test_removing_the_last_transaction_drops_the_rollup(db, user, card):
+    transaction = transaction_service.create(db, obj_in=transaction_in(card, 10.0, 5), user_id=user.id)
+    transaction_service.remove(db, id=transaction.id)
+    assert snapshot(db) == []
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app.db.models import RecurringTransaction, Transaction
+from app.services.scheduler_service import RecurringScheduler
+
+
+@pytest.fixture(autouse=True)
+def due_schedule(db, user):
+    db.add(RecurringTransaction(
+        user_id=user.id, amount=9.99, description="Music", transaction_type="purchase", category="entertainment",
+        frequency="monthly", start_date=date.today(), next_date=date.today(), is_active=True,
+    ))
+    db.commit()
+
+
+class FlakyEngine:
+    """Refuses the first connections, like Postgres while it starts up."""
+
+    def __init__(self, engine, failures):
+        self.engine = engine
+        self.failures = failures
+
+    def connect(self):
+        if self.failures:
+            self.failures -= 1
+            raise OperationalError("connect", {}, Exception("the database system is starting up"))
+        return self.engine.connect()
+
+
+def posted(db):
+    return db.scalar(select(func.count(Transaction.id)))
+
+
+def test_tick_is_skipped_while_another_worker_holds_the_lock(engine, session_factory, db):
+    scheduler = RecurringScheduler(engine=engine, session_factory=session_factory, interval_seconds=60)
+    scheduler._try_lock = lambda conn: False
+    assert scheduler.run_once() is False
+    assert scheduler.skipped_runs == 1 and scheduler.runs == 0
+    assert posted(db) == 0
+
+    del scheduler._try_lock
+    assert scheduler.run_once() is True
+    assert scheduler.runs == 1 and scheduler.last_run_rows_processed == 1
+    assert posted(db) == 1
+
+
+def test_loop_recovers_after_a_failing_tick(engine, session_factory, db):
+    scheduler = RecurringScheduler(
+        engine=FlakyEngine(engine, failures=1), session_factory=session_factory, interval_seconds=0.01
+    )
+    errors = []
+
+    async def run():
+        scheduler.start()
+        for _ in range(500):
+            if scheduler.last_run_error:
+                errors.append(scheduler.last_run_error)
+            if scheduler.runs:
+                break
+            await asyncio.sleep(0.01)
+        running = scheduler.status()["running"]
+        await scheduler.stop()
+        return running
+
+    assert asyncio.run(run()) is True
+    assert errors and "starting up" in errors[0]
+    assert scheduler.runs == 1 and scheduler.last_run_error is None
+    assert posted(db) == 1
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from app.db.models import Transaction
+from app.services import search_service
+
+
+def _transaction(**fields):
+    values = dict(
+        user_id=1, card_id=1, amount=10.0, transaction_type="purchase",
+        category="other", date=datetime(2024, 3, 1),
+    )
+    values.update(fields)
+    return Transaction(**values)
+
+
+def test_search_matches_description_merchant_and_receipt_text(db):
+    db.add_all([
+        _transaction(description="Weekly shop", merchant_name="Metro", category="groceries"),
+        _transaction(description="Dinner", merchant_name="Pizzeria Roma"),
+        _transaction(description="Receipt", merchant_name="Corner store", receipt_text="2x organic bananas"),
+        _transaction(user_id=2, description="Pizza night", merchant_name="Pizzeria Roma"),
+    ])
+    db.commit()
+
+    results = search_service.search(db, user_id=1, query="pizz")
+    assert [result["description"] for result in results] == ["Dinner"]
+    assert "<mark>" in results[0]["highlight"]
+
+    results = search_service.search(db, user_id=1, query="banana")
+    assert [result["merchant_name"] for result in results] == ["Corner store"]
+
+    # Rows written after the index exists are kept in sync by triggers
+    metro = db.query(Transaction).filter(Transaction.merchant_name == "Metro").one()
+    metro.description = "Banana bread ingredients"
+    db.commit()
+    results = search_service.search(db, user_id=1, query="banana")
+    assert {result["merchant_name"] for result in results} == {"Corner store", "Metro"}
+
+    db.delete(metro)
+    db.commit()
+    assert [r["merchant_name"] for r in search_service.search(db, user_id=1, query="banana")] == ["Corner store"]
+
+
+def test_search_filters(db):
+    db.add_all([
+        _transaction(description="Coffee", amount=4.0, date=datetime(2024, 1, 5), category="dining"),
+        _transaction(description="Coffee beans", amount=18.0, date=datetime(2024, 2, 5), category="groceries"),
+        _transaction(description="Coffee", amount=5.0, date=datetime(2024, 3, 5), card_id=2, category="dining"),
+    ])
+    db.commit()
+
+    def amounts(**filters):
+        return sorted(r["amount"] for r in search_service.search(db, user_id=1, query="coffee", **filters))
+
+    assert amounts() == [4.0, 5.0, 18.0]
+    assert amounts(start_date=datetime(2024, 2, 1)) == [5.0, 18.0]
+    assert amounts(end_date=datetime(2024, 2, 28)) == [4.0, 18.0]
+    assert amounts(min_amount=5.0, max_amount=10.0) == [5.0]
+    assert amounts(category="Dining") == [4.0, 5.0]
+    assert amounts(card_id=2) == [5.0]
+    assert len(search_service.search(db, user_id=1, query="coffee", limit=2)) == 2
+    assert search_service.search(db, user_id=1, query="!!") == []
@@ -0,0 +1,103 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from app.db.models import Transaction
+from app.schemas.transaction import TransactionFilters
+from app.services import transaction_service
+
+MERCHANTS = ["Starbucks", "Metro", "Amazon", "Shell", "Uber", "Costco"]
+
+
+@pytest.fixture(scope="module")
+def db(make_engine):
+    """Ten users with 500 transactions each, shared by the tests of this module."""
+    session = Session(make_engine(), autoflush=False, expire_on_commit=False)
+    rnd = random.Random(7)
+    session.execute(insert(Transaction), [
+        dict(
+            user_id=user_id,
+            card_id=user_id * 10 + rnd.randint(0, 3),
+            amount=round(rnd.uniform(1, 500), 2),
+            description="Transaction",
+            transaction_type=rnd.choice(["purchase"] * 8 + ["refund", "payment"]),
+            category=rnd.choice(transaction_service.CATEGORIES),
+            merchant_name=f"{rnd.choice(MERCHANTS)} #{rnd.randint(1, 50)}",
+            date=datetime(2023, 1, 1) + timedelta(minutes=rnd.randint(0, 700000)),
+            receipt_path="receipt.jpg" if rnd.random() < 0.05 else None,
+        )
+        for user_id in range(1, 11)
+        for _ in range(500)
+    ])
+    # Table statistics, as a production database would have
+    session.execute(text("ANALYZE"))
+    session.commit()
+    return session
+
+
+def _plan(db, filters):
+    query = transaction_service._list_query(
+        db, select(*transaction_service.LIST_COLUMNS), user_id=1, filters=filters, skip=0, limit=100
+    )
+    compiled = query.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return " ".join(row[3] for row in db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+
+
+@pytest.mark.parametrize("filters, index", [
+    (TransactionFilters(), "ix_transactions_user_date"),
+    (TransactionFilters(start_date=datetime(2024, 1, 1), end_date=datetime(2024, 2, 1)), "ix_transactions_user_date"),
+    (TransactionFilters(transaction_type="refund", start_date=datetime(2024, 1, 1)), "ix_transactions_user_date"),
+    (TransactionFilters(min_amount=10, max_amount=20), "ix_transactions_user_amount"),
+    (TransactionFilters(min_amount=400, sort="-amount"), "ix_transactions_user_amount"),
+    (TransactionFilters(categories=["shopping"], start_date=datetime(2024, 1, 1)), "ix_transactions_user_category_date"),
+    (TransactionFilters(card_id=12), "ix_transactions_user_card_date"),
+    (TransactionFilters(card_id=12, start_date=datetime(2024, 1, 1)), "ix_transactions_user_card_date"),
+    (TransactionFilters(merchant_prefix="Star"), "ix_transactions_user_merchant"),
+    (TransactionFilters(sort="merchant"), "ix_transactions_user_merchant"),
+    (TransactionFilters(has_receipt=True), "ix_transactions_user_receipt_date"),
+])
+def test_filters_use_index(db, filters, index):
+    assert f"USING INDEX {index} " in _plan(db, filters)
+
+
+def test_filters_and_sort(db):
+    def rows(**fields):
+        return transaction_service.get_multi_rows(
+            db, user_id=1, limit=1000, filters=TransactionFilters(**fields)
+        )
+
+    everything = rows()
+    assert len(everything) == 500
+    dates = [row["date"] for row in everything]
+    assert dates == sorted(dates, reverse=True)
+
+    amounts = [row["amount"] for row in rows(sort="amount", min_amount=100, max_amount=200)]
+    assert amounts == sorted(amounts) and all(100 <= amount <= 200 for amount in amounts)
+
+    assert {row["category"] for row in rows(categories=["Shopping", "groceries"])} == {"shopping", "groceries"}
+    assert {row["transaction_type"] for row in rows(transaction_type="REFUND")} == {"refund"}
+    assert {row["card_id"] for row in rows(card_id=12)} == {12}
+    assert all(row["merchant_name"].startswith("Star") for row in rows(merchant_prefix="star"))
+    assert len(rows(merchant_prefix="star")) == sum(
+        1 for row in everything if row["merchant_name"].lower().startswith("star")
+    )
+    with_receipt = rows(has_receipt=True)
+    assert with_receipt and all(row["receipt_path"] for row in with_receipt)
+    assert len(with_receipt) + len(rows(has_receipt=False)) == 500
+
+    merchants = [row["merchant_name"].lower() for row in rows(sort="-merchant")]
+    assert merchants == sorted(merchants, reverse=True)
+
+    # Pages follow the sort order without overlapping
+    pages = [
+        transaction_service.get_multi_rows(
+            db, user_id=1, skip=skip, limit=100, filters=TransactionFilters(sort="amount")
+        )
+        for skip in range(0, 500, 100)
+    ]
+    assert [row["id"] for page in pages for row in page] == [
+        row["id"] for row in rows(sort="amount")
+    ]
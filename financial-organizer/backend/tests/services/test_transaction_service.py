@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.db.models import Transaction
+from app.schemas.transaction import Transaction as TransactionSchema
+from app.schemas.transaction import TransactionBulkUpdate, TransactionCreate
+from app.services import transaction_service
+
+ITEM = {
+    "amount": 12.5, "description": "Lunch", "transaction_type": "purchase", "category": "dining",
+    "merchant_name": "Cafe", "date": datetime(2024, 3, 1, 12),
+}
+
+
+def test_list_rows_match_response_model(db):
+    db.add_all([
+        Transaction(
+            user_id=1, card_id=2, amount=12.5, description="Lunch", transaction_type="purchase",
+            category="other", merchant_name="Cafe", date=datetime(2024, 3, 1, 12, 30, 15, 250000),
+            receipt_path="receipt_1.png", receipt_text="SOUP 12.50",
+        ),
+        Transaction(
+            user_id=1, card_id=2, amount=40.0, description="Refund", transaction_type="refund",
+            category="shopping", merchant_name="Store", date=datetime(2024, 3, 2),
+            plaid_transaction_id="plaid-1",
+        ),
+        Transaction(
+            user_id=2, card_id=3, amount=1.0, description="Other user", transaction_type="purchase",
+            category="other", merchant_name="X", date=datetime(2024, 3, 3),
+        ),
+    ])
+    db.commit()
+
+    expected = jsonable_encoder([
+        TransactionSchema.model_validate(obj)
+        for obj in transaction_service.get_multi(db, user_id=1)
+    ])
+    rows = transaction_service.get_multi_rows(db, user_id=1)
+    assert orjson.loads(orjson.dumps(rows)) == expected
+
+
+def test_create_multi_reports_each_item(db, user, card, other_user, other_card):
+    results = transaction_service.create_multi(db, objs_in=[
+        TransactionCreate(**ITEM, card_id=card.id),
+        TransactionCreate(**ITEM, card_id=other_card.id),
+        TransactionCreate(**{**ITEM, "amount": 3}, card_id=card.id),
+        TransactionCreate(**ITEM, card_id=999),
+    ], user_id=user.id)
+
+    assert [(r.index, r.ok, r.error) for r in results] == [
+        (0, True, None), (1, False, "Card not found"), (2, True, None), (3, False, "Card not found"),
+    ]
+    assert results[1].id is None and results[3].id is None
+    stored = {t.id: t for t in transaction_service.get_multi(db, user_id=user.id)}
+    assert set(stored) == {results[0].id, results[2].id}
+    assert stored[results[2].id].amount == 3
+    assert transaction_service.get_multi(db, user_id=other_user.id) == []
+
+
+def test_update_multi_skips_missing_and_foreign_transactions(db, user, card, other_user, other_card):
+    [mine] = transaction_service.create_multi(db, objs_in=[TransactionCreate(**ITEM, card_id=card.id)], user_id=user.id)
+    [theirs] = transaction_service.create_multi(
+        db, objs_in=[TransactionCreate(**ITEM, card_id=other_card.id)], user_id=other_user.id
+    )
+
+    results = transaction_service.update_multi(db, objs_in=[
+        TransactionBulkUpdate(**{**ITEM, "amount": 20}, id=theirs.id),
+        TransactionBulkUpdate(**{**ITEM, "amount": 30}, id=mine.id),
+        TransactionBulkUpdate(**ITEM, id=999),
+    ], user_id=user.id)
+
+    assert [(r.index, r.id, r.ok, r.error) for r in results] == [
+        (0, theirs.id, False, "Not enough permissions"),
+        (1, mine.id, True, None),
+        (2, 999, False, "Transaction not found"),
+    ]
+    db.expire_all()
+    assert transaction_service.get(db, id=mine.id).amount == 30
+    assert transaction_service.get(db, id=theirs.id).amount == ITEM["amount"]
+
+
+def test_remove_multi_only_deletes_owned_transactions(db, user, card, other_user, other_card):
+    mine = transaction_service.create_multi(
+        db, objs_in=[TransactionCreate(**ITEM, card_id=card.id)] * 2, user_id=user.id
+    )
+    [theirs] = transaction_service.create_multi(
+        db, objs_in=[TransactionCreate(**ITEM, card_id=other_card.id)], user_id=other_user.id
+    )
+
+    results = transaction_service.remove_multi(
+        db, ids=[mine[0].id, theirs.id, 999], user_id=user.id
+    )
+
+    assert [(r.index, r.id, r.ok, r.error) for r in results] == [
+        (0, mine[0].id, True, None),
+        (1, theirs.id, False, "Not enough permissions"),
+        (2, 999, False, "Transaction not found"),
+    ]
+    assert [t.id for t in transaction_service.get_multi(db, user_id=user.id)] == [mine[1].id]
+    assert [t.id for t in transaction_service.get_multi(db, user_id=other_user.id)] == [theirs.id]
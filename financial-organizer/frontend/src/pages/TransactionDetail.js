@@ -34,6 +34,7 @@ const TransactionDetail = () => {
   const navigate = useNavigate();
   const [transaction, setTransaction] = useState(null);
   const [card, setCard] = useState(null);
+  const [receipt, setReceipt] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [receiptDialogOpen, setReceiptDialogOpen] = useState(false);
@@ -49,15 +50,15 @@ const TransactionDetail = () => {
     try {
       setLoading(true);
       console.log('Fetching transaction details for ID:', id);
-      const response = await axios.get(`/api/v1/transactions/${id}`);
+      // The card and the parsed receipt with its line items come embedded
+      // in the transaction, in one request
+      const response = await axios.get(`/api/v1/transactions/${id}`, {
+        params: { embed: 'card,receipt' }
+      });
       console.log('Transaction details response:', response.data);
       setTransaction(response.data);
-      
-      // Fetch card details if card_id exists
-      if (response.data.card_id) {
-        const cardResponse = await axios.get(`/api/v1/cards/${response.data.card_id}`);
-        setCard(cardResponse.data);
-      }
+      setCard(response.data.card);
+      setReceipt(response.data.receipt);
       
       setError(null);
     } catch (err) {
@@ -378,7 +379,27 @@ const TransactionDetail = () => {
             </CardContent>
           </Card>
 
-          {transaction.ocr_data && Object.keys(transaction.ocr_data).length > 0 && (
+          {receipt && receipt.line_items.length > 0 && (
+            <Card sx={{ mt: 2 }}>
+              <CardContent>
+                <Typography variant="h6" gutterBottom>
+                  Items
+                </Typography>
+                {receipt.line_items.map((item) => (
+                  <Box key={item.id} sx={{ display: 'flex', justifyContent: 'space-between', py: 0.5 }}>
+                    <Typography variant="body2">
+                      {item.quantity !== 1 ? `${item.quantity} × ` : ''}{item.name}
+                    </Typography>
+                    <Typography variant="body2">
+                      ${item.total.toFixed(2)}
+                    </Typography>
+                  </Box>
+                ))}
+              </CardContent>
+            </Card>
+          )}
+
+          {receipt && Object.keys(receipt.ocr_data).length > 0 && (
             <Card sx={{ mt: 2 }}>
               <CardContent>
                 <Typography variant="h6" gutterBottom>
@@ -391,7 +412,7 @@ const TransactionDetail = () => {
                   borderRadius: 1,
                   fontSize: '0.875rem'
                 }}>
-                  {JSON.stringify(transaction.ocr_data, null, 2)}
+                  {JSON.stringify(receipt.ocr_data, null, 2)}
                 </Box>
               </CardContent>
             </Card>